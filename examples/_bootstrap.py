@@ -0,0 +1,35 @@
+"""
+Bootstrap compartilhado dos exemplos
+Author: Gabriel Demetrios Lafis
+Year: 2025
+
+Adiciona o diretório src ao sys.path uma única vez e expõe o módulo
+`feature_store` com carregamento preguiçoso (importlib.util.LazyLoader):
+pandas, pyarrow e redis só são importados no primeiro acesso a um atributo.
+Scripts que só fazem chamadas HTTP não pagam esse custo de inicialização
+(verifique com `python -X importtime examples/api_usage.py`).
+"""
+
+import importlib.util
+import os
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+
+def lazy_import(name):
+    """Importa `name` adiando a execução do módulo até o primeiro uso"""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+feature_store = lazy_import("feature_store")
@@ -11,8 +11,8 @@ Este exemplo demonstra:
 """
 
 import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import _bootstrap  # noqa: F401 - adiciona src/ ao sys.path
 
 from feature_store import (
     FeatureStore,
@@ -25,23 +25,88 @@ from feature_store import (
 )
 from datetime import datetime, timedelta
 
+import numpy as np
+
+# Dependência opcional (instalar com `pip install numba`): kernels compilados para lotes grandes
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+if njit is not None:
+    # cache=True persiste o código compilado em disco: o custo de compilação é pago
+    # uma única vez entre execuções dos exemplos e da API
+    @njit(cache=True, parallel=True)
+    def _recency_kernel(days, out):
+        for i in prange(days.shape[0]):
+            out[i] = np.int64(30000.0 / (30.0 + days[i]) + 0.5) / 1000.0
+
+    @njit(cache=True, parallel=True)
+    def _clv_kernel(avg, freq, tenure, out):
+        for i in prange(avg.shape[0]):
+            out[i] = np.int64(avg[i] * freq[i] * tenure[i] * (100.0 / 30.0) + 0.5)
+else:
+    _recency_kernel = None
+    _clv_kernel = None
 
-def calculate_recency_score(data):
+
+def _float_column(cols, name):
+    """Coluna contígua float64, formato esperado pelos kernels Numba"""
+    return np.ascontiguousarray(cols[name], dtype=np.float64)
+
+
+def calculate_recency_score(days):
     """Calcula score de recência baseado em dias desde última compra"""
-    days = data.get("days_since_last_purchase", 365)
-    # Score entre 0 e 1, onde 1 = comprou hoje, 0 = muito tempo sem comprar
-    return round(1 / (1 + days / 30), 3)
+    # Score entre 0 e 1, onde 1 = comprou hoje, 0 = muito tempo sem comprar.
+    # Arredondado em milésimos via escala inteira (+0.5 e truncamento, valores >= 0)
+    return int(30000 / (30 + days) + 0.5) / 1000
 
 
-def calculate_clv_prediction(data):
-    """Predição simples de Customer Lifetime Value"""
-    avg_value = data.get("avg_order_value", 0)
-    frequency = data.get("purchase_frequency", 0)
-    tenure = data.get("customer_tenure_days", 30)
-    
-    # Fórmula simplificada: valor médio * frequência * (tenure em meses)
-    clv = avg_value * frequency * (tenure / 30)
-    return round(clv, 2)
+def calculate_recency_score_vectorized(cols):
+    """Versão vetorizada (Numba/NumPy) de calculate_recency_score para ingestão em lote"""
+    days = _float_column(cols, "days_since_last_purchase")
+    if _recency_kernel is not None:
+        out = np.empty_like(days)
+        _recency_kernel(days, out)
+        return out
+    return (30000.0 / (30.0 + days) + 0.5).astype(np.int64) / 1000.0
+
+
+def calculate_avg_order_vectorized(cols):
+    """Valor médio por pedido sobre colunas inteiras (0 quando não há compras)"""
+    purchases = cols["total_purchases"]
+    avg = np.divide(
+        cols["total_spent"], purchases,
+        out=np.zeros(len(purchases)), where=purchases > 0
+    )
+    return np.round(avg, 2)
+
+
+def calculate_clv_prediction(avg_value, frequency, tenure):
+    """Predição simples de Customer Lifetime Value, em centavos (int)"""
+    # Fórmula simplificada: valor médio * frequência * (tenure em meses), escalada
+    # por 100 e arredondada em aritmética inteira (valores >= 0)
+    return int(avg_value * frequency * tenure * (100 / 30) + 0.5)
+
+
+def calculate_clv_prediction_vectorized(cols):
+    """Versão vetorizada (Numba/NumPy) de calculate_clv_prediction para ingestão em lote"""
+    avg = _float_column(cols, "avg_order_value")
+    freq = _float_column(cols, "purchase_frequency")
+    tenure = _float_column(cols, "customer_tenure_days")
+    if _clv_kernel is not None:
+        out = np.empty(avg.shape[0], dtype=np.int64)
+        _clv_kernel(avg, freq, tenure, out)
+        return out
+    return (avg * freq * tenure * (100.0 / 30.0) + 0.5).astype(np.int64)
+
+
+def iter_batches(entity_ids, columns, batch_size):
+    """Fatia colunas paralelas em lotes (entity_ids, columns) para ingest_stream"""
+    for start in range(0, len(entity_ids), batch_size):
+        end = start + batch_size
+        yield entity_ids[start:end], {name: values[start:end] for name, values in columns.items()}
 
 
 def main():
@@ -51,7 +116,8 @@ def main():
     
     # Inicializar Feature Store
     print("1️⃣  Inicializando Feature Store...")
-    fs = FeatureStore(
+    # Reutiliza a instância se outro script no mesmo processo já a criou
+    fs = FeatureStore.shared(
         name="advanced-example-fs",
         redis_host="localhost",
         redis_port=6379,
@@ -74,7 +140,7 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
-                validation=FeatureValidation(min_value=0, not_null=True)
+                validation=FeatureValidation.make(min_value=0, not_null=True)
             ),
             
             FeatureMetadata(
@@ -83,7 +149,7 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
-                validation=FeatureValidation(min_value=0, not_null=True)
+                validation=FeatureValidation.make(min_value=0, not_null=True)
             ),
             
             # Feature transformada: valor médio por pedido
@@ -93,6 +159,7 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
+                storage_dtype="float32",
                 transformation=FeatureTransformation(
                     name="calculate_avg_order",
                     description="Calcula valor médio dos pedidos",
@@ -101,9 +168,10 @@ def main():
                         data["total_spent"] / data["total_purchases"]
                         if data["total_purchases"] > 0 else 0,
                         2
-                    )
+                    ),
+                    vectorized_fn=calculate_avg_order_vectorized
                 ),
-                validation=FeatureValidation(min_value=0)
+                validation=FeatureValidation.make(min_value=0)
             ),
             
             # Feature transformada: score de recência
@@ -113,13 +181,16 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
+                storage_dtype="float32",
                 transformation=FeatureTransformation(
                     name="calculate_recency",
                     description="Calcula score baseado em última compra",
                     source_features=["days_since_last_purchase"],
-                    transformation_fn=calculate_recency_score
+                    transformation_fn=calculate_recency_score,
+                    unpack_args=True,
+                    vectorized_fn=calculate_recency_score_vectorized
                 ),
-                validation=FeatureValidation(min_value=0, max_value=1)
+                validation=FeatureValidation.make(min_value=0, max_value=1)
             ),
             
             # Feature simples para a transformação de CLV
@@ -129,7 +200,7 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
-                validation=FeatureValidation(min_value=0)
+                validation=FeatureValidation.make(min_value=0)
             ),
             
             FeatureMetadata(
@@ -138,7 +209,7 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
-                validation=FeatureValidation(min_value=0)
+                validation=FeatureValidation.make(min_value=0)
             ),
             
             FeatureMetadata(
@@ -147,13 +218,13 @@ def main():
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="analytics@example.com",
-                validation=FeatureValidation(min_value=0)
+                validation=FeatureValidation.make(min_value=0)
             ),
             
             # Feature transformada complexa: predição de CLV
             FeatureMetadata(
-                name="predicted_clv",
-                description="Predição de Customer Lifetime Value",
+                name="predicted_clv_cents",
+                description="Predição de Customer Lifetime Value (em centavos)",
                 feature_type=FeatureType.NUMERICAL,
                 entity="customer",
                 owner="ml-team@example.com",
@@ -161,9 +232,11 @@ def main():
                     name="predict_clv",
                     description="Prediz CLV baseado em comportamento histórico",
                     source_features=["avg_order_value", "purchase_frequency", "customer_tenure_days"],
-                    transformation_fn=calculate_clv_prediction
+                    transformation_fn=calculate_clv_prediction,
+                    unpack_args=True,
+                    vectorized_fn=calculate_clv_prediction_vectorized
                 ),
-                validation=FeatureValidation(min_value=0)
+                validation=FeatureValidation.make(min_value=0)
             )
         ]
     )
@@ -174,58 +247,28 @@ def main():
     # Ingerir dados de exemplo
     print("3️⃣  Ingerindo dados de clientes...")
     
-    customers_data = [
-        {
-            "entity_id": "CUST_ADV_001",
-            "name": "Cliente Ativo",
-            "data": {
-                "total_purchases": 25,
-                "total_spent": 3750.00,
-                "days_since_last_purchase": 5,
-                "purchase_frequency": 2.5,  # 2.5 compras/mês
-                "customer_tenure_days": 300
-            }
-        },
-        {
-            "entity_id": "CUST_ADV_002",
-            "name": "Cliente Em Risco",
-            "data": {
-                "total_purchases": 10,
-                "total_spent": 1200.00,
-                "days_since_last_purchase": 90,
-                "purchase_frequency": 0.5,
-                "customer_tenure_days": 600
-            }
-        },
-        {
-            "entity_id": "CUST_ADV_003",
-            "name": "Cliente VIP",
-            "data": {
-                "total_purchases": 50,
-                "total_spent": 12500.00,
-                "days_since_last_purchase": 2,
-                "purchase_frequency": 5.0,
-                "customer_tenure_days": 365
-            }
-        }
-    ]
+    # Formato colunar (SoA): uma lista por feature bruta, na ordem de entity_ids
+    entity_ids = ["CUST_ADV_001", "CUST_ADV_002", "CUST_ADV_003"]
+    customer_names = ["Cliente Ativo", "Cliente Em Risco", "Cliente VIP"]
+    customers_columns = {
+        "total_purchases": [25, 10, 50],
+        "total_spent": [3750.00, 1200.00, 12500.00],
+        "days_since_last_purchase": [5, 90, 2],
+        "purchase_frequency": [2.5, 0.5, 5.0],  # compras/mês
+        "customer_tenure_days": [300, 600, 365]
+    }
     
-    for customer in customers_data:
-        fs.ingest_features(
-            "customer_advanced",
-            customer["entity_id"],
-            customer["data"]
-        )
-        print(f"   ✓ Dados ingeridos para {customer['entity_id']} ({customer['name']})")
+    # Stream de lotes: a computação de um lote se sobrepõe à escrita do anterior
+    fs.ingest_stream("customer_advanced", iter_batches(entity_ids, customers_columns, batch_size=2))
+    for entity_id, name in zip(entity_ids, customer_names):
+        print(f"   ✓ Dados ingeridos para {entity_id} ({name})")
     
     print()
     
     # Buscar e exibir features transformadas
     print("4️⃣  Analisando features transformadas...")
     
-    for customer in customers_data:
-        entity_id = customer["entity_id"]
-        name = customer["name"]
+    for entity_id, name in zip(entity_ids, customer_names):
         features = fs.get_online_features("customer_advanced", entity_id)
         
         print(f"\n   📊 {name} ({entity_id}):")
@@ -239,11 +282,11 @@ def main():
         print(f"\n      🔄 Features Transformadas:")
         print(f"         • Valor médio por pedido: R$ {features.get('avg_order_value')}")
         print(f"         • Score de recência: {features.get('recency_score')} (0-1)")
-        print(f"         • CLV predito: R$ {features.get('predicted_clv')}")
+        clv = int(features.get('predicted_clv_cents', 0)) / 100
+        print(f"         • CLV predito: R$ {clv:.2f}")
         
         # Análise do perfil
         recency = float(features.get('recency_score', 0))
-        clv = float(features.get('predicted_clv', 0))
         
         print(f"\n      💡 Análise:")
         if recency > 0.8:
@@ -12,8 +12,8 @@ Este exemplo demonstra o uso básico da Feature Store:
 """
 
 import sys
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import _bootstrap  # noqa: F401 - adiciona src/ ao sys.path
 
 from feature_store import (
     FeatureStore,
@@ -32,7 +32,8 @@ def main():
     
     # 1. Inicializar Feature Store
     print("1️⃣  Inicializando Feature Store...")
-    fs = FeatureStore(
+    # Reutiliza a instância se outro script no mesmo processo já a criou
+    fs = FeatureStore.shared(
         name="basic-example-fs",
         redis_host="localhost",
         redis_port=6379,
@@ -83,47 +84,24 @@ def main():
     # 3. Ingerir dados de exemplo
     print("3️⃣  Ingerindo dados de clientes...")
     
-    customers_data = [
-        {
-            "entity_id": "CUST001",
-            "data": {
-                "total_purchases": 15,
-                "total_spent": 1500.00,
-                "customer_segment": "gold"
-            }
-        },
-        {
-            "entity_id": "CUST002",
-            "data": {
-                "total_purchases": 5,
-                "total_spent": 250.00,
-                "customer_segment": "bronze"
-            }
-        },
-        {
-            "entity_id": "CUST003",
-            "data": {
-                "total_purchases": 30,
-                "total_spent": 4500.00,
-                "customer_segment": "platinum"
-            }
-        }
-    ]
+    # Formato colunar (SoA): uma lista por feature bruta, na ordem de entity_ids
+    entity_ids = ["CUST001", "CUST002", "CUST003"]
+    customers_columns = {
+        "total_purchases": [15, 5, 30],
+        "total_spent": [1500.00, 250.00, 4500.00],
+        "customer_segment": ["gold", "bronze", "platinum"]
+    }
     
-    for customer in customers_data:
-        fs.ingest_features(
-            "customer_metrics",
-            customer["entity_id"],
-            customer["data"]
-        )
-        print(f"   ✓ Dados ingeridos para {customer['entity_id']}")
+    # Um único pipeline Redis para todo o lote (em vez de um round trip por cliente)
+    fs.ingest_features_batch("customer_metrics", customers_columns, entity_ids=entity_ids)
+    for entity_id in entity_ids:
+        print(f"   ✓ Dados ingeridos para {entity_id}")
     
     print()
     
     # 4. Buscar features online
     print("4️⃣  Buscando features online...")
-    for customer in customers_data:
-        entity_id = customer["entity_id"]
+    for entity_id in entity_ids:
         features = fs.get_online_features("customer_metrics", entity_id)
         print(f"\n   📊 Features de {entity_id}:")
         for key, value in features.items():
@@ -12,7 +12,12 @@ from .feature_store import (
     FeatureStatus,
     FeatureValidation,
     FeatureTransformation,
-    FeatureGroup
+    FeatureGroup,
+    make_njit_transform,
+    quantize_int8,
+    dequantize_int8,
+    decode_int8_embedding,
+    throttle_repeated_logs
 )
 
 __all__ = [
@@ -23,7 +28,12 @@ __all__ = [
     'FeatureStatus',
     'FeatureValidation',
     'FeatureTransformation',
-    'FeatureGroup'
+    'FeatureGroup',
+    'make_njit_transform',
+    'quantize_int8',
+    'dequantize_int8',
+    'decode_int8_embedding',
+    'throttle_repeated_logs'
 ]
 
 __version__ = '1.0.0'
@@ -6,20 +6,94 @@ Year: 2025
 API RESTful construída com Flask para servir features em tempo real.
 """
 
-from flask import Flask, jsonify, request
-import sys
 import os
+from flask import Flask, Response, jsonify, request
+from werkzeug.exceptions import BadRequest, UnsupportedMediaType
+import json
+import queue
+import sys
+
+# Dependências opcionais: decodificação mais rápida de JSON e corpo binário MessagePack
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 # Ensure the src directory is on the path for imports
 sys.path.insert(0, os.path.dirname(__file__))
 
-from feature_store import FeatureStore
+from feature_store import FeatureStore, OrjsonProvider
 from datetime import datetime
 
 # Configuração da Feature Store
 REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
 REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+REDIS_POOL_SIZE = int(os.environ.get('REDIS_POOL_SIZE', 64))
+ONLINE_JSON_PAYLOAD = os.environ.get('ONLINE_JSON_PAYLOAD', '0').lower() in ('1', 'true', 'yes')
 OFFLINE_STORE_PATH = os.environ.get('OFFLINE_STORE_PATH', './data/offline_store')
+# Janela (ms) para agrupar leituras concorrentes em um pipeline; vazio desativa
+ONLINE_READ_BATCH_MS = os.environ.get('ONLINE_READ_BATCH_MS')
+ONLINE_READ_BATCH_MS = float(ONLINE_READ_BATCH_MS) if ONLINE_READ_BATCH_MS else None
+# Expiração (segundos) das chaves online; vazio mantém as chaves sem TTL
+ONLINE_TTL = int(os.environ['ONLINE_TTL']) if os.environ.get('ONLINE_TTL') else None
+# Com INGEST_ASYNC, POST /ingest só enfileira os dados (202 Accepted) e uma thread de
+# fundo os grava em lotes; erros de validação das features não chegam ao cliente
+INGEST_ASYNC = os.environ.get('INGEST_ASYNC', '0').lower() in ('1', 'true', 'yes')
+
+# `python feature_serving_api.py` sobe o dev server do Flask (uma thread por requisição).
+# Em produção: gunicorn -k gevent -w 4 'feature_serving_api:create_app()'. O worker
+# gevent do gunicorn faz o monkey-patching antes de importar este módulo (e o flask/
+# redis), o que um servidor gevent iniciado aqui não garante
+API_PORT = int(os.environ.get('API_PORT', 5000))
+
+MSGPACK_MIMETYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _parse_body():
+    """
+    Decodifica o corpo da requisição.
+
+    JSON é lido com orjson quando instalado (fallback: json da stdlib); corpos com
+    Content-Type application/msgpack são lidos com msgpack. Assim como `request.json`,
+    levanta 415 para outros Content-Types e 400 para corpos malformados.
+    """
+    if request.mimetype in MSGPACK_MIMETYPES:
+        if msgpack is None:
+            raise UnsupportedMediaType("MessagePack support is not installed")
+        loads = lambda body: msgpack.unpackb(body, raw=False)
+    elif request.is_json:
+        loads = orjson.loads if orjson else json.loads
+    else:
+        raise UnsupportedMediaType("Expected an application/json or application/msgpack body")
+
+    body = request.get_data(cache=True)
+    if not body:
+        return None
+    try:
+        return loads(body)
+    except Exception:
+        raise BadRequest("Failed to decode request body")
+
+
+def _requested_features():
+    """
+    Lê o query param `features` (lista separada por vírgula).
+
+    Os nomes são deduplicados preservando a ordem, para que o HMGET não busque o
+    mesmo campo duas vezes. Retorna None quando nenhum filtro foi informado.
+    """
+    requested_features = request.args.get('features')
+    if not requested_features:
+        return None
+    names = dict.fromkeys(f.strip() for f in requested_features.split(','))
+    names.pop('', None)
+    return list(names) or None
+
 
 def create_app(feature_store: FeatureStore = None):
     """
@@ -32,23 +106,56 @@ def create_app(feature_store: FeatureStore = None):
         Aplicação Flask configurada
     """
     app = Flask(__name__)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
     
     if feature_store is None:
         feature_store = FeatureStore(
             name="production-feature-store",
             redis_host=REDIS_HOST,
             redis_port=REDIS_PORT,
+            redis_pool_size=REDIS_POOL_SIZE,
+            online_json_payload=ONLINE_JSON_PAYLOAD,
+            online_read_batch_ms=ONLINE_READ_BATCH_MS,
+            online_ttl=ONLINE_TTL,
             offline_store_path=OFFLINE_STORE_PATH
         )
     
+    # Referência direta ao registro: os handlers não resolvem `feature_store.feature_groups`
+    # a cada requisição (o dict é o mesmo objeto durante toda a vida da store)
+    feature_groups = feature_store.feature_groups
+
+    def group_not_found(group_name):
+        return jsonify({
+            "error": f"Feature group '{group_name}' not found"
+        }), 404
+
+    # Listagens e metadados serializados, reutilizados enquanto o registro não muda:
+    # {rota ou (rota, entidade, feature): (registry_version, corpo JSON)}
+    listing_cache = {}
+
+    def cached_listing(key, build):
+        """Resposta JSON em cache para `key`; None (sem cachear) se `build` devolver None."""
+        version = feature_store.registry_version()
+        cached = listing_cache.get(key)
+        if cached is None or cached[0] != version:
+            body = build()
+            if body is None:
+                return None
+            cached = (version, app.json.dumps(body))
+            listing_cache[key] = cached
+        return Response(cached[1], mimetype="application/json")
+    
+    # Corpo do health check montado uma vez: por requisição só entra o timestamp
+    # (isoformat não tem caracteres a escapar em JSON)
+    health_prefix = b'{"status":"healthy","service":"feature-serving-api","timestamp":"'
+    health_suffix = b'"}'
+
     @app.route('/health', methods=['GET'])
     def health_check():
         """Health check endpoint"""
-        return jsonify({
-            "status": "healthy",
-            "service": "feature-serving-api",
-            "timestamp": datetime.now().isoformat()
-        })
+        timestamp = datetime.now().isoformat().encode("ascii")
+        return Response(health_prefix + timestamp + health_suffix, mimetype="application/json")
     
     @app.route('/features/<group_name>/<entity_id>', methods=['GET'])
     def get_features(group_name, entity_id):
@@ -58,13 +165,19 @@ def create_app(feature_store: FeatureStore = None):
         Query params:
             features (opcional): Lista de features específicas separadas por vírgula
         """
-        # Verificar se o grupo existe
-        if group_name not in feature_store.feature_groups:
-            return jsonify({
-                "error": f"Feature group '{group_name}' not found"
-            }), 404
+        if group_name not in feature_groups:
+            return group_not_found(group_name)
         
-        features = feature_store.get_online_features(group_name, entity_id)
+        # Filtrar features específicas no próprio Redis (HMGET) se solicitado
+        requested_list = _requested_features()
+
+        # Payload pré-serializado na ingestão: devolvido como está, sem jsonify
+        if not requested_list:
+            payload = feature_store.get_online_features_json(group_name, entity_id)
+            if payload is not None:
+                return Response(payload, mimetype="application/json")
+
+        features = feature_store.get_online_features(group_name, entity_id, requested_list)
         
         if not features:
             return jsonify({
@@ -73,12 +186,62 @@ def create_app(feature_store: FeatureStore = None):
                 "entity_id": entity_id
             }), 404
         
-        # Filtrar features específicas se solicitado
-        requested_features = request.args.get('features')
-        if requested_features:
-            requested_list = [f.strip() for f in requested_features.split(',')]
-            features = {k: v for k, v in features.items() if k in requested_list}
+        return jsonify(features)
+    
+    @app.route('/features/<group_name>', methods=['GET'])
+    def get_features_bulk(group_name):
+        """
+        Retorna features online de várias entidades em uma única chamada.
         
+        Query params:
+            entity_ids: Lista de entidades separadas por vírgula
+            features (opcional): Lista de features específicas separadas por vírgula
+        """
+        if group_name not in feature_groups:
+            return group_not_found(group_name)
+
+        entity_ids = [e.strip() for e in request.args.get('entity_ids', '').split(',') if e.strip()]
+        if not entity_ids:
+            return jsonify({"error": "Query parameter 'entity_ids' is required"}), 400
+
+        requested_list = _requested_features()
+
+        features = feature_store.get_online_features_bulk(group_name, entity_ids, requested_list)
+        if features is None:
+            return jsonify({"error": "Online store not available"}), 503
+
+        return jsonify(features)
+    
+    @app.route('/features/<group_name>/batch', methods=['POST'])
+    def get_features_batch(group_name):
+        """
+        Versão POST da busca em lote, para listas de entidades grandes demais para a URL.
+
+        Body (JSON ou MessagePack): lista de entity_ids, ou
+            {"entity_ids": [...], "features": [...] (opcional)}
+        """
+        if group_name not in feature_groups:
+            return group_not_found(group_name)
+
+        payload = _parse_body()
+        requested_list = None
+        if isinstance(payload, dict):
+            requested_list = payload.get("features") or None
+            payload = payload.get("entity_ids")
+        if not payload or not isinstance(payload, list) or not all(isinstance(e, str) for e in payload) or (
+            requested_list is not None
+            and (not isinstance(requested_list, list) or not all(isinstance(f, str) for f in requested_list))
+        ):
+            return jsonify({
+                "error": "Expected a list of entity IDs or {\"entity_ids\": [...], \"features\": [...]}"
+            }), 400
+        if requested_list:
+            requested_list = list(dict.fromkeys(requested_list))
+
+        features = feature_store.get_online_features_bulk(group_name, payload, requested_list)
+        if features is None:
+            return jsonify({"error": "Online store not available"}), 503
+
         return jsonify(features)
     
     @app.route('/ingest/<group_name>/<entity_id>', methods=['POST'])
@@ -86,18 +249,26 @@ def create_app(feature_store: FeatureStore = None):
         """
         Ingere dados e computa features.
         
-        Body (JSON): Dados brutos para computar as features
+        Body (JSON ou MessagePack): Dados brutos para computar as features
         """
-        # Verificar se o grupo existe
-        if group_name not in feature_store.feature_groups:
-            return jsonify({
-                "error": f"Feature group '{group_name}' not found"
-            }), 404
+        if group_name not in feature_groups:
+            return group_not_found(group_name)
         
-        data = request.json
+        data = _parse_body()
         if not data:
             return jsonify({"error": "No data provided"}), 400
         
+        if INGEST_ASYNC:
+            try:
+                feature_store.ingest_async(group_name, entity_id, data)
+            except queue.Full:
+                return jsonify({"error": "Ingest queue is full, retry later"}), 503
+            return jsonify({
+                "status": "accepted",
+                "group_name": group_name,
+                "entity_id": entity_id
+            }), 202
+
         try:
             feature_store.ingest_features(group_name, entity_id, data)
             return jsonify({
@@ -114,26 +285,102 @@ def create_app(feature_store: FeatureStore = None):
                 "error": f"Internal server error: {str(e)}"
             }), 500
     
+    @app.route('/ingest_batch/<group_name>', methods=['POST'])
+    def ingest_batch(group_name):
+        """
+        Ingere um lote de entidades em uma única chamada.
+
+        Body (JSON ou MessagePack), em um dos formatos:
+            - colunar: {"entity_ids": [...], "columns": {"feature": [...], ...}}
+            - linhas: lista de registros {"entity_id": ..., "data": {...}}
+        """
+        if group_name not in feature_groups:
+            return group_not_found(group_name)
+
+        payload = _parse_body()
+        if not payload:
+            return jsonify({"error": "No data provided"}), 400
+
+        if isinstance(payload, dict):
+            entity_ids = payload.get("entity_ids")
+            columns = payload.get("columns")
+            if not isinstance(entity_ids, list) or not isinstance(columns, dict) or not all(
+                isinstance(values, list) for values in columns.values()
+            ):
+                return jsonify({
+                    "error": "Expected {\"entity_ids\": [...], \"columns\": {\"feature\": [...]}}"
+                }), 400
+            num_records = len(entity_ids)
+        elif isinstance(payload, list) and all(
+            isinstance(r, dict) and "entity_id" in r and isinstance(r.get("data"), dict)
+            for r in payload
+        ):
+            entity_ids, columns = None, payload
+            num_records = len(payload)
+        else:
+            return jsonify({
+                "error": "Expected a list of {\"entity_id\": ..., \"data\": {...}} records"
+            }), 400
+
+        try:
+            feature_store.ingest_features_batch(group_name, columns, entity_ids=entity_ids)
+            return jsonify({
+                "status": "success",
+                "group_name": group_name,
+                "num_records": num_records
+            }), 201
+        except ValueError as e:
+            return jsonify({
+                "error": f"Validation failed: {str(e)}"
+            }), 400
+        except Exception as e:
+            return jsonify({
+                "error": f"Internal server error: {str(e)}"
+            }), 500
+
     @app.route('/groups', methods=['GET'])
     def list_groups():
         """Lista todos os feature groups registrados"""
-        groups = []
-        for name, group in feature_store.feature_groups.items():
-            groups.append({
-                "name": name,
-                "entity": group.entity,
-                "description": group.description,
-                "num_features": len(group.features),
-                "created_at": group.created_at.isoformat()
-            })
-        return jsonify({"groups": groups})
+        def build():
+            groups = []
+            for name, group in feature_groups.items():
+                groups.append({
+                    "name": name,
+                    "entity": group.entity,
+                    "description": group.description,
+                    "num_features": len(group.features),
+                    "created_at": group.created_at.isoformat()
+                })
+            return {"groups": groups}
+        return cached_listing("groups", build)
     
     @app.route('/features', methods=['GET'])
     def list_all_features():
         """Lista todas as features registradas"""
-        features_list = []
-        for metadata in feature_store.list_features():
-            features_list.append({
+        def build():
+            features_list = []
+            for metadata in feature_store.list_features():
+                features_list.append({
+                    "name": metadata.name,
+                    "description": metadata.description,
+                    "type": metadata.feature_type.value,
+                    "entity": metadata.entity,
+                    "status": metadata.status.value,
+                    "owner": metadata.owner,
+                    "tags": metadata.tags,
+                    "version": metadata.version
+                })
+            return {"features": features_list}
+        return cached_listing("features", build)
+    
+    @app.route('/features/<entity>/<feature_name>/metadata', methods=['GET'])
+    def get_feature_info(entity, feature_name):
+        """Retorna metadados de uma feature específica"""
+        def build():
+            metadata = feature_store.get_feature_metadata(feature_name, entity)
+            if not metadata:
+                return None
+            return {
                 "name": metadata.name,
                 "description": metadata.description,
                 "type": metadata.feature_type.value,
@@ -141,31 +388,16 @@ def create_app(feature_store: FeatureStore = None):
                 "status": metadata.status.value,
                 "owner": metadata.owner,
                 "tags": metadata.tags,
-                "version": metadata.version
-            })
-        return jsonify({"features": features_list})
-    
-    @app.route('/features/<entity>/<feature_name>/metadata', methods=['GET'])
-    def get_feature_info(entity, feature_name):
-        """Retorna metadados de uma feature específica"""
-        metadata = feature_store.get_feature_metadata(feature_name, entity)
-        if not metadata:
+                "version": metadata.version,
+                "created_at": metadata.created_at.isoformat(),
+                "updated_at": metadata.updated_at.isoformat()
+            }
+        response = cached_listing(("metadata", entity, feature_name), build)
+        if response is None:
             return jsonify({
                 "error": f"Feature '{feature_name}' not found for entity '{entity}'"
             }), 404
-        
-        return jsonify({
-            "name": metadata.name,
-            "description": metadata.description,
-            "type": metadata.feature_type.value,
-            "entity": metadata.entity,
-            "status": metadata.status.value,
-            "owner": metadata.owner,
-            "tags": metadata.tags,
-            "version": metadata.version,
-            "created_at": metadata.created_at.isoformat(),
-            "updated_at": metadata.updated_at.isoformat()
-        })
+        return response
     
     return app
 
@@ -175,14 +407,20 @@ if __name__ == '__main__':
     print("\n" + "="*60)
     print("Feature Serving API")
     print("="*60)
-    print(f"Starting server on http://0.0.0.0:5000")
+    print(f"Starting server on http://0.0.0.0:{API_PORT}")
     print("\nAvailable endpoints:")
     print("  GET  /health")
     print("  GET  /groups")
     print("  GET  /features")
+    print("  GET  /features/<group_name>?entity_ids=<id1,id2,...>")
     print("  GET  /features/<group_name>/<entity_id>")
+    print("  POST /features/<group_name>/batch")
     print("  POST /ingest/<group_name>/<entity_id>")
+    print("  POST /ingest_batch/<group_name>")
     print("  GET  /features/<entity>/<feature_name>/metadata")
+    print("\nProduction: gunicorn -k gevent -w 4 'feature_serving_api:create_app()'")
     print("="*60 + "\n")
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Handlers bloqueiam no Redis/Parquet: uma thread por requisição evita que uma
+    # chamada lenta segure as demais
+    app.run(host='0.0.0.0', port=API_PORT, debug=True, threaded=True)
@@ -10,11 +10,30 @@ Esta versão inclui armazenamento online (Redis), offline (Parquet) e uma API RE
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional, Callable
+from typing import List, Dict, Any, Optional, Callable, Sequence, Set, Tuple, Union
 from datetime import datetime, timedelta
 from enum import Enum
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
+import ast
+import atexit
+import base64
+import inspect
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import uuid
+import weakref
+import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
 import pyarrow.parquet as pq
 import os
 
@@ -26,9 +45,162 @@ except ImportError:
 
 try:
     from flask import Flask, jsonify, request
+    from flask.json.provider import DefaultJSONProvider
 except ImportError:
     Flask = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+logger = logging.getLogger("feature_store")
+# FS_LOG_LEVEL (ex.: DEBUG, WARNING) fixa o nível do logger da biblioteca; sem ela, vale
+# a configuração de logging da aplicação
+if os.environ.get("FS_LOG_LEVEL"):
+    logger.setLevel(os.environ["FS_LOG_LEVEL"].upper())
+
+
+class _RepeatFilter(logging.Filter):
+    """
+    Limita mensagens repetidas a uma a cada `interval` segundos.
+
+    Mensagens com o mesmo texto-modelo e os mesmos argumentos (comparados pelo texto,
+    para que exceções iguais contem como repetição) são suprimidas: um erro que se
+    repete em todas as linhas de um lote não inunda o log, mas mensagens de outra
+    entidade ou com outro erro continuam passando. A próxima mensagem emitida informa
+    quantas foram suprimidas. Guarda no máximo `max_keys` mensagens distintas
+    (descartando as mais antigas). Só roda quando o nível da mensagem está habilitado.
+    """
+
+    def __init__(self, interval: float = 1.0, max_keys: int = 1024):
+        super().__init__()
+        self.interval = interval
+        self.max_keys = max_keys
+        self._seen: "OrderedDict[Tuple, List]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args if isinstance(record.args, tuple) else (record.args,)
+        key = (record.msg, tuple(str(arg) for arg in args))
+        now = time.monotonic()
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and now - seen[0] < self.interval:
+                seen[1] += 1
+                return False
+            suppressed = seen[1] if seen is not None else 0
+            self._seen[key] = [now, 0]
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+        if suppressed:
+            record.msg = f"{record.msg} (+{suppressed} repetidas suprimidas)"
+        return True
+
+
+def throttle_repeated_logs(interval: float = 1.0) -> Optional[logging.Filter]:
+    """
+    Ativa (ou, com `interval` <= 0, desativa) o limite de mensagens repetidas no logger
+    "feature_store": cada mensagem idêntica sai no máximo uma vez por `interval` segundos.
+
+    Desativado por padrão; também pode ser ativado pela variável de ambiente
+    FS_LOG_THROTTLE (segundos). Retorna o filtro instalado, ou None.
+    """
+    for installed in [f for f in logger.filters if isinstance(f, _RepeatFilter)]:
+        logger.removeFilter(installed)
+    if interval <= 0:
+        return None
+    repeat_filter = _RepeatFilter(interval)
+    logger.addFilter(repeat_filter)
+    return repeat_filter
+
+
+if os.environ.get("FS_LOG_THROTTLE"):
+    throttle_repeated_logs(float(os.environ["FS_LOG_THROTTLE"]))
+
+# Prefixo dos arquivos Parquet offline ainda abertos: nomes iniciados por "." são
+# ignorados pelo pyarrow.dataset (e por pd.read_parquet) ao ler o diretório
+_INPROGRESS_PREFIX = ".inprogress-"
+
+# Falha em uma transformação: registrada e a feature fica None na linha
+_COMPUTE_ERROR = "Erro ao computar feature '%s': %s"
+
+
+def _load_numba():
+    """Importa o numba sob demanda: o import é caro e só é necessário com jit=True."""
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba
+
+
+def make_njit_transform(fn: Callable, fastmath: bool = True) -> Optional[Callable]:
+    """
+    Compila uma função escalar numérica (ex.: `lambda spent, purchases: ...`) em um
+    kernel numba para `FeatureTransformation.numba_fn`.
+
+    O kernel é uma ufunc float64 com um argumento por parâmetro de `fn`, chamada como
+    `kernel(*fontes, out)` e escrevendo no array de saída pré-alocado. A compilação
+    vai para o cache em disco do numba (`cache=True`) quando `fn` vem de um arquivo.
+    `fastmath=True` supõe entradas sem NaN/inf. Retorna None sem o numba instalado,
+    e o lote segue pelo caminho escalar.
+    """
+    numba = _load_numba()
+    if numba is None:
+        return None
+    arity = len(inspect.signature(fn).parameters)
+    signature = [f"float64({', '.join(['float64'] * arity)})"]
+    try:
+        return numba.vectorize(signature, cache=True, fastmath=fastmath)(fn)
+    except RuntimeError:
+        # Funções sem arquivo de origem (REPL, exec) não podem ir para o cache em disco
+        return numba.vectorize(signature, fastmath=fastmath)(fn)
+
+
+def quantize_int8(vector: Sequence[float]) -> Tuple[np.ndarray, np.float32]:
+    """
+    Quantização simétrica de um embedding para int8: `codes = round(x / scale)`,
+    com `scale = max(|x|) / 127` (um por embedding, em FP32).
+
+    Retorna `(codes, scale)`; `dequantize_int8(codes, scale)` recupera o vetor com
+    erro máximo de `scale / 2` por componente. Supõe valores finitos.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    peak = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = np.float32(peak / 127) if peak > 0 else np.float32(1.0)
+    codes = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def dequantize_int8(codes: np.ndarray, scale: float) -> np.ndarray:
+    """Reconstrói em FP32 um embedding quantizado com `quantize_int8`."""
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+def _encode_int8(vector: Sequence[float]) -> str:
+    """Texto gravado online para embeddings com storage_dtype="int8": "<scale>:<códigos em base64>"."""
+    codes, scale = quantize_int8(vector)
+    return f"{scale}:{base64.b64encode(codes.tobytes()).decode('ascii')}"
+
+
+def decode_int8_embedding(value: Union[str, bytes]) -> np.ndarray:
+    """
+    Decodifica um embedding lido do armazenamento online (storage_dtype="int8").
+
+    Aceita o valor como str (decode_responses=True) ou bytes e retorna o vetor FP32.
+    """
+    if isinstance(value, bytes):
+        value = value.decode("ascii")
+    scale, payload = value.split(":", 1)
+    return dequantize_int8(np.frombuffer(base64.b64decode(payload), dtype=np.int8), float(scale))
+
+
+# Estatísticas do cache de transformações, no formato de functools.lru_cache
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
 
 class FeatureType(Enum):
     """Tipos de features"""
@@ -48,7 +220,7 @@ class FeatureStatus(Enum):
     ARCHIVED = "archived"
 
 
-@dataclass
+@dataclass(slots=True)
 class FeatureMetadata:
     """Metadados de uma feature"""
     name: str
@@ -63,26 +235,242 @@ class FeatureMetadata:
     version: str = "1.0.0"
     transformation: Optional['FeatureTransformation'] = None
     validation: Optional['FeatureValidation'] = None
+    # Precisão no armazenamento online: "float32" grava a menor representação decimal
+    # que identifica o valor em FP32 (ex.: 15208.333 em vez de 15208.333333333334);
+    # "int8" (embeddings) grava o vetor quantizado (ver quantize_int8 e
+    # decode_int8_embedding). O armazenamento offline mantém a precisão completa
+    storage_dtype: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FeatureTransformation:
-    """Define uma transformação para calcular a feature"""
+    """
+    Define uma transformação para calcular a feature.
+
+    `vectorized_fn` é uma versão colunar opcional: recebe {fonte: np.ndarray} e
+    retorna um array com um valor por entidade, usada na ingestão em lote. Em
+    `FeatureGroup.compute_all_batch` as fontes chegam como `pd.Series`, então a
+    função pode usar a API do pandas (ex.: `df["total_spent"] / df["total_purchases"].clip(lower=1)`).
+
+    Com `pure=True`, os resultados de `transformation_fn` são memoizados em um cache
+    LRU limitado a `cache_size` entradas, indexado pelos valores de `source_features`
+    (e seus tipos: `True`, `1` e `1.0` são entradas distintas): entradas repetidas
+    (re-ingestões, replays) não re-executam a função. Só declare `pure=True` para
+    funções que dependem apenas de `source_features`, sem efeitos colaterais nem
+    leitura de relógio/estado externo. O uso do cache pode ser acompanhado com
+    `cache_info()`.
+
+    Com `unpack_args=True`, `transformation_fn` recebe os valores de `source_features`
+    como argumentos posicionais (ex.: `fn(total_spent, total_purchases)`), extraídos com
+    um único `itemgetter`; todas as fontes precisam estar presentes nos dados.
+
+    `numba_fn` é um kernel numba já compilado (ex.: `make_njit_transform(fn)` ou uma
+    função `@njit`) chamado como `numba_fn(*fontes, out)`: recebe um array float64
+    contíguo por item de `source_features` e escreve o resultado em `out`, pré-alocado.
+
+    Com `jit=True` (requer `unpack_args` e o numba instalado), a função escalar é
+    compilada uma vez da mesma forma e usada como versão colunar quando não há
+    `vectorized_fn` nem `numba_fn`. Se o numba não estiver disponível ou a função não
+    compilar, o lote usa o caminho escalar normalmente.
+    """
     name: str
     description: str
     source_features: List[str]
     transformation_fn: Optional[Callable] = None
     sql_query: Optional[str] = None
+    vectorized_fn: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None
+    numba_fn: Optional[Callable] = None
+    cache_size: int = 10_000
+    unpack_args: bool = False
+    pure: bool = False
+    jit: bool = False
+    _cache: OrderedDict = field(default_factory=OrderedDict, init=False, repr=False, compare=False)
+    _cache_lock: Any = field(default_factory=threading.Lock, init=False, repr=False, compare=False)
+    _getter: Optional[Callable] = field(default=None, init=False, repr=False, compare=False)
+    _hits: int = field(default=0, init=False, repr=False, compare=False)
+    _misses: int = field(default=0, init=False, repr=False, compare=False)
+    _kernel: Any = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.jit and not self.unpack_args:
+            raise ValueError(f"Transformação '{self.name}': jit=True requer unpack_args=True.")
+        # itemgetter com uma chave só retorna o valor, e não uma tupla
+        if len(self.source_features) == 1:
+            source = self.source_features[0]
+            self._getter = lambda data: (data[source],)
+        elif self.source_features:
+            self._getter = itemgetter(*self.source_features)
 
+    def __call__(self, source_data: Dict[str, Any]) -> Any:
+        """Aplica a transformação, reutilizando o resultado quando as fontes não mudaram."""
+        # Sem fontes declaradas não há como saber do que a função depende
+        memoize = self.pure and self.cache_size > 0
+        if not self.source_features or (not memoize and not self.unpack_args):
+            return self.transformation_fn(source_data)
 
-@dataclass
+        try:
+            args = self._getter(source_data)
+        except KeyError:
+            if self.unpack_args:
+                raise
+            # Fonte ausente: sem cache, para não confundir "ausente" com um None explícito
+            return self.transformation_fn(source_data)
+
+        if not memoize:
+            return self._apply(source_data, args)
+
+        # O tipo entra na chave: True == 1 == 1.0 (mesmo hash), mas a função pode distingui-los
+        key = tuple((type(arg), arg) for arg in args)
+        try:
+            with self._cache_lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    return self._cache[key]
+                self._misses += 1
+        except TypeError:
+            # Valores não-hasheáveis (listas, embeddings): computar sem cache
+            return self._apply(source_data, args)
+
+        value = self._apply(source_data, args)
+        with self._cache_lock:
+            self._cache[key] = value
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def _apply(self, source_data: Dict[str, Any], args: tuple) -> Any:
+        if self.unpack_args:
+            return self.transformation_fn(*args)
+        return self.transformation_fn(source_data)
+
+    def batch_fn(self) -> Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]]:
+        """Versão colunar da transformação: `vectorized_fn`, `numba_fn` ou o kernel gerado com `jit`."""
+        if self.vectorized_fn is not None:
+            return self.vectorized_fn
+        if not self.source_features:
+            return None
+        if self.numba_fn is not None:
+            return self._kernel_call(self.numba_fn)
+        if not self.jit:
+            return None
+        if self._kernel is None:
+            self._kernel = self._compile_kernel() or False
+        return self._kernel or None
+
+    def _compile_kernel(self) -> Optional[Callable]:
+        try:
+            # Sem fastmath: o resultado precisa ser idêntico ao da função escalar
+            kernel = make_njit_transform(self.transformation_fn, fastmath=False)
+        except Exception as e:
+            logger.warning("Transformação '%s' não compilou com numba (%s); usando o caminho escalar.", self.name, type(e).__name__)
+            return None
+        return self._kernel_call(kernel) if kernel is not None else None
+
+    def _kernel_call(self, kernel: Callable) -> Callable[[Dict[str, np.ndarray]], np.ndarray]:
+        sources = list(self.source_features)
+
+        def run(arrays: Dict[str, np.ndarray]) -> np.ndarray:
+            inputs = [np.ascontiguousarray(arrays[source], dtype=np.float64) for source in sources]
+            out = np.empty(len(inputs[0]), dtype=np.float64)
+            kernel(*inputs, out)
+            return out
+        return run
+
+    def cache_info(self) -> CacheInfo:
+        """Acertos, faltas, tamanho máximo e tamanho atual do cache de resultados."""
+        with self._cache_lock:
+            maxsize = self.cache_size if self.pure else 0
+            return CacheInfo(self._hits, self._misses, maxsize, len(self._cache))
+
+    def clear_cache(self):
+        """Descarta os resultados memoizados e zera as estatísticas."""
+        with self._cache_lock:
+            self._cache.clear()
+            self._hits = self._misses = 0
+
+
+@dataclass(frozen=True, slots=True)
 class FeatureValidation:
-    """Regras de validação para a feature"""
+    """
+    Regras de validação para a feature.
+
+    Imutável: regras idênticas podem ser compartilhadas entre features. Prefira
+    `FeatureValidation.make(...)`, que devolve sempre a mesma instância para os
+    mesmos parâmetros. `allowed_values` é convertido uma vez em um frozenset
+    (`allowed_set`) para a verificação de pertinência em O(1); com valores
+    não-hasheáveis, a verificação percorre a sequência.
+    """
     min_value: Optional[float] = None
     max_value: Optional[float] = None
-    allowed_values: Optional[List[Any]] = None
+    allowed_values: Optional[Sequence[Any]] = None
     not_null: bool = True
     unique: bool = False
+    allowed_set: Optional[frozenset] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.allowed_values:
+            try:
+                # Frozen: o campo derivado só pode ser atribuído via object.__setattr__
+                object.__setattr__(self, "allowed_set", frozenset(self.allowed_values))
+            except TypeError:
+                pass
+
+    @classmethod
+    def make(
+        cls,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        allowed_values: Optional[Sequence[Any]] = None,
+        not_null: bool = True,
+        unique: bool = False
+    ) -> 'FeatureValidation':
+        """Retorna a instância compartilhada para estas regras (flyweight)."""
+        if allowed_values is not None:
+            allowed_values = tuple(allowed_values)
+        try:
+            return cls._interned(min_value, max_value, allowed_values, not_null, unique)
+        except TypeError:
+            # Valores permitidos não-hasheáveis: instância própria
+            return cls(min_value, max_value, allowed_values, not_null, unique)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _interned(cls, *args) -> 'FeatureValidation':
+        return cls(*args)
+
+    def compile(self) -> Callable[[np.ndarray], np.ndarray]:
+        """
+        Retorna o validador vetorizado destas regras: array numérico -> máscara dos
+        valores válidos (min/max/valores permitidos).
+
+        As comparações seguem as de `Feature._validate_value` (um NaN não viola
+        min/max). `not_null` não entra na máscara: arrays numéricos não têm None.
+        Regras iguais compartilham o mesmo validador.
+        """
+        try:
+            return _compiled_validator(self)
+        except TypeError:
+            # Valores permitidos não-hasheáveis: validador sem cache
+            return _compiled_validator.__wrapped__(self)
+
+
+@lru_cache(maxsize=None)
+def _compiled_validator(validation: FeatureValidation) -> Callable[[np.ndarray], np.ndarray]:
+    checks = []
+    if validation.min_value is not None:
+        checks.append(lambda array, bound=validation.min_value: ~(array < bound))
+    if validation.max_value is not None:
+        checks.append(lambda array, bound=validation.max_value: ~(array > bound))
+    if validation.allowed_values:
+        allowed = np.asarray(list(validation.allowed_values))
+        checks.append(lambda array: np.isin(array, allowed))
+
+    def validate(array: np.ndarray) -> np.ndarray:
+        if not checks:
+            return np.ones(len(array), dtype=bool)
+        return np.logical_and.reduce([check(array) for check in checks])
+    return validate
 
 
 class Feature:
@@ -98,14 +486,14 @@ class Feature:
     ):
         self.metadata = metadata
         self.transformation = transformation
-        self.validation = validation or FeatureValidation()
+        self.validation = validation or FeatureValidation.make()
     
     def compute(self, source_data: Dict[str, Any]) -> Any:
         """
         Computa o valor da feature para uma entidade específica.
         """
         if self.transformation and self.transformation.transformation_fn:
-            value = self.transformation.transformation_fn(source_data)
+            value = self.transformation(source_data)
         else:
             value = source_data.get(self.metadata.name)
         
@@ -116,31 +504,172 @@ class Feature:
     
     def _validate_value(self, value: Any) -> bool:
         """Valida o valor da feature"""
-        if value is None and self.validation.not_null:
+        validation = self.validation
+        if value is None:
+            return not validation.not_null
+        if validation.min_value is not None and value < validation.min_value:
             return False
-        
-        if value is not None:
-            if self.validation.min_value is not None and value < self.validation.min_value:
-                return False
-            if self.validation.max_value is not None and value > self.validation.max_value:
-                return False
-            if self.validation.allowed_values and value not in self.validation.allowed_values:
-                return False
-        
+        if validation.max_value is not None and value > validation.max_value:
+            return False
+        if validation.allowed_values:
+            allowed = validation.allowed_set
+            if allowed is not None:
+                try:
+                    return value in allowed
+                except TypeError:
+                    pass
+            return value in validation.allowed_values
         return True
 
 
+# Lambdas de transformação que podem ser embutidas no compute_all gerado: expressões
+# aritméticas/lógicas sobre as fontes, chamando no máximo estes builtins (baratos e
+# sem efeitos colaterais, então o cache de resultados não faz falta)
+_INLINE_BUILTINS = frozenset({"abs", "min", "max", "round", "float", "int", "bool", "len", "str"})
+_INLINE_NODES = (
+    ast.Name, ast.Load, ast.Constant, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare,
+    ast.IfExp, ast.Subscript, ast.Call, ast.operator, ast.unaryop, ast.boolop, ast.cmpop
+)
+# Caracteres após os quais o texto de uma lambda pode terminar
+_LAMBDA_ENDS = frozenset(",)]};\n")
+
+
+def _lambda_node(fn: Callable) -> Optional[ast.Lambda]:
+    """
+    Localiza no código-fonte o nó AST da lambda `fn`.
+
+    Tenta cada ocorrência de "lambda" nas linhas da função, do trecho mais longo que
+    compila como uma lambda para o mais curto, e só aceita o nó cujo bytecode é igual
+    ao de `fn` (várias lambdas na mesma linha, código fonte desatualizado). Retorna
+    None quando o fonte não está disponível ou nenhum trecho corresponde.
+    """
+    try:
+        source = "".join(inspect.getsourcelines(fn)[0])
+    except (OSError, TypeError):
+        return None
+    code = fn.__code__
+    start = source.find("lambda")
+    while start != -1:
+        ends = [i for i in range(len(source), start, -1) if i == len(source) or source[i] in _LAMBDA_ENDS]
+        for end in ends:
+            try:
+                tree = ast.parse(source[start:end], mode="eval")
+            except SyntaxError:
+                continue
+            if not isinstance(tree.body, ast.Lambda):
+                continue
+            compiled = next(c for c in compile(tree, "<lambda>", "eval").co_consts if inspect.iscode(c))
+            if (compiled.co_code, compiled.co_consts, compiled.co_names, compiled.co_varnames) == (
+                code.co_code, code.co_consts, code.co_names, code.co_varnames
+            ):
+                return tree.body
+            break
+        start = source.find("lambda", start + 1)
+    return None
+
+
+class _InlineRewriter(ast.NodeTransformer):
+    """Renomeia os parâmetros da lambda e troca `data["f"]` de features já computadas pela variável local."""
+
+    def __init__(self, params: Dict[str, str], computed: Dict[str, str], data_param: Optional[str]):
+        self.params = params
+        self.computed = computed
+        self.data_param = data_param
+
+    def visit_Subscript(self, node):
+        if (
+            isinstance(node.value, ast.Name) and node.value.id == self.data_param
+            and isinstance(node.slice, ast.Constant) and node.slice.value in self.computed
+        ):
+            return ast.Name(id=self.computed[node.slice.value], ctx=ast.Load())
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id in self.params:
+            return ast.Name(id=self.params[node.id], ctx=node.ctx)
+        return node
+
+
+def _inline_lambda(transformation: 'FeatureTransformation', index: int, computed: Dict[str, str]) -> Optional[Tuple[List[str], str]]:
+    """
+    Traduz a lambda de `transformation` para código do compute_all gerado.
+
+    Retorna (atribuições prévias, expressão), a ser avaliada com `data` (o dict de
+    trabalho) e as variáveis `v<j>` das features já computadas (`computed`: nome ->
+    variável). Em `unpack_args`, as fontes são lidas antes da expressão, como faz o
+    itemgetter. Qualquer coisa fora do subconjunto suportado (funções nomeadas,
+    closures, defaults, globais, chamadas que não sejam builtins simples, fonte
+    indisponível) retorna None, e a transformação é chamada normalmente.
+    """
+    fn = transformation.transformation_fn
+    code = getattr(fn, "__code__", None)
+    if (
+        code is None or fn.__name__ != "<lambda>" or code.co_freevars
+        or fn.__defaults__ or fn.__kwdefaults__
+    ):
+        return None
+    node = _lambda_node(fn)
+    if node is None:
+        return None
+    args = node.args
+    if args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg:
+        return None
+    params = [arg.arg for arg in args.args]
+    expected = len(transformation.source_features) if transformation.unpack_args else 1
+    if len(params) != expected:
+        return None
+    for sub in ast.walk(node.body):
+        if not isinstance(sub, _INLINE_NODES):
+            return None
+        if isinstance(sub, ast.Name) and sub.id not in params and (
+            sub.id not in _INLINE_BUILTINS or sub.id in fn.__globals__
+        ):
+            return None
+        if isinstance(sub, ast.Call) and not (isinstance(sub.func, ast.Name) and sub.func.id in _INLINE_BUILTINS):
+            return None
+
+    prelude = []
+    if transformation.unpack_args:
+        mapping = {}
+        for k, (param, source) in enumerate(zip(params, transformation.source_features)):
+            local = f"a{index}_{k}"
+            mapping[param] = local
+            prelude.append(f"{local} = {computed[source] if source in computed else f'data[{source!r}]'}")
+        rewriter = _InlineRewriter(mapping, {}, None)
+    else:
+        rewriter = _InlineRewriter({params[0]: "data"}, computed, params[0])
+    return prelude, ast.unparse(rewriter.visit(node.body))
+
+
 class FeatureGroup:
     """
     Agrupa features relacionadas que são computadas juntas.
+
+    Por padrão, uma transformação que levanta exceção é registrada no log e a
+    feature fica None na linha; com `strict=True` a exceção é propagada (falhas de
+    validação sempre levantam ValueError).
     """
+
+    # Linhas por bloco em compute_all_batch (None: o DataFrame inteiro de uma vez)
+    batch_tile_rows: Optional[int] = None
     
-    def __init__(self, name: str, entity: str, description: str, features: Optional[List] = None):
+    def __init__(self, name: str, entity: str, description: str, features: Optional[List] = None, strict: bool = False):
         self.name = name
-        self.entity = entity
+        # Internado, assim como a entidade e o nome de cada feature adicionada: as
+        # comparações e buscas por esses nomes acertam pela identidade do objeto
+        self.entity = sys.intern(entity)
         self.description = description
         self.features: Dict[str, Feature] = {}
         self.created_at = datetime.now()
+        # Ordem topológica das features, calculada sob demanda e invalidada em add_feature
+        self._exec_plan: Optional[List[Feature]] = None
+        # Nomes dos campos do hash online já codificados (evita encode a cada HSET)
+        self._field_keys: Optional[Dict[str, bytes]] = None
+        # compute_all especializado para o esquema atual (gerado em _compile_compute_all)
+        self._compute_fn: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+        # Incrementado a cada add_feature (ver FeatureStore.registry_version)
+        self._version = 0
+        self._strict = strict
         
         # Adicionar features se fornecidas (suporta tanto Feature quanto FeatureMetadata)
         if features:
@@ -157,126 +686,1480 @@ class FeatureGroup:
                 else:
                     raise TypeError(f"Esperado Feature ou FeatureMetadata, recebido {type(feature)}")
     
+    @property
+    def strict(self) -> bool:
+        """Propagar exceções das transformações em vez de registrá-las no log."""
+        return self._strict
+
+    @strict.setter
+    def strict(self, value: bool):
+        self._strict = value
+        # O compute_all gerado embute o tratamento de erros
+        self._compute_fn = None
+
     def add_feature(self, feature: Feature):
         """Adiciona uma feature ao grupo"""
-        if feature.metadata.entity != self.entity:
+        metadata = feature.metadata
+        metadata.entity = sys.intern(metadata.entity)
+        if metadata.entity != self.entity:
             raise ValueError(
-                f"Feature entity \'{feature.metadata.entity}\' não corresponde "
+                f"Feature entity \'{metadata.entity}\' não corresponde "
                 f"ao entity do grupo \'{self.entity}\'"
             )
-        self.features[feature.metadata.name] = feature
+        metadata.name = sys.intern(metadata.name)
+        self.features[metadata.name] = feature
+        self._exec_plan = None
+        self._field_keys = None
+        self._compute_fn = None
+        self._version += 1
+
+    def field_keys(self) -> Dict[str, bytes]:
+        """Nomes das features e colunas de controle codificados em UTF-8 para o Redis."""
+        if self._field_keys is None:
+            names = list(self.features) + ["entity_id", "timestamp"]
+            self._field_keys = {name: name.encode("utf-8") for name in names}
+        return self._field_keys
+
+    def execution_plan(self) -> List[Feature]:
+        """
+        Retorna as features em ordem topológica (dependências antes de dependentes).
+
+        Uma feature depende de outra do grupo quando o nome desta aparece em
+        `source_features` da sua transformação; referências à própria feature contam
+        como dado bruto. O plano é calculado uma vez (algoritmo de Kahn, preservando a
+        ordem de declaração entre features independentes) e reutilizado até a próxima
+        chamada de `add_feature`. Ciclos levantam ValueError.
+        """
+        if self._exec_plan is not None:
+            return self._exec_plan
+
+        dependents: Dict[str, List[str]] = {name: [] for name in self.features}
+        in_degree = {name: 0 for name in self.features}
+        for name, feature in self.features.items():
+            if feature.transformation:
+                for source in dict.fromkeys(feature.transformation.source_features):
+                    if source != name and source in self.features:
+                        dependents[source].append(name)
+                        in_degree[name] += 1
+
+        ready = [name for name in self.features if in_degree[name] == 0]
+        plan = []
+        while ready:
+            name = ready.pop(0)
+            plan.append(self.features[name])
+            for dependent in dependents[name]:
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    ready.append(dependent)
+
+        if len(plan) != len(self.features):
+            cycle = [name for name, degree in in_degree.items() if degree > 0]
+            raise ValueError(
+                f"Dependência cíclica entre features do grupo \'{self.name}\': {', '.join(cycle)}"
+            )
+
+        self._exec_plan = plan
+        return plan
     
     def compute_all(self, source_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Computa todas as features do grupo para uma entidade"""
+        """
+        Computa todas as features do grupo para uma entidade.
+
+        As features são avaliadas na ordem do plano de execução; cada valor computado
+        fica disponível para as transformações seguintes que o usam como fonte.
+        A avaliação usa uma função gerada para o esquema do grupo (ver
+        `_compile_compute_all`), recompilada quando uma feature é adicionada.
+        """
+        if self._compute_fn is None:
+            self._compute_fn = self._compile_compute_all()
+        return self._compute_fn(source_data)
+
+    def _compile_compute_all(self) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Gera, via `exec`, uma versão de compute_all especializada para este grupo.
+
+        O laço genérico (Feature.compute + _validate_value) é desenrolado na ordem do
+        plano de execução: cada regra de validação vira uma comparação direta contra
+        constantes e cada transformação é chamada por um nome ligado no namespace da
+        função, sem consultar metadados durante a ingestão. A semântica é a mesma do
+        caminho genérico, inclusive as mensagens de erro.
+
+        Lambdas simples (ver `_inline_lambda`) têm o corpo copiado para a função
+        gerada, sem a chamada nem o cache da transformação; leituras de features já
+        computadas viram variáveis locais. As demais transformações são chamadas pelo
+        objeto FeatureTransformation.
+        """
+        namespace: Dict[str, Any] = {"logger": logger, "compute_error": _COMPUTE_ERROR}
+        lines = ["def _compute_all(source_data):", "    data = dict(source_data)"]
+        computed: Dict[str, str] = {}
+        for i, feature in enumerate(self.execution_plan()):
+            name = feature.metadata.name
+            validation = feature.validation
+            v = f"v{i}"
+            namespace[f"name{i}"] = name
+            namespace[f"invalid{i}"] = f"Valor inválido para feature '{name}': "
+            namespace[f"failed{i}"] = f"Validation failed for feature {name}: "
+
+            lines.append("    try:")
+            if feature.transformation and feature.transformation.transformation_fn:
+                inlined = _inline_lambda(feature.transformation, i, computed)
+                if inlined is not None:
+                    prelude, expression = inlined
+                    lines += [f"        {line}" for line in prelude]
+                    lines.append(f"        {v} = {expression}")
+                else:
+                    namespace[f"transform{i}"] = feature.transformation
+                    lines.append(f"        {v} = transform{i}(data)")
+            else:
+                lines.append(f"        {v} = data.get(name{i})")
+
+            checks = []
+            if validation.min_value is not None:
+                namespace[f"min{i}"] = validation.min_value
+                checks.append(f"{v} < min{i}")
+            if validation.max_value is not None:
+                namespace[f"max{i}"] = validation.max_value
+                checks.append(f"{v} > max{i}")
+            if validation.allowed_values:
+                namespace[f"allowed{i}"] = validation.allowed_values
+                if validation.allowed_set is not None:
+                    # Como em _validate_value: valores não hasheáveis (ex.: listas) não
+                    # cabem no frozenset e são comparados com a lista de valores
+                    namespace[f"allowed_set{i}"] = validation.allowed_set
+                    lines += [
+                        "        try:",
+                        f"            disallowed{i} = {v} not in allowed_set{i}",
+                        "        except TypeError:",
+                        f"            disallowed{i} = {v} not in allowed{i}",
+                    ]
+                    checks.append(f"disallowed{i}")
+                else:
+                    checks.append(f"{v} not in allowed{i}")
+            raise_invalid = f'raise ValueError(f"{{invalid{i}}}{{{v}}}")'
+            if validation.not_null:
+                lines.append(f"        if {v} is None:")
+                lines.append(f"            {raise_invalid}")
+                if checks:
+                    lines.append(f"        if {' or '.join(checks)}:")
+                    lines.append(f"            {raise_invalid}")
+            elif checks:
+                lines.append(f"        if {v} is not None and ({' or '.join(checks)}):")
+                lines.append(f"            {raise_invalid}")
+
+            lines += [
+                "    except ValueError as e:",
+                f'        raise ValueError(f"{{failed{i}}}{{str(e)}}")',
+            ]
+            if not self._strict:
+                lines += [
+                    "    except Exception as e:",
+                    f"        logger.exception(compute_error, name{i}, e)",
+                    f"        {v} = None",
+                ]
+            lines.append(f"    data[name{i}] = {v}")
+            computed[name] = v
+
+        # Manter a ordem de declaração nas colunas de saída
+        plan_index = {feature.metadata.name: i for i, feature in enumerate(self.execution_plan())}
+        items = ", ".join(f"name{plan_index[name]}: v{plan_index[name]}" for name in self.features)
+        lines.append(f"    return {{{items}}}")
+
+        code = compile("\n".join(lines), f"<compute_all:{self.name}>", "exec")
+        exec(code, namespace)
+        return namespace["_compute_all"]
+
+    def compute_batch(self, columns: Dict[str, Any], index: Optional[pd.Index] = None) -> Dict[str, List[Any]]:
+        """
+        Computa todas as features do grupo para um lote de entidades em formato colunar.
+
+        `columns` mapeia cada campo bruto para uma sequência com um valor por entidade.
+        Transformações com `vectorized_fn` (ou `jit`) executam uma única vez sobre arrays NumPy;
+        as demais caem no caminho escalar, linha a linha, com a mesma semântica de
+        `compute_all` (inclusive a ordem do plano de execução). Uma falha da versão
+        vetorizada (exceção ou shape errado) é registrada no log e a feature volta ao
+        caminho escalar; em grupos `strict`, ou sem `transformation_fn`, o erro é propagado. Com `index`, `vectorized_fn` recebe as colunas como
+        `pd.Series` (sem cópia) nesse índice; os kernels `jit` continuam recebendo arrays.
+        """
+        num_rows = len(next(iter(columns.values()), []))
+        columns = dict(columns)
+        arrays = None
+        series = None
+        rows = None
         results = {}
-        for feature_name, feature in self.features.items():
-            try:
-                results[feature_name] = feature.compute(source_data)
-            except ValueError as e:
-                # Re-raise validation errors
-                raise ValueError(f"Validation failed for feature {feature_name}: {str(e)}")
-            except Exception as e:
-                print(f"Erro ao computar feature \'{feature_name}\': {e}")
-                results[feature_name] = None
-        return results
+        for feature in self.execution_plan():
+            feature_name = feature.metadata.name
+            transformation = feature.transformation
+            values = None
+            array = None
+
+            batch_fn = transformation.batch_fn() if transformation else None
+            if batch_fn is not None:
+                if arrays is None:
+                    arrays = {k: np.asarray(v) for k, v in columns.items()}
+                inputs = arrays
+                if index is not None and transformation.vectorized_fn is not None:
+                    if series is None:
+                        series = {k: pd.Series(v, index=index, copy=False) for k, v in arrays.items()}
+                    inputs = series
+                try:
+                    output = np.asarray(batch_fn(inputs))
+                    if output.shape != (num_rows,):
+                        raise ValueError(f"saída vetorizada com shape {output.shape}, esperado ({num_rows},)")
+                    values = output.tolist()
+                    array = output
+                except Exception as e:
+                    # Sem transformation_fn não há caminho escalar: a coluna bruta
+                    # esconderia o erro real
+                    if self._strict or not transformation.transformation_fn:
+                        raise
+                    logger.exception(_COMPUTE_ERROR, feature_name, e)
+
+            if values is None and transformation and transformation.transformation_fn:
+                if rows is None:
+                    keys = list(columns.keys())
+                    rows = [dict(zip(keys, row)) for row in zip(*columns.values())]
+                values = []
+                for row in rows:
+                    try:
+                        values.append(transformation(row))
+                    except Exception as e:
+                        if self._strict:
+                            raise
+                        logger.exception(_COMPUTE_ERROR, feature_name, e)
+                        values.append(None)
+            elif values is None:
+                values = list(columns.get(feature_name, [None] * num_rows))
+                if arrays is not None:
+                    array = arrays.get(feature_name)
+
+            self._validate_column(feature, values, array)
+            results[feature_name] = values
+
+            # Disponibilizar a coluna computada para as features seguintes do plano
+            columns[feature_name] = values
+            if arrays is not None:
+                arrays[feature_name] = np.asarray(values)
+            if series is not None:
+                series[feature_name] = pd.Series(arrays[feature_name], index=index, copy=False)
+            if rows is not None:
+                for row, value in zip(rows, values):
+                    row[feature_name] = value
+        return {name: results[name] for name in self.features}
+
+    def compute_all_batch(self, source_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Versão de `compute_batch` para DataFrames: uma linha por entidade.
+
+        As colunas são repassadas como arrays NumPy (sem cópia), e `vectorized_fn`
+        as recebe como `pd.Series` no índice de `source_df`: cada transformação roda
+        em uma única operação por coluna, com a API do pandas disponível. Retorna um
+        DataFrame com uma coluna por feature, no mesmo índice de `source_df`.
+
+        Com `batch_tile_rows`, as linhas são processadas em blocos desse tamanho e
+        todas as features de um bloco são computadas antes do próximo: as colunas
+        do bloco (fontes e features intermediárias) continuam no cache da CPU entre
+        uma feature e outra. Cada bloco é computado isoladamente, então só vale para
+        transformações linha a linha (sem agregações sobre a coluna inteira).
+        """
+        columns = {name: source_df[name].to_numpy() for name in source_df.columns}
+        tile = self.batch_tile_rows
+        if not tile or len(source_df) <= tile:
+            return pd.DataFrame(self.compute_batch(columns, index=source_df.index), index=source_df.index)
+
+        results: Dict[str, List[Any]] = {name: [] for name in self.features}
+        for start in range(0, len(source_df), tile):
+            # Fatias de arrays NumPy são views: nenhum bloco copia as fontes
+            computed = self.compute_batch(
+                {name: column[start:start + tile] for name, column in columns.items()},
+                index=source_df.index[start:start + tile]
+            )
+            for name, values in computed.items():
+                results[name].extend(values)
+        return pd.DataFrame(results, index=source_df.index)
+
+    @staticmethod
+    def _validate_column(feature: Feature, values: List[Any], array: Optional[np.ndarray] = None):
+        """
+        Valida uma coluna inteira, rejeitando o lote no primeiro valor inválido.
+
+        Colunas numéricas (sem None) são validadas com uma única máscara NumPy
+        (`FeatureValidation.compile`); colunas categóricas com `allowed_values`
+        hasheáveis (e sem min/max), com uma única busca em hash do pandas (`isin`).
+        As demais caem na validação valor a valor. O resultado é o mesmo de
+        `Feature._validate_value` aplicado a cada linha.
+        """
+        validation = feature.validation
+        has_range = validation.min_value is not None or validation.max_value is not None
+
+        bad_index = None
+        if not has_range and not validation.allowed_values:
+            if validation.not_null:
+                bad_index = next((i for i, value in enumerate(values) if value is None), None)
+        else:
+            if array is None or array.shape != (len(values),):
+                try:
+                    array = np.asarray(values)
+                except ValueError:
+                    # Listas de tamanhos diferentes: sem representação em array
+                    array = None
+            per_value = array is None or array.shape != (len(values),)
+            if not per_value and array.dtype.kind not in "iuf" and not has_range and validation.allowed_set is not None:
+                column = pd.Series(array, dtype=object, copy=False)
+                try:
+                    valid = column.isin(validation.allowed_set).to_numpy(copy=True)
+                except TypeError:
+                    # Valores não hasheáveis (ex.: listas): validados um a um
+                    per_value = True
+                else:
+                    # None não passa pela lista de valores permitidos (ver _validate_value)
+                    for i in np.flatnonzero(column.isna().to_numpy()):
+                        if values[i] is None:
+                            valid[i] = not validation.not_null
+                    invalid = np.flatnonzero(~valid)
+                    bad_index = int(invalid[0]) if invalid.size else None
+            elif not per_value and array.dtype.kind in "iuf":
+                # Sem None em colunas numéricas: not_null já está garantido
+                invalid = np.flatnonzero(~validation.compile()(array))
+                bad_index = int(invalid[0]) if invalid.size else None
+            else:
+                per_value = True
+            if per_value:
+                # Valores aninhados (listas viram um array 2-D) ou não numéricos
+                bad_index = next(
+                    (i for i, value in enumerate(values) if not feature._validate_value(value)), None
+                )
+
+        if bad_index is not None:
+            feature_name = feature.metadata.name
+            raise ValueError(
+                f"Validation failed for feature {feature_name}: "
+                f"Valor inválido para feature \'{feature_name}\': {values[bad_index]}"
+            )
+
+
+class OnlineReadBatcher:
+    """
+    Agrupa leituras online concorrentes em um único pipeline Redis.
+
+    Threads de requisição enfileiram suas leituras e aguardam um Future; uma thread
+    de fundo drena a fila (até `max_batch` leituras, esperando no máximo
+    `max_wait_ms` por mais itens depois do primeiro) e envia todos os HGETALL/HMGET
+    de uma vez. Com `max_wait_ms=0` nenhuma latência é adicionada: só são agrupadas
+    as leituras que chegaram enquanto o pipeline anterior estava em voo.
+    """
+
+    def __init__(self, client, feature_groups: Dict[str, 'FeatureGroup'], max_batch: int = 128, max_wait_ms: float = 0.0):
+        # Sem referência à FeatureStore: a thread não a mantém viva
+        self.client = client
+        self.feature_groups = feature_groups
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="online-read-batcher", daemon=True)
+        self._thread.start()
+
+    def get(self, group_name: str, entity_id: str, features: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Lê as features de uma entidade, compartilhando o round trip com leituras concorrentes."""
+        future: Future = Future()
+        self._queue.put((group_name, entity_id, features, future))
+        return future.result()
+
+    def close(self):
+        """Encerra a thread de fundo depois de atender as leituras pendentes."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._execute(batch)
+                    return
+                batch.append(item)
+            self._execute(batch)
+
+    def _execute(self, batch):
+        pipe = self.client.pipeline(transaction=False)
+        for group_name, entity_id, features, _ in batch:
+            online_key = f"{group_name}:{entity_id}"
+            if features:
+                pipe.hmget(online_key, FeatureStore._feature_fields(self.feature_groups.get(group_name), features))
+            else:
+                pipe.hgetall(online_key)
+        try:
+            results = pipe.execute()
+        except Exception as e:
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        for (_, _, features, future), result in zip(batch, results):
+            if features:
+                result = {name: value for name, value in zip(features, result) if value is not None}
+            future.set_result(result)
+
+
+# Tipo Arrow de cada FeatureType nas tabelas offline, quando não depende dos valores
+# (timestamps e embeddings podem chegar em formatos diferentes e são sempre inferidos).
+# Categóricas de texto são gravadas com dicionário: poucos valores distintos, repetidos
+# em muitas linhas
+_ARROW_TYPES = {
+    FeatureType.NUMERICAL: pa.float64(),
+    FeatureType.BOOLEAN: pa.bool_(),
+    FeatureType.CATEGORICAL: pa.dictionary(pa.int32(), pa.string()),
+    FeatureType.TEXT: pa.string(),
+}
 
 
 class FeatureStore:
     """
     Feature Store - Sistema centralizado para gerenciamento de features.
     """
+
+    # Instâncias compartilhadas por (name, redis_host, redis_port, offline_store_path)
+    _shared_instances: "weakref.WeakValueDictionary" = weakref.WeakValueDictionary()
+    _shared_lock = threading.Lock()
+
+    # Entidades por round trip na escrita online em lote
+    online_pipeline_chunk = 1000
+    # Janelas de get_historical_features mantidas em memória (0 desativa o cache)
+    historical_cache_size = 8
+    # Codec dos arquivos Parquet offline (zstd: bem menor que snappy, leitura tão rápida;
+    # para snappy, que não tem níveis, use offline_compression_level = None)
+    offline_compression = "zstd"
+    offline_compression_level = 3
+    # Linhas por row group e bytes por página dos arquivos offline: um flush de até
+    # `offline_row_group_size` linhas vira um único row group, em vez de vários pequenos
+    offline_row_group_size = 64 * 1024
+    offline_data_page_size = 1 << 20
+    # Ingestão assíncrona (ingest_async): itens por lote do worker e espera máxima
+    # (segundos) para completar um lote
+    ingest_batch_size = 1000
+    ingest_batch_wait = 0.05
     
-    def __init__(self, name: str, redis_host: str = 'localhost', redis_port: int = 6379, offline_store_path: str = './offline_store'):
+    def __init__(
+        self,
+        name: str,
+        redis_host: str = 'localhost',
+        redis_port: int = 6379,
+        offline_store_path: str = './offline_store',
+        offline_flush_rows: int = 10_000,
+        offline_flush_interval: float = 5.0,
+        redis_pool_size: Optional[int] = None,
+        online_json_payload: bool = False,
+        online_read_batch_ms: Optional[float] = None,
+        online_ttl: Optional[int] = None,
+        ingest_queue_size: int = 100_000,
+        offline_backend: str = "parquet",
+        online_store_client=None
+    ):
+        if offline_backend not in ("parquet", "memory"):
+            raise ValueError(f"offline_backend inválido: '{offline_backend}' (use 'parquet' ou 'memory').")
         self.name = name
         self.feature_groups: Dict[str, FeatureGroup] = {}
         self.created_at = datetime.now()
 
-        if redis:
-            self.online_store = redis.Redis(host=redis_host, port=redis_port, db=0, decode_responses=True)
+        self._redis_pool = None
+        if online_store_client is not None:
+            # Cliente já pronto (ex.: um mock nos testes): usado no lugar de abrir um pool
+            self.online_store = online_store_client
+        elif redis:
+            # Pool compartilhado entre as threads do servidor (e seus pipelines): com
+            # todas as conexões em uso, a requisição espera uma ser devolvida em vez de
+            # abrir conexões novas. Tamanho via `redis_pool_size` ou REDIS_POOL_SIZE.
+            if redis_pool_size is None:
+                redis_pool_size = int(os.environ.get("REDIS_POOL_SIZE", "64"))
+            self._redis_pool = redis.BlockingConnectionPool(
+                host=redis_host,
+                port=redis_port,
+                db=0,
+                max_connections=redis_pool_size,
+                decode_responses=True
+            )
+            self.online_store = redis.Redis(connection_pool=self._redis_pool)
         else:
             self.online_store = None
-            print("Aviso: Redis não está instalado. O armazenamento online estará desativado.")
+            logger.warning("Redis não está instalado. O armazenamento online estará desativado.")
 
         self.offline_store_path = offline_store_path
-        os.makedirs(self.offline_store_path, exist_ok=True)
+        # Com offline_backend="memory" (testes), os flushes guardam as tabelas Arrow
+        # em memória em vez de gravar Parquet, e get_historical_features lê delas:
+        # nada toca o disco e offline_store_path não é criado
+        self.offline_backend = offline_backend
+        self._memory_tables: Dict[str, List[pa.Table]] = {}
+        if offline_backend == "parquet":
+            os.makedirs(self.offline_store_path, exist_ok=True)
+
+        # Incrementado a cada mudança no registro (ver registry_version)
+        self._registry_version = 0
+        # Índices (entity, nome) -> Feature e entity -> [metadados], refeitos quando registry_version muda
+        self._feature_index: Tuple[Optional[int], Dict[Tuple[str, str], Feature], Dict[str, List[FeatureMetadata]]] = (None, {}, {})
+
+        # Com online_json_payload, cada ingestão também grava "<grupo>:<entidade>:json"
+        # com a linha já serializada, servida sem decodificar o hash (get_online_features_json)
+        self.online_json_payload = online_json_payload
+        # Expiração (segundos) das chaves online; None mantém as chaves até a próxima escrita
+        self.online_ttl = online_ttl
+
+        # Com online_read_batch_ms, leituras concorrentes de get_online_features são
+        # agrupadas em um pipeline por janela (ver OnlineReadBatcher)
+        self._read_batcher = None
+        if online_read_batch_ms is not None and self.online_store:
+            self._read_batcher = OnlineReadBatcher(
+                self.online_store, self.feature_groups, max_wait_ms=online_read_batch_ms
+            )
+
+        # Buffer de escrita offline por grupo: as linhas são gravadas em lote (um
+        # arquivo por partição) ao atingir `offline_flush_rows` linhas ou quando a mais
+        # antiga passa de `offline_flush_interval` segundos; leituras e o fim do
+        # processo também esvaziam o buffer. Os flushes disparados pela ingestão rodam
+        # em uma thread de fundo: a requisição espera só pelo Redis
+        self.offline_flush_rows = offline_flush_rows
+        self.offline_flush_interval = offline_flush_interval
+        # Colunar (SoA): {grupo: {coluna: [valores]}}, pronto para virar tabela Arrow
+        self._offline_buffer: Dict[str, Dict[str, List[Any]]] = {}
+        self._offline_buffer_since: Dict[str, float] = {}
+        self._offline_lock = threading.RLock()
+        # Serializa as escritas em disco (flush/close), separado do lock do buffer para
+        # que a ingestão não espere por um flush em andamento
+        self._offline_write_lock = threading.RLock()
+        # Um único worker: flushes em ordem, sem disputa pelos mesmos arquivos
+        self._offline_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-offline")
+        self._offline_pending: Dict[str, Future] = {}
+        # Schema Arrow por grupo, inferido no primeiro flush e reutilizado nos seguintes:
+        # {grupo: (versão do grupo, schema)}
+        self._arrow_schemas: Dict[str, Tuple[int, pa.Schema]] = {}
+        # Arquivo Parquet aberto por partição: {(grupo, data): ParquetWriter}. Enquanto
+        # aberto (sem footer), o arquivo tem um nome oculto (ver _INPROGRESS_PREFIX)
+        self._offline_writers: Dict[Tuple[str, str], pq.ParquetWriter] = {}
+        # Partições cujo diretório já foi criado: abrir um arquivo novo nelas não
+        # repete o makedirs (stat por nível do caminho)
+        self._known_partitions: Set[Tuple[str, str]] = set()
+        # Incrementado quando arquivos de um grupo são finalizados (novos dados legíveis)
+        self._offline_generation: Dict[str, int] = {}
+        # Leituras históricas recentes: {(grupo, início, fim, colunas, filtro): (assinatura, tabela Arrow)}
+        self._historical_cache: "OrderedDict[Tuple, Tuple[Any, pa.Table]]" = OrderedDict()
+
+        # Fila da ingestão assíncrona, drenada em lotes por uma thread de fundo criada
+        # no primeiro ingest_async (ver _ingest_worker)
+        self._ingest_queue: "queue.Queue" = queue.Queue(maxsize=ingest_queue_size)
+        self._ingest_thread: Optional[threading.Thread] = None
+        self._ingest_start_lock = threading.Lock()
+        self._ingest_closed = False
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    @classmethod
+    def shared(cls, name: str, redis_host: str = 'localhost', redis_port: int = 6379, offline_store_path: str = './offline_store') -> 'FeatureStore':
+        """
+        Retorna a instância já existente para esta configuração, ou cria uma nova.
+
+        Evita reabrir a conexão com o Redis e reinicializar o armazenamento offline
+        quando scripts ou testes no mesmo processo pedem a mesma Feature Store. As
+        instâncias são mantidas por referência fraca: deixam o cache quando não são
+        mais usadas. O construtor continua criando sempre uma instância nova.
+        """
+        key = (name, redis_host, redis_port, os.path.abspath(offline_store_path))
+        with cls._shared_lock:
+            instance = cls._shared_instances.get(key)
+            if instance is None:
+                instance = cls(name, redis_host=redis_host, redis_port=redis_port, offline_store_path=offline_store_path)
+                cls._shared_instances[key] = instance
+            return instance
+
+    def close(self):
+        """
+        Grava tudo o que está pendente e libera os recursos de fundo.
+
+        Aguarda os flushes em andamento, esvazia o buffer offline, finaliza os
+        arquivos Parquet abertos e encerra o agrupador de leituras. A store continua
+        utilizável depois (as escritas offline e as de ingest_async passam a ser feitas
+        na própria thread), mas deixa de ser devolvida por `shared()`. Também usado
+        como context manager.
+        """
+        with self._ingest_start_lock:
+            # Um segundo close() não enfileira outro sentinela (sem worker para consumi-lo);
+            # o put bloqueia só enquanto a fila está cheia: o worker não usa o lock
+            if self._ingest_thread is not None and not self._ingest_closed:
+                self._ingest_queue.put(None)
+            self._ingest_closed = True
+            thread = self._ingest_thread
+        if thread is not None:
+            thread.join()
+        self._offline_executor.shutdown(wait=True)
+        if self._read_batcher is not None:
+            self._read_batcher.close()
+            self._read_batcher = None
+        self.flush(close=True)
+        with self._shared_lock:
+            for key, instance in list(self._shared_instances.items()):
+                if instance is self:
+                    del self._shared_instances[key]
+
+    def __enter__(self) -> 'FeatureStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def register_feature_group(self, feature_group: FeatureGroup) -> bool:
         """Registra um grupo de features"""
         if feature_group.name in self.feature_groups:
-            print(f"⚠ Feature Group \'{feature_group.name}\' já está registrado")
+            logger.warning("Feature Group '%s' já está registrado", feature_group.name)
             return False
+
+        # Validar o grafo de dependências, codificar os nomes e gerar o compute_all
+        # especializado agora, e não a cada ingestão
+        feature_group.execution_plan()
+        feature_group.field_keys()
+        feature_group._compute_fn = feature_group._compile_compute_all()
         
         self.feature_groups[feature_group.name] = feature_group
-        print(f"✓ Feature Group \'{feature_group.name}\' registrado com sucesso")
+        self._registry_version += 1
+        logger.info("Feature Group '%s' registrado com sucesso", feature_group.name)
         return True
 
     def ingest_data(self, group_name: str, entity_id: str, source_data: Dict[str, Any], timestamp: datetime):
         """Ingere dados, computa features e armazena nos armazenamentos online e offline."""
+        self.ingest_batch(group_name, [(entity_id, source_data, timestamp)])
+
+    def ingest_async(self, group_name: str, entity_id: str, source_data: Dict[str, Any], timestamp: Optional[datetime] = None):
+        """
+        Enfileira uma ingestão e retorna sem esperar pelo Redis nem pelo Parquet.
+
+        Uma thread de fundo retira até `ingest_batch_size` itens da fila (esperando
+        no máximo `ingest_batch_wait` segundos para completar o lote) e os grava com
+        um pipeline Redis e uma escrita offline por grupo. Sem `timestamp`, usa o
+        campo "timestamp" dos dados ou o momento atual, como ingest_features.
+
+        Só o grupo é validado aqui: itens que falham na computação das features são
+        descartados pelo worker, com um aviso. `flush()` é o ponto de sincronização:
+        aguarda os itens enfileirados antes de gravar o buffer offline. Levanta
+        `queue.Full` se a fila estiver cheia; depois de `close()`, ingere na própria
+        thread.
+        """
+        if group_name not in self.feature_groups:
+            raise ValueError(f"Feature Group \'{group_name}\' não encontrado.")
+        if timestamp is None:
+            source_data, timestamp = self._split_timestamp(source_data)
+
+        # O item entra na fila sob o mesmo lock em que close() marca o fim e enfileira o
+        # sentinela: nenhum item fica atrás do sentinela, sem worker para processá-lo
+        with self._ingest_start_lock:
+            if not self._ingest_closed:
+                if self._ingest_thread is None:
+                    self._ingest_thread = threading.Thread(
+                        target=self._ingest_worker, name=f"{self.name}-ingest", daemon=True
+                    )
+                    self._ingest_thread.start()
+                self._ingest_queue.put_nowait((group_name, entity_id, source_data, timestamp))
+                return
+        return self.ingest_data(group_name, entity_id, source_data, timestamp)
+
+    def _ingest_worker(self):
+        """Drena a fila de ingest_async em lotes até receber o sentinela (None)."""
+        while True:
+            item = self._ingest_queue.get()
+            batch = [item]
+            deadline = time.monotonic() + self.ingest_batch_wait
+            while item is not None and len(batch) < self.ingest_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._ingest_queue.get(timeout=remaining) if remaining > 0 else self._ingest_queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            try:
+                self._ingest_items([item for item in batch if item is not None])
+            finally:
+                for _ in batch:
+                    self._ingest_queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _ingest_items(self, items: List[Tuple[str, str, Dict[str, Any], datetime]]):
+        """Computa e grava um lote do worker: um pipeline e uma escrita offline por grupo."""
+        by_group: Dict[str, Tuple[List[Dict[str, Any]], List[datetime]]] = {}
+        for group_name, entity_id, source_data, timestamp in items:
+            feature_group = self.feature_groups.get(group_name)
+            try:
+                row = self._compute_row(feature_group, entity_id, source_data, timestamp)
+            except Exception as e:
+                logger.warning("Ingestão descartada (%s/%s): %s", group_name, entity_id, e)
+                continue
+            rows, timestamps = by_group.setdefault(group_name, ([], []))
+            rows.append(row)
+            timestamps.append(timestamp)
+
+        for group_name, (rows, timestamps) in by_group.items():
+            try:
+                self._write_rows(self.feature_groups[group_name], rows, timestamps)
+            except Exception:
+                logger.exception("Erro ao gravar lote assíncrono de '%s'", group_name)
+
+    def ingest_batch(self, group_name: str, items: List[Tuple[str, Dict[str, Any], datetime]]):
+        """
+        Ingere várias entidades, linha a linha, com uma única ida ao Redis.
+
+        Cada item é uma tupla (entity_id, source_data, timestamp). As features são
+        computadas para todos os itens antes de qualquer escrita (um item inválido
+        aborta o lote); os HSETs seguem em um pipeline sem transação e o
+        armazenamento offline recebe uma única escrita.
+        """
         feature_group = self.feature_groups.get(group_name)
         if not feature_group:
             raise ValueError(f"Feature Group \'{group_name}\' não encontrado.")
 
-        computed_features = feature_group.compute_all(source_data)
-        computed_features["entity_id"] = entity_id
-        computed_features["timestamp"] = timestamp.isoformat()
+        if not items:
+            return
+
+        rows = [
+            self._compute_row(feature_group, entity_id, source_data, timestamp)
+            for entity_id, source_data, timestamp in items
+        ]
+        self._write_rows(feature_group, rows, [timestamp for _, _, timestamp in items])
+
+    def ingest_features_batch(self, group_name: str, records, entity_ids: Optional[List[str]] = None):
+        """
+        Ingere um lote de entidades com uma única ida ao Redis.
+
+        Aceita dois formatos:
+        - linhas (AoS): lista de registros {"entity_id": ..., "data": {...}};
+        - colunas (SoA): dict coluna -> lista de valores, com `entity_ids` paralelo;
+          um DataFrame também é aceito (sem `entity_ids`, usa a coluna "entity_id").
+
+        O formato colunar é o nativo; o de linhas é adaptado para ele quando todos os
+        registros têm os mesmos campos. Registros com campos diferentes seguem linha a
+        linha (ingest_batch), como em ingest_features: pivotá-los completaria os campos
+        ausentes com None, e `data.get(campo, default)` deixaria de ver o default.
+        """
+        if isinstance(records, pd.DataFrame):
+            if entity_ids is None and "entity_id" in records.columns:
+                entity_ids = records["entity_id"].tolist()
+                records = records.drop(columns="entity_id")
+            records = {name: records[name].tolist() for name in records.columns}
+
+        if isinstance(records, dict):
+            if entity_ids is None:
+                raise ValueError("entity_ids é obrigatório quando os dados são colunares.")
+            return self.ingest_columns(group_name, entity_ids, records)
+
+        if not records:
+            return
+
+        rows = [record["data"] for record in records]
+        keys = rows[0].keys()
+        if any(row.keys() != keys for row in rows):
+            items = []
+            for record in records:
+                source_data, timestamp = self._split_timestamp(record["data"])
+                items.append((record["entity_id"], source_data, timestamp))
+            return self.ingest_batch(group_name, items)
+
+        # Adaptador AoS -> SoA: pivotar os registros em colunas
+        columns = {key: [row[key] for row in rows] for key in keys}
+        return self.ingest_columns(group_name, [record["entity_id"] for record in records], columns)
+
+    def ingest_columns(self, group_name: str, entity_ids: List[str], columns: Dict[str, List[Any]]):
+        """
+        Ingere um lote em formato colunar (SoA).
+
+        `columns` mapeia cada feature bruta para a lista de valores de todas as entidades,
+        na mesma ordem de `entity_ids`. Uma coluna opcional "timestamp" define o timestamp
+        de cada linha (default: agora). As transformações rodam coluna a coluna; as escritas
+        online são enfileiradas em um pipeline (sem transação) e enviadas de uma vez, e o
+        armazenamento offline recebe uma única escrita para o lote todo.
+        """
+        feature_group = self.feature_groups.get(group_name)
+        if not feature_group:
+            raise ValueError(f"Feature Group \'{group_name}\' não encontrado.")
+
+        rows, timestamps = self._compute_columns(feature_group, entity_ids, columns)
+        if rows:
+            self._write_rows(feature_group, rows, timestamps)
+
+    def ingest_stream(self, group_name: str, batches, max_pending: int = 4) -> int:
+        """
+        Ingere uma sequência de lotes colunares sobrepondo computação e escrita.
+
+        `batches` é um iterável de pares (entity_ids, columns), no formato de
+        `ingest_columns`. A thread chamadora computa as transformações de cada lote
+        enquanto uma thread escritora envia o lote anterior ao Redis (pipeline) e ao
+        Parquet; no máximo `max_pending` lotes computados aguardam na fila.
+        O primeiro erro (de computação ou de escrita) interrompe o stream e é
+        re-levantado aqui. Retorna o número de entidades ingeridas.
+        """
+        feature_group = self.feature_groups.get(group_name)
+        if not feature_group:
+            raise ValueError(f"Feature Group \'{group_name}\' não encontrado.")
+
+        pending = queue.Queue(maxsize=max_pending)
+        errors = []
+
+        def writer():
+            while True:
+                item = pending.get()
+                if item is None:
+                    return
+                if not errors:
+                    try:
+                        self._write_rows(feature_group, *item)
+                    except Exception as e:
+                        errors.append(e)
+
+        thread = threading.Thread(target=writer, name=f"ingest-stream-{group_name}", daemon=True)
+        thread.start()
+        total = 0
+        try:
+            for entity_ids, columns in batches:
+                if errors:
+                    break
+                rows, timestamps = self._compute_columns(feature_group, entity_ids, columns)
+                if rows:
+                    pending.put((rows, timestamps))
+                    total += len(rows)
+        finally:
+            pending.put(None)
+            thread.join()
+
+        if errors:
+            raise errors[0]
+        return total
+
+    def _compute_columns(self, feature_group: FeatureGroup, entity_ids: List[str], columns: Dict[str, List[Any]]):
+        """Valida e computa um lote colunar, devolvendo as linhas prontas para escrita."""
+        n = len(entity_ids)
+        for name, values in columns.items():
+            if len(values) != n:
+                raise ValueError(
+                    f"Coluna \'{name}\' tem {len(values)} valores, esperado {n} (um por entidade)."
+                )
+        if not n:
+            return [], []
+
+        columns = dict(columns)
+        # Comparações com None (não a verdade do valor): a coluna pode ser um array
+        # NumPy ou uma Series, e os elementos np.datetime64/Timestamp
+        raw_timestamps = columns.pop("timestamp", None)
+        if raw_timestamps is None:
+            raw_timestamps = [None] * n
+        elif getattr(raw_timestamps, "dtype", None) is not None and raw_timestamps.dtype.kind == "M":
+            # datetime64 (ex.: get_historical_features(as_numpy_dict=True)): convertido de
+            # uma vez para datetime; NaT vira None (default: agora)
+            raw_timestamps = [
+                None if ts is pd.NaT else ts
+                for ts in pd.DatetimeIndex(raw_timestamps).to_pydatetime()
+            ]
+        now = datetime.now()
+        timestamps = [
+            (datetime.fromisoformat(ts) if isinstance(ts, str) else ts) if ts is not None else now
+            for ts in raw_timestamps
+        ]
+
+        # Computar o lote inteiro antes de escrever: um registro inválido aborta o lote todo
+        computed = feature_group.compute_batch(columns)
+
+        # Só na fronteira de I/O as colunas voltam a ser linhas
+        rows = []
+        for i, (entity_id, timestamp) in enumerate(zip(entity_ids, timestamps)):
+            row = {name: values[i] for name, values in computed.items()}
+            row["entity_id"] = entity_id
+            row["timestamp"] = _isoformat(timestamp)
+            rows.append(row)
+        return rows, timestamps
 
-        # Armazenamento Online (Redis)
+    def _write_rows(self, feature_group: FeatureGroup, rows: List[Dict[str, Any]], timestamps: List[datetime]):
+        """Escreve linhas computadas nos armazenamentos online e offline."""
+        group_name = feature_group.name
+
+        # Armazenamento Online (Redis): um round trip a cada `online_pipeline_chunk`
+        # entidades, para não acumular lotes enormes no cliente e no servidor
         if self.online_store:
-            online_key = f"{group_name}:{entity_id}"
-            self.online_store.hset(online_key, mapping=computed_features)
+            float32_features = self._storage_features(feature_group, "float32")
+            int8_features = self._storage_features(feature_group, "int8")
+            field_keys = feature_group.field_keys()
+            chunk = self.online_pipeline_chunk
+            ttl = self.online_ttl
+            pipe = self.online_store.pipeline(transaction=False)
+            for i, row in enumerate(rows, 1):
+                online_key = f"{group_name}:{row['entity_id']}"
+                mapping, nulls = self._online_mapping(row, float32_features, field_keys, int8_features)
+                pipe.hset(online_key, mapping=mapping)
+                if nulls:
+                    pipe.hdel(online_key, *nulls)
+                if ttl:
+                    pipe.expire(online_key, ttl)
+                if self.online_json_payload:
+                    pipe.set(f"{online_key}:json", self._json_payload(row, float32_features, int8_features), ex=ttl)
+                if i % chunk == 0:
+                    pipe.execute()
+            if len(rows) % chunk:
+                pipe.execute()
 
         # Armazenamento Offline (Parquet)
-        # Adicionar coluna de data antes de criar a tabela
-        computed_features["date"] = timestamp.strftime("%Y-%m-%d")
-        df = pd.DataFrame([computed_features])
-        table = pa.Table.from_pandas(df)
-        
-        partition_cols = ["date"]
-        
-        pq.write_to_dataset(
-            table,
-            root_path=os.path.join(self.offline_store_path, group_name),
-            partition_cols=partition_cols
+        self._write_offline(group_name, rows, timestamps)
+        logger.debug("%d entidades ingeridas em '%s'", len(rows), group_name)
+
+    @staticmethod
+    def _json_payload(row: Dict[str, Any], float32_features: frozenset, int8_features: frozenset = frozenset()) -> bytes:
+        """Serializa uma linha computada para a chave JSON (mesma precisão do hash)."""
+        if float32_features or int8_features:
+            row = dict(row)
+            for name in float32_features.union(int8_features):
+                value = row.get(name)
+                if value is not None:
+                    row[name] = float(str(np.float32(value))) if name in float32_features else _encode_int8(value)
+        if orjson is not None:
+            return orjson.dumps(row, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+        return json.dumps(row, default=_json_default).encode("utf-8")
+
+    def _compute_row(self, feature_group: FeatureGroup, entity_id: str, source_data: Dict[str, Any], timestamp: datetime) -> Dict[str, Any]:
+        """Computa as features de uma entidade e anexa as colunas de controle."""
+        computed_features = feature_group.compute_all(source_data)
+        computed_features["entity_id"] = entity_id
+        computed_features["timestamp"] = _isoformat(timestamp)
+        return computed_features
+
+    @staticmethod
+    def _storage_features(feature_group: FeatureGroup, storage_dtype: str) -> frozenset:
+        """Features do grupo armazenadas online com o `storage_dtype` dado ("float32", "int8")."""
+        return frozenset(
+            name for name, feature in feature_group.features.items()
+            if feature.metadata.storage_dtype == storage_dtype
+        )
+
+    @staticmethod
+    def _online_mapping(
+        row: Dict[str, Any],
+        float32_features: frozenset,
+        field_keys: Dict[str, bytes],
+        int8_features: frozenset = frozenset()
+    ) -> Tuple[Dict[bytes, Any], List[bytes]]:
+        """
+        Prepara uma linha computada para o HSET, com os nomes já codificados.
+
+        Os valores são computados em FP64 e só reduzidos para FP32 aqui, na escrita;
+        o armazenamento offline continua recebendo a precisão completa. O Redis não
+        aceita valores nulos (o cliente rejeita o comando inteiro): features None ficam
+        fora do mapping e são devolvidas à parte, para o HDEL que remove o valor
+        anterior do hash. Escalares NumPy e booleanos, que o cliente também rejeita,
+        são gravados como o escalar Python equivalente e como "True"/"False".
+        Embeddings com storage_dtype="int8" são gravados quantizados (`_encode_int8`).
+        """
+        mapping = {}
+        nulls = []
+        for name, value in row.items():
+            key = field_keys.get(name) or name.encode("utf-8")
+            if value is None:
+                nulls.append(key)
+                continue
+            if name in float32_features:
+                value = str(np.float32(value))
+            elif name in int8_features:
+                value = _encode_int8(value)
+            elif isinstance(value, np.generic):
+                value = value.item()
+            if isinstance(value, bool):
+                value = str(value)
+            mapping[key] = value
+        return mapping, nulls
+
+    def _write_offline(self, group_name: str, rows: List[Dict[str, Any]], timestamps: List[datetime]):
+        """
+        Enfileira linhas computadas para o armazenamento offline, particionado por data.
+
+        O buffer do grupo é colunar: cada campo das linhas é anexado à sua coluna, e a
+        coluna "date" (só offline) é derivada dos timestamps. Colunas que surgem no
+        meio do buffer (feature nova) são completadas com None.
+        """
+        dates = [_partition_date(timestamp) for timestamp in timestamps]
+        now = time.monotonic()
+        with self._offline_lock:
+            buffer = self._offline_buffer.get(group_name)
+            if buffer is None:
+                buffer = self._offline_buffer[group_name] = {"date": []}
+                self._offline_buffer_since[group_name] = now
+            num_buffered = len(buffer["date"])
+            for name in rows[0]:
+                column = buffer.get(name)
+                if column is None:
+                    column = buffer[name] = [None] * num_buffered
+                column.extend([row.get(name) for row in rows])
+            buffer["date"].extend(dates)
+            num_rows = num_buffered + len(rows)
+            for column in buffer.values():
+                if len(column) < num_rows:
+                    column.extend([None] * (num_rows - len(column)))
+            due = (
+                num_rows >= self.offline_flush_rows
+                or now - self._offline_buffer_since[group_name] >= self.offline_flush_interval
+            )
+            flush_inline = False
+            if due and group_name not in self._offline_pending:
+                try:
+                    self._offline_pending[group_name] = self._offline_executor.submit(
+                        self._background_flush, group_name
+                    )
+                except RuntimeError:
+                    # Store fechada (close): gravar na própria thread
+                    flush_inline = True
+        if flush_inline:
+            self._flush_offline(group_name)
+
+    def _background_flush(self, group_name: str):
+        """Flush disparado pela ingestão, executado no worker offline."""
+        try:
+            self._flush_offline(group_name)
+        except Exception:
+            logger.exception("Erro ao gravar dados offline de '%s'", group_name)
+        finally:
+            with self._offline_lock:
+                self._offline_pending.pop(group_name, None)
+
+    def flush(self, group_name: Optional[str] = None, close: bool = False):
+        """
+        Grava no Parquet as linhas pendentes no buffer offline.
+
+        Sem `group_name`, esvazia o buffer de todos os grupos. As linhas de cada grupo
+        são separadas por data e anexadas, como um novo row group, ao arquivo aberto
+        da partição (`<grupo>/date=AAAA-MM-DD/`): flushes seguintes não reabrem
+        arquivos nem re-inferem o schema. Um arquivo só fica legível depois de
+        fechado; com `close=True` os arquivos abertos (do grupo, ou de todos) são
+        finalizados, o que as leituras e o fim do processo fazem automaticamente.
+
+        Antes de gravar, aguarda a fila de ingest_async ser processada.
+        """
+        if self._ingest_thread is not None and threading.current_thread() is not self._ingest_thread:
+            self._ingest_queue.join()
+        self._flush_offline(group_name, close)
+
+    def _flush_offline(self, group_name: Optional[str] = None, close: bool = False):
+        """Grava o buffer offline sem esperar pela fila de ingest_async (flushes internos)."""
+        with self._offline_write_lock:
+            with self._offline_lock:
+                names = [group_name] if group_name is not None else list(self._offline_buffer)
+                batches = [(name, self._offline_buffer.pop(name, None)) for name in names]
+                for name in names:
+                    self._offline_buffer_since.pop(name, None)
+            for name, columns in batches:
+                if columns and columns["date"]:
+                    self._write_partitions(name, columns)
+            if close:
+                self._close_offline_writers(group_name)
+
+    def _write_partitions(self, group_name: str, columns: Dict[str, List[Any]]):
+        """Anexa as colunas bufferizadas ao arquivo aberto de cada partição de data do grupo."""
+        table = self._offline_table(group_name, columns)
+        if self.offline_backend == "memory":
+            self._memory_tables.setdefault(group_name, []).append(table)
+            return
+        dates = dict.fromkeys(columns["date"])
+        if len(dates) == 1:
+            partitions = [(next(iter(dates)), table)]
+        else:
+            partitions = [(date, table.filter(pc.equal(table["date"], date))) for date in dates]
+
+        for date, partition in partitions:
+            # A data fica no nome do diretório (particionamento hive), não no arquivo
+            partition = partition.drop_columns(["date"])
+            writer = self._offline_writers.get((group_name, date))
+            if writer is not None and not writer.schema.equals(partition.schema):
+                # Schema mudou (ex.: feature nova): finalizar o arquivo e abrir outro
+                self._finish_offline_writer((group_name, date))
+                writer = None
+            if writer is None:
+                writer = self._open_partition_writer(group_name, date, partition.schema)
+                self._offline_writers[(group_name, date)] = writer
+            writer.write_table(partition, row_group_size=self.offline_row_group_size)
+
+    def _open_partition_writer(self, group_name: str, date: str, schema: pa.Schema) -> pq.ParquetWriter:
+        """
+        Abre um novo arquivo Parquet na partição `<grupo>/date=<data>/`.
+
+        O arquivo é criado com o prefixo `_INPROGRESS_PREFIX` e só recebe o nome final
+        ao ser finalizado (ver _finish_offline_writer): arquivos ainda sem footer, ou
+        deixados por um processo que terminou sem fechar a store, são ignorados pelos
+        leitores do dataset (que pulam nomes iniciados por "."). O diretório da partição é criado só na primeira vez que a store escreve nela
+        (ver `_known_partitions`); se tiver sido removido por fora desde então, é
+        recriado e a abertura tentada de novo.
+        """
+        partition_path = os.path.join(self.offline_store_path, group_name, f"date={date}")
+        if (group_name, date) not in self._known_partitions:
+            os.makedirs(partition_path, exist_ok=True)
+            self._known_partitions.add((group_name, date))
+        file_path = os.path.join(partition_path, f"{_INPROGRESS_PREFIX}{uuid.uuid4().hex}.parquet")
+        options = dict(
+            compression=self.offline_compression,
+            compression_level=self.offline_compression_level,
+            data_page_size=self.offline_data_page_size,
+            use_dictionary=True
         )
+        try:
+            return pq.ParquetWriter(file_path, schema, **options)
+        except FileNotFoundError:
+            os.makedirs(partition_path, exist_ok=True)
+            return pq.ParquetWriter(file_path, schema, **options)
+
+    def _close_offline_writers(self, group_name: Optional[str] = None):
+        """Finaliza os arquivos Parquet abertos (do grupo, ou de todos)."""
+        with self._offline_write_lock:
+            for key in list(self._offline_writers):
+                if group_name is None or key[0] == group_name:
+                    self._finish_offline_writer(key)
+
+    def _finish_offline_writer(self, key: Tuple[str, str]):
+        """Fecha o arquivo aberto da partição e o publica com o nome final (sem o prefixo)."""
+        writer = self._offline_writers.pop(key)
+        writer.close()
+        directory, name = os.path.split(writer.where)
+        try:
+            os.replace(writer.where, os.path.join(directory, name[len(_INPROGRESS_PREFIX):]))
+        except FileNotFoundError:
+            # Partição removida por fora enquanto o arquivo estava aberto
+            logger.warning("Arquivo offline removido antes de ser finalizado: %s", writer.where)
+        self._offline_generation[key[0]] = self._offline_generation.get(key[0], 0) + 1
+
+    def _offline_table(self, group_name: str, columns: Dict[str, List[Any]]) -> pa.Table:
+        """
+        Monta a tabela Arrow de um flush direto das colunas do buffer (sem DataFrame).
+
+        O schema do grupo é inferido no primeiro flush e reutilizado nos seguintes, o
+        que evita a inferência de tipos a cada lote e mantém as partições com os mesmos
+        tipos. Features numéricas são sempre gravadas como float64: o Arrow trunca
+        floats em silêncio ao converter para int64, então um lote só com inteiros não
+        pode fixar o tipo da coluna. Categóricas de texto viram colunas de dicionário
+        (lidas de volta como `category` no pandas). Colunas sem nenhum valor no lote
+        recebem o tipo padrão do FeatureType (ver _ARROW_TYPES), quando houver um.
+        Se as linhas não couberem no schema em cache (ou o grupo mudou), ele é
+        inferido novamente.
+        """
+        feature_group = self.feature_groups.get(group_name)
+        version = feature_group._version if feature_group is not None else None
+        cached = self._arrow_schemas.get(group_name)
+        if cached is not None and cached[0] == version and columns.keys() == set(cached[1].names):
+            try:
+                return pa.Table.from_pydict(columns, schema=cached[1])
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+
+        table = pa.Table.from_pydict(columns)
+        schema = table.schema
+        if feature_group is not None:
+            for name, feature in feature_group.features.items():
+                index = schema.get_field_index(name)
+                if index < 0:
+                    continue
+                inferred = schema.field(index).type
+                feature_type = feature.metadata.feature_type
+                if (
+                    (feature_type == FeatureType.NUMERICAL and pa.types.is_integer(inferred))
+                    or (feature_type == FeatureType.CATEGORICAL and pa.types.is_string(inferred))
+                    or (pa.types.is_null(inferred) and feature_type in _ARROW_TYPES)
+                ):
+                    schema = schema.set(index, pa.field(name, _ARROW_TYPES[feature_type]))
+            table = table.cast(schema)
+        # Colunas só com nulos ainda não têm tipo: não fixar o schema até que tenham
+        if not any(pa.types.is_null(field.type) for field in schema):
+            self._arrow_schemas[group_name] = (version, schema)
+        return table
+
+    @staticmethod
+    def _split_timestamp(source_data: Dict[str, Any]):
+        """Separa o campo opcional "timestamp" dos dados brutos (default: agora)."""
+        timestamp = source_data.get("timestamp")
+        if timestamp:
+            if isinstance(timestamp, str):
+                timestamp = datetime.fromisoformat(timestamp)
+            source_data = {k: v for k, v in source_data.items() if k != "timestamp"}
+        else:
+            timestamp = datetime.now()
+        return source_data, timestamp
 
-    def get_online_features(self, group_name: str, entity_id: str) -> Optional[Dict[str, Any]]:
-        """Retorna features para inferência online (baixa latência)."""
+    def get_online_features(self, group_name: str, entity_id: str, features: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna features para inferência online (baixa latência).
+
+        Com `features`, apenas esses campos são lidos do Redis (HMGET) e somente os
+        existentes são retornados; sem ele, o hash inteiro é lido (HGETALL).
+        """
         if not self.online_store:
-            print("Erro: Armazenamento online (Redis) não está disponível.")
+            logger.error("Armazenamento online (Redis) não está disponível.")
             return None
 
+        if self._read_batcher is not None:
+            return self._read_batcher.get(group_name, entity_id, features)
+
         online_key = f"{group_name}:{entity_id}"
+        if features:
+            values = self.online_store.hmget(
+                online_key, self._feature_fields(self.feature_groups.get(group_name), features)
+            )
+            return {name: value for name, value in zip(features, values) if value is not None}
         return self.online_store.hgetall(online_key)
 
-    def get_historical_features(self, group_name: str, start_date: datetime, end_date: datetime) -> Optional[pd.DataFrame]:
-        """Retorna features históricas para treinamento de modelos."""
+    @staticmethod
+    def _feature_fields(feature_group: Optional[FeatureGroup], features: List[str]) -> List[bytes]:
+        """Campos do hash (em bytes, pré-codificados no grupo) para as features pedidas."""
+        field_keys = feature_group.field_keys() if feature_group else {}
+        return [field_keys.get(name) or name.encode("utf-8") for name in features]
+
+    def get_online_features_json(self, group_name: str, entity_id: str) -> Optional[bytes]:
+        """
+        Retorna as features de uma entidade já serializadas em JSON (UTF-8).
+
+        Requer `online_json_payload=True`; é um único GET, sem montar dict nem
+        re-serializar. Retorna None quando a chave não existe. Ao contrário do hash,
+        os valores mantêm seus tipos (números não viram strings).
+
+        A resposta é lida como bytes (NEVER_DECODE), ignorando o `decode_responses`
+        do cliente: o payload vai direto para o corpo HTTP, sem decodificar e
+        re-codificar UTF-8.
+        """
+        if not self.online_store or not self.online_json_payload:
+            return None
+        return self.online_store.execute_command("GET", f"{group_name}:{entity_id}:json", NEVER_DECODE=[])
+
+    def get_online_features_typed(self, group_name: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna as features de uma entidade com os tipos originais (int, float, bool...).
+
+        Lê o payload JSON (requer `online_json_payload=True`) e o decodifica uma única
+        vez, em vez de receber cada campo do hash como string. Retorna None quando o
+        payload não existe.
+        """
+        payload = self.get_online_features_json(group_name, entity_id)
+        if payload is None:
+            return None
+        return orjson.loads(payload) if orjson is not None else json.loads(payload)
+
+    def get_online_features_bulk(self, group_name: str, entity_ids: List[str], features: Optional[List[str]] = None) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Retorna features online de várias entidades com uma única ida ao Redis.
+
+        Os HGETALL (ou HMGET, com `features`) de todas as chaves são enviados em um
+        pipeline sem transação ("transparent pipelining"): N leituras, um round trip.
+        Entidades sem dados aparecem com um dict vazio.
+        """
+        if not self.online_store:
+            logger.error("Armazenamento online (Redis) não está disponível.")
+            return None
+
+        pipe = self.online_store.pipeline(transaction=False)
+        key_prefix = f"{group_name}:"
+        if features:
+            fields = self._feature_fields(self.feature_groups.get(group_name), features)
+            for entity_id in entity_ids:
+                pipe.hmget(key_prefix + entity_id, fields)
+            return {
+                entity_id: {name: value for name, value in zip(features, values) if value is not None}
+                for entity_id, values in zip(entity_ids, pipe.execute())
+            }
+
+        for entity_id in entity_ids:
+            pipe.hgetall(key_prefix + entity_id)
+        return dict(zip(entity_ids, pipe.execute()))
+
+    def get_online_features_columnar(self, group_name: str, entity_ids: List[str], features: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Retorna features online de várias entidades em formato colunar (SoA).
+
+        Uma coluna NumPy por feature (default: todas as do grupo), em que a linha i
+        corresponde a `entity_ids[i]`: a entrada de um modelo é montada sem um dict por
+        entidade. NUMERICAL e BOOLEAN viram float64 (booleanos como 0/1), com NaN onde a
+        entidade ou o campo não existe; os demais tipos ficam como as strings lidas
+        (object, None quando ausentes). Os HMGET vão em pipelines de
+        `online_pipeline_chunk` entidades.
+        """
+        if not self.online_store:
+            logger.error("Armazenamento online (Redis) não está disponível.")
+            return None
+        feature_group = self.feature_groups.get(group_name)
+        if not feature_group:
+            raise ValueError(f"Feature Group \'{group_name}\' não encontrado.")
+
+        names = list(features) if features else list(feature_group.features)
+        fields = self._feature_fields(feature_group, names)
+        key_prefix = f"{group_name}:"
+        chunk = self.online_pipeline_chunk
+        rows = []
+        for start in range(0, len(entity_ids), chunk):
+            pipe = self.online_store.pipeline(transaction=False)
+            for entity_id in entity_ids[start:start + chunk]:
+                pipe.hmget(key_prefix + entity_id, fields)
+            rows.extend(pipe.execute())
+
+        # Uma única transposição: raw[:, j] são os valores do campo j em todas as entidades
+        raw = np.empty((len(rows), len(names)), dtype=object)
+        if rows:
+            raw[:] = rows
+        columns = {}
+        for j, name in enumerate(names):
+            values = raw[:, j]
+            feature = feature_group.features.get(name)
+            feature_type = feature.metadata.feature_type if feature is not None else None
+            if feature_type in (FeatureType.NUMERICAL, FeatureType.BOOLEAN):
+                present = ~pd.isna(values)
+                column = np.full(len(values), np.nan)
+                if feature_type is FeatureType.NUMERICAL:
+                    column[present] = values[present].astype(np.float64)
+                else:
+                    column[present] = values[present] == "True"
+                columns[name] = column
+            else:
+                columns[name] = values
+        return columns
+
+    def get_historical_features(
+        self,
+        group_name: str,
+        start_date: datetime,
+        end_date: datetime,
+        columns: Optional[List[str]] = None,
+        row_filter: Optional[ds.Expression] = None,
+        as_arrow: bool = False,
+        as_numpy_dict: bool = False,
+        entity_ids: Optional[Sequence[str]] = None
+    ):
+        """
+        Retorna features históricas para treinamento de modelos.
+
+        `columns` restringe as colunas lidas e `row_filter` (expressão de
+        `pyarrow.dataset`, ex.: `ds.field("total_purchases") > 5`) é aplicado junto com
+        o filtro de datas durante a leitura: partições fora da janela nem são abertas
+        e só as colunas pedidas são decodificadas. `entity_ids` restringe a leitura a
+        essas entidades com um `isin` na mesma varredura, em vez de filtrar o
+        DataFrame depois.
+
+        O formato de saída evita conversões que o consumidor não precisa:
+        - padrão: DataFrame pandas (blocos por coluna, sem a cópia de consolidação);
+        - `as_arrow=True`: a `pa.Table` lida, sem conversão;
+        - `as_numpy_dict=True`: {coluna: np.ndarray}, para loaders de ML (PyTorch,
+          XGBoost); colunas numéricas de um único chunk e sem nulos não são copiadas.
+
+        A tabela lida para uma consulta fica em cache enquanto os dados do grupo não
+        mudam: consultas repetidas não reabrem o dataset nem relêem os footers. O
+        cache é invalidado quando esta store finaliza novos arquivos do grupo ou
+        quando as partições mudam no disco (mtime dos diretórios).
+        """
+        if as_arrow and as_numpy_dict:
+            raise ValueError("as_arrow e as_numpy_dict são mutuamente exclusivos.")
+        self.flush(group_name, close=True)
         group_path = os.path.join(self.offline_store_path, group_name)
-        if not os.path.exists(group_path):
+        if self.offline_backend == "memory":
+            if not self._memory_tables.get(group_name):
+                return None
+        elif not os.path.exists(group_path):
             return None
 
+        start, end = start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        if entity_ids is not None:
+            entity_filter = ds.field("entity_id").isin(list(entity_ids))
+            row_filter = entity_filter if row_filter is None else row_filter & entity_filter
         try:
-            dataset = pq.ParquetDataset(group_path, filters=[
-                ("date", ">=", start_date.strftime("%Y-%m-%d")),
-                ("date", "<=", end_date.strftime("%Y-%m-%d"))
-            ])
-            return dataset.read().to_pandas()
+            if self.offline_backend == "memory":
+                table = self._read_memory(group_name, start, end, columns, row_filter)
+            else:
+                table = self._read_historical(group_name, group_path, start, end, columns, row_filter)
+            if as_arrow:
+                return table
+            if as_numpy_dict:
+                return {name: table.column(name).to_numpy() for name in table.column_names}
+            # Sem cache a tabela é descartável: self_destruct libera cada coluna Arrow
+            # assim que é convertida (pico de memória ~1x em vez de 2x)
+            return table.to_pandas(split_blocks=True, self_destruct=not self.historical_cache_size)
         except Exception as e:
-            print(f"Erro ao ler dados históricos: {e}")
+            logger.error("Erro ao ler dados históricos de '%s': %s", group_name, e)
             return None
+
+    def _read_historical(
+        self,
+        group_name: str,
+        group_path: str,
+        start: str,
+        end: str,
+        columns: Optional[List[str]] = None,
+        row_filter: Optional[ds.Expression] = None
+    ) -> pa.Table:
+        key = (
+            group_name, start, end,
+            tuple(columns) if columns is not None else None,
+            str(row_filter) if row_filter is not None else None
+        )
+        signature = None
+        if self.historical_cache_size:
+            signature = (
+                self._offline_generation.get(group_name, 0),
+                tuple(sorted(
+                    (entry.name, entry.stat().st_mtime_ns)
+                    for entry in os.scandir(group_path) if entry.is_dir()
+                ))
+            )
+            with self._offline_lock:
+                cached = self._historical_cache.get(key)
+                if cached is not None and cached[0] == signature:
+                    self._historical_cache.move_to_end(key)
+                    return cached[1]
+
+        # Mesmo particionamento do ParquetDataset: "date" volta como dictionary (categoria)
+        dataset = ds.dataset(
+            group_path,
+            format="parquet",
+            partitioning=ds.HivePartitioning.discover(infer_dictionary=True)
+        )
+        expression = (ds.field("date") >= start) & (ds.field("date") <= end)
+        if row_filter is not None:
+            expression = expression & row_filter
+        table = dataset.to_table(columns=columns, filter=expression)
+
+        if self.historical_cache_size:
+            with self._offline_lock:
+                self._historical_cache[key] = (signature, table)
+                self._historical_cache.move_to_end(key)
+                while len(self._historical_cache) > self.historical_cache_size:
+                    self._historical_cache.popitem(last=False)
+        return table
+
+    def _read_memory(
+        self,
+        group_name: str,
+        start: str,
+        end: str,
+        columns: Optional[List[str]] = None,
+        row_filter: Optional[ds.Expression] = None
+    ) -> pa.Table:
+        """
+        Leitura histórica do backend "memory", com os mesmos filtros da leitura Parquet.
+
+        As tabelas dos flushes são concatenadas (schemas diferentes são unificados,
+        como nos arquivos de uma partição) e "date" volta por último e como
+        dictionary, igual à coluna de partição do Parquet.
+        """
+        with self._offline_lock:
+            tables = list(self._memory_tables[group_name])
+        table = pa.concat_tables(tables, promote_options="default")
+        expression = (ds.field("date") >= start) & (ds.field("date") <= end)
+        if row_filter is not None:
+            expression = expression & row_filter
+        table = ds.dataset(table).to_table(filter=expression)
+        dates = table["date"]
+        table = table.remove_column(table.schema.get_field_index("date"))
+        table = table.append_column("date", pc.dictionary_encode(dates))
+        return table.select(columns) if columns is not None else table
     
     def ingest_features(self, group_name: str, entity_id: str, source_data: Dict[str, Any]):
         """
         Método compatível com o README - ingere features com timestamp automático.
         Alias para ingest_data com timestamp atual.
         """
-        timestamp = source_data.get("timestamp")
-        if timestamp:
-            if isinstance(timestamp, str):
-                timestamp = datetime.fromisoformat(timestamp)
-            source_data = {k: v for k, v in source_data.items() if k != "timestamp"}
-        else:
-            timestamp = datetime.now()
-        
+        source_data, timestamp = self._split_timestamp(source_data)
         return self.ingest_data(group_name, entity_id, source_data, timestamp)
     
     def get_offline_features(self, group_name: str, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> Optional[pd.DataFrame]:
@@ -291,30 +2174,71 @@ class FeatureStore:
         
         return self.get_historical_features(group_name, start_date, end_date)
     
-    def list_features(self) -> List[FeatureMetadata]:
-        """Lista todas as features registradas em todos os grupos."""
+    def registry_version(self) -> int:
+        """
+        Versão do registro de features: muda sempre que um grupo é registrado, uma
+        feature é adicionada a um grupo registrado ou uma feature é depreciada.
+
+        Permite cachear listagens serializadas (ver a API de serving).
+        """
+        return self._registry_version + sum(group._version for group in self.feature_groups.values())
+
+    def list_features(self, entity: Optional[str] = None) -> List[FeatureMetadata]:
+        """
+        Lista todas as features registradas em todos os grupos.
+
+        Com `entity`, apenas as features dos grupos dessa entidade, lidas do índice
+        do registro (sem percorrer os demais grupos).
+        """
+        if entity is not None:
+            return list(self._registry_index()[1].get(entity, ()))
         all_features = []
         for group in self.feature_groups.values():
             for feature in group.features.values():
                 all_features.append(feature.metadata)
         return all_features
-    
+
+    def _registry_index(self) -> Tuple[Dict[Tuple[str, str], Feature], Dict[str, List[FeatureMetadata]]]:
+        """
+        Índices invertidos do registro: (entity, nome) -> Feature e entity -> metadados.
+
+        Refeitos por inteiro quando `registry_version` muda (grupo registrado,
+        feature adicionada ou depreciada); entre mudanças, cada busca é um acesso a
+        dict. Se mais de um grupo da entidade tem a feature, o primeiro registrado
+        vale para a busca por nome; a listagem por entidade traz todas.
+        """
+        version = self.registry_version()
+        indexed_version, index, by_entity = self._feature_index
+        if indexed_version != version:
+            index = {}
+            by_entity = {}
+            for group in self.feature_groups.values():
+                entity_features = by_entity.setdefault(group.entity, [])
+                for name, feature in group.features.items():
+                    index.setdefault((group.entity, name), feature)
+                    entity_features.append(feature.metadata)
+            self._feature_index = (version, index, by_entity)
+        return index, by_entity
+
+    def _find_feature(self, feature_name: str, entity: str) -> Optional[Feature]:
+        """Busca uma feature por (entity, nome) no índice do registro."""
+        return self._registry_index()[0].get((entity, feature_name))
+
     def get_feature_metadata(self, feature_name: str, entity: str) -> Optional[FeatureMetadata]:
         """Busca metadados de uma feature específica."""
-        for group in self.feature_groups.values():
-            if group.entity == entity and feature_name in group.features:
-                return group.features[feature_name].metadata
-        return None
+        feature = self._find_feature(feature_name, entity)
+        return feature.metadata if feature is not None else None
     
     def deprecate_feature(self, feature_name: str, entity: str):
         """Marca uma feature como depreciada."""
-        for group in self.feature_groups.values():
-            if group.entity == entity and feature_name in group.features:
-                group.features[feature_name].metadata.status = FeatureStatus.DEPRECATED
-                group.features[feature_name].metadata.updated_at = datetime.now()
-                print(f"✓ Feature '{feature_name}' marcada como DEPRECATED")
-                return
-        print(f"⚠ Feature '{feature_name}' não encontrada para entidade '{entity}'")
+        feature = self._find_feature(feature_name, entity)
+        if feature is None:
+            logger.warning("Feature '%s' não encontrada para entidade '%s'", feature_name, entity)
+            return
+        feature.metadata.status = FeatureStatus.DEPRECATED
+        feature.metadata.updated_at = datetime.now()
+        self._registry_version += 1
+        logger.info("Feature '%s' marcada como DEPRECATED", feature_name)
 
     def create_flask_app(self):
         """Cria e retorna uma instância da aplicação Flask para a API REST."""
@@ -322,6 +2246,8 @@ class FeatureStore:
             raise ImportError("Flask não está instalado. Execute `pip install Flask`.")
 
         app = Flask(__name__)
+        if orjson is not None:
+            app.json = OrjsonProvider(app)
 
         @app.route('/features/<group_name>/<entity_id>', methods=['GET'])
         def get_features(group_name, entity_id):
@@ -344,9 +2270,120 @@ class FeatureStore:
             except Exception as e:
                 return jsonify({"error": str(e)}), 500
 
+        @app.route('/ingest/<group_name>', methods=['POST'])
+        def ingest_records(group_name):
+            # Lote {"records": [{"entity_id": ..., "data": {...}}, ...]}: um pipeline
+            # Redis e uma escrita offline para o lote todo (ver ingest_features_batch)
+            data = request.json
+            records = data.get("records") if isinstance(data, dict) else None
+            if not isinstance(records, list) or not all(
+                isinstance(r, dict) and "entity_id" in r and isinstance(r.get("data"), dict)
+                for r in records
+            ):
+                return jsonify({"error": "Esperado {\"records\": [{\"entity_id\": ..., \"data\": {...}}]}"}), 400
+
+            try:
+                self.ingest_features_batch(group_name, records)
+                return jsonify({"status": "success", "num_records": len(records)}), 201
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            except Exception as e:
+                return jsonify({"error": str(e)}), 500
+
         return app
 
 
+# Lotes costumam repetir o mesmo timestamp (ex.: um único datetime.now() por lote):
+# a formatação é feita uma vez por valor distinto. A chave é o próprio datetime, então
+# o resultado é idêntico ao de isoformat()/strftime, inclusive os microssegundos. Só
+# timestamps sem fuso usam o cache: datetimes com fuso iguais (mesmo instante) podem
+# ter offsets, e portanto textos, diferentes.
+def _isoformat(timestamp: datetime) -> str:
+    if timestamp.tzinfo is not None:
+        return timestamp.isoformat()
+    return _naive_isoformat(timestamp)
+
+
+def _partition_date(timestamp: datetime) -> str:
+    if timestamp.tzinfo is not None:
+        return timestamp.strftime("%Y-%m-%d")
+    return _naive_partition_date(timestamp)
+
+
+@lru_cache(maxsize=8192)
+def _naive_isoformat(timestamp: datetime) -> str:
+    return timestamp.isoformat()
+
+
+@lru_cache(maxsize=8192)
+def _naive_partition_date(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m-%d")
+
+
+# Provider JSON das aplicações Flask (create_flask_app e a API de serving); só existe
+# com o Flask instalado
+if Flask is not None:
+    class OrjsonProvider(DefaultJSONProvider):
+        """
+        Provider JSON do Flask baseado em orjson.
+
+        Usado por `jsonify` e `request.json` (via `app.json`) quando o orjson está
+        instalado. Escreve a resposta direto em bytes, sem passar por `str`, e mantém
+        as chaves na ordem de inserção: ao contrário do provider padrão, não ordena
+        (`sort_keys = True` restaura a ordenação). A indentação em modo debug segue o
+        provider padrão; enums são serializados pelo valor (nativo do orjson) e datas,
+        Decimal e UUID pelo `default` do Flask. Chamadas com argumentos específicos do
+        `json` da stdlib caem no provider padrão.
+        """
+
+        sort_keys = False
+
+        def _option(self, indent: bool = False) -> int:
+            option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            return option
+
+        def dumps(self, obj, **kwargs):
+            if kwargs:
+                return super().dumps(obj, **kwargs)
+            return orjson.dumps(obj, default=self.default, option=self._option()).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return orjson.loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            indent = (self.compact is None and self._app.debug) or self.compact is False
+            body = orjson.dumps(obj, default=self.default, option=self._option(indent) | orjson.OPT_APPEND_NEWLINE)
+            return self._app.response_class(body, mimetype=self.mimetype)
+else:
+    OrjsonProvider = None
+
+
+def _json_default(value):
+    """Converte escalares NumPy e datas para tipos serializáveis em JSON."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def _flush_at_exit(store_ref):
+    """Esvazia o buffer offline de uma Feature Store ainda viva e finaliza seus arquivos Parquet."""
+    store = store_ref()
+    if store is not None:
+        try:
+            store.flush(close=True)
+        except Exception:
+            logger.exception("Erro ao gravar buffer offline de '%s'", store.name)
+
+
 def example_usage():
     """Exemplo de uso da Feature Store com armazenamento online e offline."""
     
@@ -383,8 +2420,9 @@ def example_usage():
         "CUST001": {"total_spent": 1500.00, "total_purchases": 15},
         "CUST002": {"total_spent": 250.00, "total_purchases": 5}
     }
-    for cust_id, data in customer_data.items():
-        fs.ingest_data("customer_features", cust_id, data, datetime.now())
+    now = datetime.now()
+    fs.ingest_batch("customer_features", [(cust_id, data, now) for cust_id, data in customer_data.items()])
+    for cust_id in customer_data:
         print(f"Dados ingeridos para {cust_id}")
 
     # Obter features online
@@ -7,8 +7,21 @@ Year: 2025
 import unittest
 import sys
 import os
-import json
-import redis
+import shutil
+import tempfile
+import queue
+from datetime import datetime
+from unittest import mock
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Adicionar o diretório src ao path para importar os módulos
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -21,26 +34,99 @@ from feature_store import (
     FeatureStatus,
     FeatureGroup
 )
+import feature_serving_api
 from feature_serving_api import create_app
 
 
+# Diretórios temporários dos testes: /dev/shm (tmpfs) no Linux, senão o padrão do sistema
+TEST_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
 # Mock Redis para testes
 class MockRedis:
     def __init__(self, host='localhost', port=6379, db=0, decode_responses=True, **kwargs):
         self.data = {}
+        self.ttls = {}
         self.host = host
         self.port = port
         self.db = db
         self.decode_responses = decode_responses
 
     def hmset(self, key, mapping):
-        self.data[key] = {k: str(v) for k, v in mapping.items()}
+        # HMSET (obsoleto) é o HSET com mapping
+        return self.hset(key, mapping=mapping)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        self.data.setdefault(key, {}).update({self._decode(k): str(v) for k, v in fields.items()})
+        return len(fields)
+
+    def hdel(self, key, *fields):
+        names = {self._decode(f) for f in fields}
+        hash_ = self.data.get(key, {})
+        removed = [name for name in names if name in hash_]
+        for name in removed:
+            del hash_[name]
+        return len(removed)
 
     def hgetall(self, key):
         return self.data.get(key, {})
 
+    def hmget(self, key, keys):
+        fields = self.data.get(key, {})
+        return [fields.get(self._decode(k)) for k in keys]
+
+    @staticmethod
+    def _decode(name):
+        # Como no cliente real com decode_responses=True, nomes em bytes voltam como str
+        return name.decode("utf-8") if isinstance(name, bytes) else name
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return key in self.data
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def execute_command(self, name, *args, **options):
+        result = getattr(self, name.lower())(*args)
+        # NEVER_DECODE: resposta em bytes, mesmo com decode_responses=True
+        if "NEVER_DECODE" in options and isinstance(result, str):
+            result = result.encode("utf-8")
+        return result
+
+    def pipeline(self, transaction=True):
+        return MockPipeline(self)
+
     def flushdb(self):
         self.data = {}
+        self.ttls = {}
+
+
+class MockPipeline:
+    """Enfileira comandos e os aplica no MockRedis em execute()"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
 
 
 class TestFeatureServingAPI(unittest.TestCase):
@@ -48,22 +134,15 @@ class TestFeatureServingAPI(unittest.TestCase):
 
     def setUp(self):
         """Configuração executada antes de cada teste"""
-        # Mock Redis
-        self.original_redis = redis.Redis
-        redis.Redis = MockRedis
-
-        self.offline_store_test_path = './test_offline_store_api'
-        if os.path.exists(self.offline_store_test_path):
-            import shutil
-            shutil.rmtree(self.offline_store_test_path)
-        os.makedirs(self.offline_store_test_path, exist_ok=True)
+        # Diretório offline novo por teste, fora da árvore do repositório (em tmpfs quando houver)
+        self.offline_store_test_path = tempfile.mkdtemp(prefix="fs_offline_api_", dir=TEST_TMP_DIR)
 
         # Criar Feature Store
         self.fs = FeatureStore(
             name="test-api-fs",
-            offline_store_path=self.offline_store_test_path
+            offline_store_path=self.offline_store_test_path,
+            online_store_client=MockRedis()
         )
-        self.fs.online_store.flushdb()
 
         # Criar Feature Group de teste
         test_fg = FeatureGroup(
@@ -93,25 +172,22 @@ class TestFeatureServingAPI(unittest.TestCase):
 
     def tearDown(self):
         """Limpeza após cada teste"""
-        redis.Redis = self.original_redis
-        import shutil
-        if os.path.exists(self.offline_store_test_path):
-            shutil.rmtree(self.offline_store_test_path)
+        shutil.rmtree(self.offline_store_test_path, ignore_errors=True)
 
     def test_health_endpoint(self):
         """Testa o endpoint de health check"""
         response = self.client.get('/health')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertEqual(data['status'], 'healthy')
         self.assertEqual(data['service'], 'feature-serving-api')
-        self.assertIn('timestamp', data)
+        self.assertIsInstance(datetime.fromisoformat(data['timestamp']), datetime)
 
     def test_list_groups(self):
         """Testa listagem de feature groups"""
         response = self.client.get('/groups')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('groups', data)
         self.assertEqual(len(data['groups']), 1)
         self.assertEqual(data['groups'][0]['name'], 'test_features')
@@ -121,27 +197,57 @@ class TestFeatureServingAPI(unittest.TestCase):
         """Testa listagem de todas as features"""
         response = self.client.get('/features')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('features', data)
         self.assertEqual(len(data['features']), 1)
         self.assertEqual(data['features'][0]['name'], 'test_value')
         self.assertEqual(data['features'][0]['type'], 'numerical')
 
+    def test_list_all_features_cache_invalidation(self):
+        """Testa que a listagem cacheada reflete features adicionadas depois"""
+        self.assertEqual(len(self.client.get('/features').get_json()['features']), 1)
+
+        self.fs.feature_groups["test_features"].add_feature(Feature(
+            metadata=FeatureMetadata(
+                name="other_value",
+                description="Outro valor",
+                feature_type=FeatureType.NUMERICAL,
+                entity="test_entity",
+                owner="test@example.com"
+            )
+        ))
+        data = self.client.get('/features').get_json()
+        self.assertEqual([f['name'] for f in data['features']], ['test_value', 'other_value'])
+
+        self.fs.deprecate_feature("other_value", "test_entity")
+        data = self.client.get('/features').get_json()
+        self.assertEqual(data['features'][1]['status'], 'deprecated')
+
     def test_get_feature_metadata(self):
         """Testa busca de metadados de feature"""
         response = self.client.get('/features/test_entity/test_value/metadata')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertEqual(data['name'], 'test_value')
         self.assertEqual(data['type'], 'numerical')
         self.assertEqual(data['entity'], 'test_entity')
         self.assertEqual(data['owner'], 'test@example.com')
 
+    def test_get_feature_metadata_cache_invalidation(self):
+        """Testa que os metadados cacheados refletem features depreciadas depois"""
+        url = '/features/test_entity/test_value/metadata'
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url).data, first.data)
+        self.assertEqual(first.get_json()['status'], 'active')
+
+        self.fs.deprecate_feature("test_value", "test_entity")
+        self.assertEqual(self.client.get(url).get_json()['status'], 'deprecated')
+
     def test_get_feature_metadata_not_found(self):
         """Testa busca de metadados de feature inexistente"""
         response = self.client.get('/features/test_entity/nonexistent/metadata')
         self.assertEqual(response.status_code, 404)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('error', data)
 
     def test_ingest_and_retrieve(self):
@@ -157,7 +263,7 @@ class TestFeatureServingAPI(unittest.TestCase):
         )
         
         self.assertEqual(response.status_code, 201)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertEqual(data['status'], 'success')
         self.assertEqual(data['group_name'], 'test_features')
         self.assertEqual(data['entity_id'], entity_id)
@@ -165,7 +271,7 @@ class TestFeatureServingAPI(unittest.TestCase):
         # Recuperar
         response = self.client.get(f'/features/test_features/{entity_id}')
         self.assertEqual(response.status_code, 200)
-        features = json.loads(response.data)
+        features = response.get_json()
         self.assertEqual(float(features['test_value']), 42.5)
 
     def test_get_features_with_filter(self):
@@ -182,14 +288,128 @@ class TestFeatureServingAPI(unittest.TestCase):
             f'/features/test_features/{entity_id}?features=test_value'
         )
         self.assertEqual(response.status_code, 200)
-        features = json.loads(response.data)
+        features = response.get_json()
         self.assertIn('test_value', features)
 
+        # Nomes repetidos, vazios ou inexistentes não alteram o resultado
+        response = self.client.get(
+            f'/features/test_features/{entity_id}?features=test_value,,test_value,missing'
+        )
+        self.assertEqual(response.get_json(), {"test_value": features["test_value"]})
+
+    def test_ingest_async(self):
+        """Testa a ingestão assíncrona via API (202 Accepted, 503 com a fila cheia)"""
+        with mock.patch.object(feature_serving_api, "INGEST_ASYNC", True):
+            response = self.client.post('/ingest/test_features/TEST017', json={"test_value": 7.5})
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.get_json()['status'], 'accepted')
+
+            self.fs.flush()
+            response = self.client.get('/features/test_features/TEST017')
+            self.assertEqual(float(response.get_json()['test_value']), 7.5)
+
+            with mock.patch.object(self.fs, "ingest_async", side_effect=queue.Full):
+                response = self.client.post('/ingest/test_features/TEST018', json={"test_value": 1.0})
+            self.assertEqual(response.status_code, 503)
+        self.fs.close()
+
+    def test_ingest_batch(self):
+        """Testa ingestão em lote via API"""
+        records = [
+            {"entity_id": "TEST010", "data": {"test_value": 1.5}},
+            {"entity_id": "TEST011", "data": {"test_value": 2.5}}
+        ]
+        response = self.client.post('/ingest_batch/test_features', json=records)
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertEqual(data['num_records'], 2)
+
+        response = self.client.get('/features/test_features/TEST011')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(float(response.get_json()['test_value']), 2.5)
+
+    def test_ingest_batch_columnar(self):
+        """Testa ingestão em lote via API no formato colunar"""
+        payload = {"entity_ids": ["TEST012", "TEST013"], "columns": {"test_value": [3.5, 4.5]}}
+        response = self.client.post('/ingest_batch/test_features', json=payload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['num_records'], 2)
+
+        response = self.client.get('/features/test_features/TEST013')
+        self.assertEqual(float(response.get_json()['test_value']), 4.5)
+
+    def test_get_features_json_payload(self):
+        """Testa que, com online_json_payload, o GET serve o JSON gravado na ingestão"""
+        self.fs.online_json_payload = True
+        self.client.post('/ingest/test_features/TEST016', json={"test_value": 4.25})
+
+        response = self.client.get('/features/test_features/TEST016')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/json")
+        data = response.get_json()
+        self.assertEqual(data['test_value'], 4.25)
+        self.assertEqual(data['entity_id'], 'TEST016')
+        self.assertIsInstance(self.fs.get_online_features_json('test_features', 'TEST016'), bytes)
+
+        # Com filtro de features, a leitura continua vindo do hash
+        response = self.client.get('/features/test_features/TEST016?features=test_value')
+        self.assertEqual(response.get_json(), {"test_value": "4.25"})
+
+    def test_get_features_bulk(self):
+        """Testa busca de features de várias entidades em uma chamada"""
+        records = [
+            {"entity_id": "TEST014", "data": {"test_value": 1.0}},
+            {"entity_id": "TEST015", "data": {"test_value": 2.0}}
+        ]
+        self.client.post('/ingest_batch/test_features', json=records)
+
+        response = self.client.get('/features/test_features?entity_ids=TEST014,TEST015,MISSING')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(float(data['TEST015']['test_value']), 2.0)
+        self.assertEqual(data['MISSING'], {})
+
+        response = self.client.get('/features/test_features')
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_features_batch_post(self):
+        """Testa a busca em lote via POST, com a lista de entidades no corpo"""
+        records = [
+            {"entity_id": "TEST021", "data": {"test_value": 1.0}},
+            {"entity_id": "batch", "data": {"test_value": 2.0}}
+        ]
+        self.client.post('/ingest_batch/test_features', json=records)
+
+        response = self.client.post('/features/test_features/batch', json=["TEST021", "MISSING"])
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(float(data['TEST021']['test_value']), 1.0)
+        self.assertEqual(data['MISSING'], {})
+
+        response = self.client.post(
+            '/features/test_features/batch',
+            json={"entity_ids": ["TEST021"], "features": ["test_value", "missing"]}
+        )
+        self.assertEqual(response.get_json(), {"TEST021": {"test_value": "1.0"}})
+
+        self.assertEqual(self.client.post('/features/test_features/batch', json={"ids": []}).status_code, 400)
+        self.assertEqual(self.client.post('/features/nonexistent_group/batch', json=["X"]).status_code, 404)
+
+        # GET continua tratando "batch" como entity_id
+        response = self.client.get('/features/test_features/batch')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(float(response.get_json()['test_value']), 2.0)
+
+    def test_ingest_batch_invalid_payload(self):
+        """Testa ingestão em lote com payload fora do formato esperado"""
+        response = self.client.post('/ingest_batch/test_features', json={"test_value": 1})
+        self.assertEqual(response.status_code, 400)
+
     def test_get_features_nonexistent_group(self):
         """Testa busca de features em grupo inexistente"""
         response = self.client.get('/features/nonexistent_group/ENTITY001')
         self.assertEqual(response.status_code, 404)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('error', data)
         self.assertIn('not found', data['error'].lower())
 
@@ -197,7 +417,7 @@ class TestFeatureServingAPI(unittest.TestCase):
         """Testa busca de features para entidade inexistente"""
         response = self.client.get('/features/test_features/NONEXISTENT')
         self.assertEqual(response.status_code, 404)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('error', data)
 
     def test_ingest_invalid_group(self):
@@ -207,7 +427,7 @@ class TestFeatureServingAPI(unittest.TestCase):
             json={"test_value": 123}
         )
         self.assertEqual(response.status_code, 404)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn('error', data)
 
     def test_ingest_no_data(self):
@@ -227,5 +447,39 @@ class TestFeatureServingAPI(unittest.TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+    def test_ingest_unsupported_content_type(self):
+        """Testa ingestão com Content-Type não suportado"""
+        response = self.client.post(
+            '/ingest/test_features/ENTITY001',
+            data="test_value=1",
+            headers={"Content-Type": "text/plain"}
+        )
+        self.assertEqual(response.status_code, 415)
+
+    @unittest.skipIf(msgpack is None, "msgpack não instalado")
+    def test_ingest_batch_msgpack(self):
+        """Testa ingestão em lote com corpo MessagePack"""
+        payload = {"entity_ids": ["TEST020"], "columns": {"test_value": [7.5]}}
+        response = self.client.post(
+            '/ingest_batch/test_features',
+            data=msgpack.packb(payload, use_bin_type=True),
+            headers={"Content-Type": "application/msgpack"}
+        )
+        self.assertEqual(response.status_code, 201)
+
+    @unittest.skipIf(orjson is None, "orjson não instalado")
+    def test_orjson_provider(self):
+        """Testa que as respostas JSON usam orjson, sem ordenar as chaves por padrão"""
+        import numpy as np
+        with self.app.app_context():
+            response = self.app.json.response({"b": np.float64(1.5), "a": [1, 2]})
+        self.assertEqual(response.mimetype, "application/json")
+        self.assertEqual(response.data, b'{"b":1.5,"a":[1,2]}\n')
+        self.assertEqual(self.app.json.loads(self.app.json.dumps({"x": 1})), {"x": 1})
+        self.assertEqual(self.app.json.dumps({"type": FeatureType.NUMERICAL}), '{"type":"numerical"}')
+
+        self.app.json.sort_keys = True
+        self.assertEqual(self.app.json.dumps({"b": 1, "a": 2}), '{"a":2,"b":1}')
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -6,11 +6,28 @@ Year: 2025
 """
 
 import unittest
+import logging
 import sys
 import os
+import shutil
+import tempfile
+import time
 from datetime import datetime, timedelta
-import json
-import redis
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Adicionar o diretório src ao path para importar os módulos
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -23,26 +40,105 @@ from feature_store import (
     FeatureStatus,
     FeatureValidation,
     FeatureTransformation,
-    FeatureGroup
+    FeatureGroup,
+    OnlineReadBatcher,
+    OrjsonProvider,
+    make_njit_transform,
+    quantize_int8,
+    dequantize_int8,
+    decode_int8_embedding,
+    throttle_repeated_logs
 )
 
+# Diretórios temporários dos testes: /dev/shm (tmpfs) no Linux, senão o padrão do sistema
+TEST_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
 # Mock Redis para testes
 class MockRedis:
     def __init__(self, host='localhost', port=6379, db=0, decode_responses=True, **kwargs):
         self.data = {}
+        self.ttls = {}
         self.host = host
         self.port = port
         self.db = db
         self.decode_responses = decode_responses
 
     def hmset(self, key, mapping):
-        self.data[key] = {k: str(v) for k, v in mapping.items()} # Redis stores strings
+        # HMSET (obsoleto) é o HSET com mapping
+        return self.hset(key, mapping=mapping)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        self.data.setdefault(key, {}).update({self._decode(k): str(v) for k, v in fields.items()})
+        return len(fields)
+
+    def hdel(self, key, *fields):
+        names = {self._decode(f) for f in fields}
+        hash_ = self.data.get(key, {})
+        removed = [name for name in names if name in hash_]
+        for name in removed:
+            del hash_[name]
+        return len(removed)
 
     def hgetall(self, key):
         return self.data.get(key, {})
 
+    def hmget(self, key, keys):
+        fields = self.data.get(key, {})
+        return [fields.get(self._decode(k)) for k in keys]
+
+    @staticmethod
+    def _decode(name):
+        # Como no cliente real com decode_responses=True, nomes em bytes voltam como str
+        return name.decode("utf-8") if isinstance(name, bytes) else name
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return key in self.data
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def execute_command(self, name, *args, **options):
+        result = getattr(self, name.lower())(*args)
+        # NEVER_DECODE: resposta em bytes, mesmo com decode_responses=True
+        if "NEVER_DECODE" in options and isinstance(result, str):
+            result = result.encode("utf-8")
+        return result
+
+    def pipeline(self, transaction=True):
+        return MockPipeline(self)
+
     def flushdb(self):
         self.data = {}
+        self.ttls = {}
+
+
+class MockPipeline:
+    """Enfileira comandos e os aplica no MockRedis em execute()"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
 
 
 class TestFeatureStore(unittest.TestCase):
@@ -50,18 +146,10 @@ class TestFeatureStore(unittest.TestCase):
 
     def setUp(self):
         """Configuração executada antes de cada teste"""
-        # Mock Redis
-        self.original_redis = redis.Redis
-        redis.Redis = MockRedis
-
-        self.offline_store_test_path = './test_offline_store'
-        if os.path.exists(self.offline_store_test_path):
-            import shutil
-            shutil.rmtree(self.offline_store_test_path)
-        os.makedirs(self.offline_store_test_path, exist_ok=True)
+        # Diretório offline novo por teste, fora da árvore do repositório (em tmpfs quando houver)
+        self.offline_store_test_path = tempfile.mkdtemp(prefix="fs_offline_store_", dir=TEST_TMP_DIR)
 
-        self.fs = FeatureStore(name="test-fs", offline_store_path=self.offline_store_test_path)
-        self.fs.online_store.flushdb() # Limpar mock Redis
+        self.fs = FeatureStore(name="test-fs", offline_store_path=self.offline_store_test_path, online_store_client=MockRedis())
 
         # Definir features
         self.total_purchases_feature = Feature(
@@ -107,18 +195,24 @@ class TestFeatureStore(unittest.TestCase):
 
     def tearDown(self):
         """Limpeza após cada teste"""
-        # Restaurar Redis original
-        redis.Redis = self.original_redis
         # Limpar diretório de armazenamento offline
-        import shutil
-        if os.path.exists(self.offline_store_test_path):
-            shutil.rmtree(self.offline_store_test_path)
+        shutil.rmtree(self.offline_store_test_path, ignore_errors=True)
 
     def test_register_feature_group(self):
         """Testa o registro de um Feature Group"""
         self.assertIn("customer_features", self.fs.feature_groups)
         self.assertEqual(len(self.fs.feature_groups["customer_features"].features), 2)
 
+    def test_feature_group_interns_names(self):
+        """Testa que a entidade e os nomes das features são internados no grupo"""
+        entity = "".join(["cust", "omer"])
+        fg = FeatureGroup(name="interned", entity=entity, description="Nomes internados")
+        metadata = FeatureMetadata(name="".join(["total_", "purchases"]), description="Total", feature_type=FeatureType.NUMERICAL, entity="".join(["cust", "omer"]), owner="test-team")
+        fg.add_feature(Feature(metadata=metadata))
+        self.assertIs(metadata.entity, fg.entity)
+        self.assertIs(next(iter(fg.features)), metadata.name)
+        self.assertIs(metadata.name, sys.intern("total_purchases"))
+
     def test_ingest_data_online_store(self):
         """Testa a ingestão de dados e armazenamento online"""
         entity_id = "CUST001"
@@ -146,6 +240,446 @@ class TestFeatureStore(unittest.TestCase):
         self.assertEqual(historical_features_df["total_purchases"].iloc[0], 5)
         self.assertAlmostEqual(historical_features_df["avg_purchase_value"].iloc[0], 50.00)
 
+    def test_ingest_batch(self):
+        """Testa a ingestão linha a linha de várias entidades com um único pipeline"""
+        timestamp = datetime.now()
+        self.fs.ingest_batch("customer_features", [
+            ("CUST030", {"total_spent": 40.0, "total_purchases": 4}, timestamp),
+            ("CUST031", {"total_spent": 90.0, "total_purchases": 3}, timestamp)
+        ])
+        self.assertAlmostEqual(float(self.fs.get_online_features("customer_features", "CUST031")["avg_purchase_value"]), 30.0)
+        self.assertEqual(len(self.fs.get_offline_features("customer_features")), 2)
+
+    def test_offline_writes_buffered(self):
+        """Testa que as escritas offline ficam em buffer até o flush (ou uma leitura)"""
+        group_path = os.path.join(self.offline_store_test_path, "customer_features")
+        self.fs.offline_flush_interval = 3600
+        self.fs.ingest_data("customer_features", "CUST032", {"total_spent": 10.0, "total_purchases": 1}, datetime.now())
+        self.fs.ingest_data("customer_features", "CUST033", {"total_spent": 20.0, "total_purchases": 2}, datetime.now())
+        self.assertFalse(os.path.exists(group_path))
+
+        self.fs.flush()
+        self.assertTrue(os.path.exists(group_path))
+        self.assertEqual(len(self.fs.get_offline_features("customer_features")), 2)
+
+        # Atingir o limite de linhas dispara o flush no worker de fundo
+        self.fs.offline_flush_rows = 2
+        self.fs.ingest_batch("customer_features", [
+            ("CUST034", {"total_spent": 10.0, "total_purchases": 1}, datetime.now()),
+            ("CUST035", {"total_spent": 20.0, "total_purchases": 2}, datetime.now())
+        ])
+        self.fs._offline_executor.submit(lambda: None).result()  # aguardar o worker
+        self.assertEqual(self.fs._offline_buffer, {})
+        self.assertEqual(self.fs._offline_pending, {})
+
+    def test_close_flushes_offline_buffer(self):
+        """Testa que close (ou o bloco with) grava o buffer e finaliza os arquivos"""
+        group_path = os.path.join(self.offline_store_test_path, "customer_features")
+        self.fs.offline_flush_interval = 3600
+        with self.fs as fs:
+            fs.ingest_data("customer_features", "CUST043", {"total_spent": 10.0, "total_purchases": 1}, datetime.now())
+            self.assertFalse(os.path.exists(group_path))
+        self.assertEqual(self.fs._offline_buffer, {})
+        self.assertEqual(self.fs._offline_writers, {})
+        self.assertEqual(len(pd.read_parquet(group_path)), 1)
+
+        # Depois de fechada, a store continua gravando (sem o worker de fundo)
+        self.fs.offline_flush_rows = 1
+        self.fs.ingest_data("customer_features", "CUST044", {"total_spent": 10.0, "total_purchases": 1}, datetime.now())
+        self.assertEqual(self.fs._offline_buffer, {})
+
+    def test_offline_writer_appends_row_groups(self):
+        """Testa que flushes da mesma partição anexam row groups a um único arquivo"""
+        timestamp = datetime(2025, 3, 1, 12, 0, 0)
+        self.fs.offline_flush_interval = 3600
+        for i, entity_id in enumerate(["CUST038", "CUST039"]):
+            self.fs.ingest_data("customer_features", entity_id, {"total_spent": 10.0 * (i + 1), "total_purchases": 1}, timestamp)
+            self.fs.flush()
+        self.assertIn(("customer_features", "2025-03-01"), self.fs._offline_writers)
+
+        # A leitura finaliza o arquivo aberto antes de ler a partição
+        historical_features_df = self.fs.get_offline_features("customer_features")
+        self.assertEqual(sorted(historical_features_df["entity_id"]), ["CUST038", "CUST039"])
+        self.assertEqual(self.fs._offline_writers, {})
+
+        partition_path = os.path.join(self.offline_store_test_path, "customer_features", "date=2025-03-01")
+        files = os.listdir(partition_path)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(pq.ParquetFile(os.path.join(partition_path, files[0])).num_row_groups, 2)
+
+    def test_offline_flush_row_group_size(self):
+        """Testa que um flush vira um único row group, dividido só acima de offline_row_group_size"""
+        timestamp = datetime(2025, 3, 3, 12, 0, 0)
+        self.fs.offline_flush_interval = 3600
+        self.fs.offline_flush_rows = 100_000
+        num_rows = 10_000
+        entity_ids = [f"CUST{i:06d}" for i in range(num_rows)]
+        columns = {"total_spent": [10.0] * num_rows, "total_purchases": [1] * num_rows, "timestamp": [timestamp] * num_rows}
+        self.fs.ingest_columns("customer_features", entity_ids, columns)
+        self.fs.flush(close=True)
+
+        partition_path = os.path.join(self.offline_store_test_path, "customer_features", "date=2025-03-03")
+        metadata = pq.ParquetFile(os.path.join(partition_path, os.listdir(partition_path)[0])).metadata
+        self.assertEqual(metadata.num_rows, num_rows)
+        self.assertEqual(metadata.num_row_groups, 1)
+
+        self.fs.offline_row_group_size = 4000
+        self.fs.ingest_columns("customer_features", entity_ids, columns)
+        self.fs.flush(close=True)
+        row_groups = sorted(pq.ParquetFile(os.path.join(partition_path, name)).metadata.num_row_groups for name in os.listdir(partition_path))
+        self.assertEqual(row_groups, [1, 3])
+
+    def test_offline_open_file_hidden_until_closed(self):
+        """Testa que o arquivo aberto (sem footer) fica oculto e não quebra outros leitores"""
+        timestamp = datetime(2025, 3, 4, 12, 0, 0)
+        self.fs.offline_flush_interval = 3600
+        self.fs.ingest_data("customer_features", "CUST058", {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+        self.fs.flush(close=True)
+        self.fs.ingest_data("customer_features", "CUST059", {"total_spent": 20.0, "total_purchases": 2}, timestamp)
+        self.fs.flush()
+
+        partition_path = os.path.join(self.offline_store_test_path, "customer_features", "date=2025-03-04")
+        names = sorted(os.listdir(partition_path), key=lambda name: not name.startswith("."))
+        self.assertTrue(names[0].startswith(".inprogress-"))
+        self.assertFalse(names[1].startswith("."))
+
+        # Outra store no mesmo diretório (ou um processo reiniciado sem close) lê só os arquivos finalizados
+        reader = FeatureStore(name="reader-fs", offline_store_path=self.offline_store_test_path, online_store_client=MockRedis())
+        reader.register_feature_group(self.customer_fg)
+        historical_features_df = reader.get_historical_features("customer_features", timestamp, timestamp)
+        self.assertEqual(list(historical_features_df["entity_id"]), ["CUST058"])
+
+        self.fs.flush(close=True)
+        self.assertFalse(any(name.startswith(".") for name in os.listdir(partition_path)))
+        self.assertEqual(len(self.fs.get_historical_features("customer_features", timestamp, timestamp)), 2)
+
+    def test_offline_partition_dir_created_once(self):
+        """Testa que o diretório da partição é criado uma vez e recriado se removido"""
+        from unittest import mock
+        timestamp = datetime(2025, 3, 2, 12, 0, 0)
+        with mock.patch("feature_store.os.makedirs", wraps=os.makedirs) as makedirs:
+            for entity_id in ["CUST055", "CUST056"]:
+                self.fs.ingest_data("customer_features", entity_id, {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+                self.fs.flush(close=True)
+        partition_path = os.path.join(self.offline_store_test_path, "customer_features", "date=2025-03-02")
+        self.assertEqual([c.args[0] for c in makedirs.call_args_list].count(partition_path), 1)
+        self.assertEqual(len(os.listdir(partition_path)), 2)
+        shutil.rmtree(partition_path)
+        self.fs.ingest_data("customer_features", "CUST057", {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+        historical_features_df = self.fs.get_historical_features("customer_features", timestamp, timestamp)
+        self.assertEqual(list(historical_features_df["entity_id"]), ["CUST057"])
+
+    def test_offline_buffer_columnar(self):
+        """Testa o buffer offline colunar e a separação por data no flush"""
+        self.fs.offline_flush_interval = 3600
+        self.fs.ingest_batch("customer_features", [
+            ("CUST046", {"total_spent": 10.0, "total_purchases": 1}, datetime(2025, 4, 1, 9)),
+            ("CUST047", {"total_spent": 20.0, "total_purchases": 2}, datetime(2025, 4, 2, 9))
+        ])
+        buffer = self.fs._offline_buffer["customer_features"]
+        self.assertEqual(buffer["entity_id"], ["CUST046", "CUST047"])
+        self.assertEqual(buffer["date"], ["2025-04-01", "2025-04-02"])
+
+        self.fs.flush()
+        group_path = os.path.join(self.offline_store_test_path, "customer_features")
+        self.assertEqual(sorted(os.listdir(group_path)), ["date=2025-04-01", "date=2025-04-02"])
+        historical_features_df = self.fs.get_historical_features("customer_features", datetime(2025, 4, 2), datetime(2025, 4, 2))
+        self.assertEqual(list(historical_features_df["entity_id"]), ["CUST047"])
+
+    def test_historical_features_cached(self):
+        """Testa o cache de janelas históricas e sua invalidação por novas escritas"""
+        timestamp = datetime(2025, 5, 1, 10)
+        window = (timestamp - timedelta(days=1), timestamp + timedelta(days=1))
+        self.fs.ingest_data("customer_features", "CUST048", {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+        self.assertEqual(len(self.fs.get_historical_features("customer_features", *window)), 1)
+
+        key = ("customer_features", "2025-04-30", "2025-05-02", None, None)
+        cached_table = self.fs._historical_cache[key][1]
+        self.assertEqual(len(self.fs.get_historical_features("customer_features", *window)), 1)
+        self.assertIs(self.fs._historical_cache[key][1], cached_table)
+
+        # Novos dados no grupo invalidam a janela
+        self.fs.ingest_data("customer_features", "CUST049", {"total_spent": 20.0, "total_purchases": 2}, timestamp)
+        self.assertEqual(len(self.fs.get_historical_features("customer_features", *window)), 2)
+        self.assertIsNot(self.fs._historical_cache[key][1], cached_table)
+
+    def test_historical_features_projection_and_filter(self):
+        """Testa a leitura histórica com projeção de colunas, filtro de linhas e saída Arrow"""
+        timestamp = datetime(2025, 6, 1, 10)
+        self.fs.ingest_batch("customer_features", [
+            ("CUST050", {"total_spent": 10.0, "total_purchases": 1}, timestamp),
+            ("CUST051", {"total_spent": 90.0, "total_purchases": 9}, timestamp)
+        ])
+        table = self.fs.get_historical_features(
+            "customer_features", timestamp, timestamp,
+            columns=["entity_id", "total_purchases"],
+            row_filter=ds.field("total_purchases") > 5,
+            as_arrow=True
+        )
+        self.assertIsInstance(table, pa.Table)
+        self.assertEqual(table.column_names, ["entity_id", "total_purchases"])
+        self.assertEqual(table.to_pylist(), [{"entity_id": "CUST051", "total_purchases": 9}])
+
+    def test_historical_features_numpy_dict(self):
+        """Testa a saída histórica como dict de arrays NumPy, com e sem o cache"""
+        timestamp = datetime(2025, 6, 2, 10)
+        self.fs.ingest_batch("customer_features", [
+            ("CUST059", {"total_spent": 10.0, "total_purchases": 1}, timestamp),
+            ("CUST060", {"total_spent": 90.0, "total_purchases": 9}, timestamp)
+        ])
+        arrays = self.fs.get_historical_features("customer_features", timestamp, timestamp, as_numpy_dict=True)
+        self.assertIsInstance(arrays["avg_purchase_value"], np.ndarray)
+        np.testing.assert_allclose(arrays["avg_purchase_value"], [10.0, 10.0])
+        self.assertEqual(list(arrays["entity_id"]), ["CUST059", "CUST060"])
+        with self.assertRaises(ValueError):
+            self.fs.get_historical_features("customer_features", timestamp, timestamp, as_arrow=True, as_numpy_dict=True)
+
+        # Sem cache, a conversão para pandas pode consumir a tabela
+        self.fs.historical_cache_size = 0
+        for _ in range(2):
+            historical_features_df = self.fs.get_historical_features("customer_features", timestamp, timestamp)
+            self.assertEqual(list(historical_features_df["entity_id"]), ["CUST059", "CUST060"])
+
+    def test_historical_features_entity_ids(self):
+        """Testa o filtro de entidades aplicado na leitura histórica"""
+        timestamp = datetime(2025, 6, 3, 10)
+        self.fs.ingest_batch("customer_features", [
+            ("CUST061", {"total_spent": 10.0, "total_purchases": 1}, timestamp),
+            ("CUST062", {"total_spent": 90.0, "total_purchases": 9}, timestamp),
+            ("CUST063", {"total_spent": 40.0, "total_purchases": 4}, timestamp)
+        ])
+        historical_features_df = self.fs.get_historical_features(
+            "customer_features", timestamp, timestamp, entity_ids=["CUST063", "CUST061"]
+        )
+        self.assertEqual(sorted(historical_features_df["entity_id"]), ["CUST061", "CUST063"])
+
+        table = self.fs.get_historical_features(
+            "customer_features", timestamp, timestamp, row_filter=ds.field("total_purchases") > 2,
+            entity_ids=["CUST061", "CUST062"], as_arrow=True
+        )
+        self.assertEqual(table.column("entity_id").to_pylist(), ["CUST062"])
+
+    def test_memory_offline_backend(self):
+        """Testa o backend offline em memória: mesmas leituras do Parquet, sem tocar o disco"""
+        memory_path = os.path.join(self.offline_store_test_path, "memory")
+        memory_fs = FeatureStore(name="memory-fs", offline_store_path=memory_path, offline_backend="memory", online_store_client=MockRedis())
+        memory_fs.register_feature_group(self.customer_fg)
+        self.assertIsNone(memory_fs.get_historical_features("customer_features", datetime(2020, 1, 1), datetime(2020, 1, 2)))
+
+        timestamp = datetime(2025, 6, 4, 10)
+        items = [
+            ("CUST064", {"total_spent": 10.0, "total_purchases": 1}, timestamp),
+            ("CUST065", {"total_spent": 90.0, "total_purchases": 9}, timestamp + timedelta(days=1))
+        ]
+        for store in (self.fs, memory_fs):
+            store.ingest_batch("customer_features", items)
+        window = (timestamp, timestamp + timedelta(days=1))
+        expected = self.fs.get_historical_features("customer_features", *window)
+        pd.testing.assert_frame_equal(memory_fs.get_historical_features("customer_features", *window), expected)
+        table = memory_fs.get_historical_features(
+            "customer_features", *window, columns=["entity_id"],
+            row_filter=ds.field("total_purchases") > 5, as_arrow=True
+        )
+        self.assertEqual(table.to_pylist(), [{"entity_id": "CUST065"}])
+        self.assertFalse(os.path.exists(memory_path))
+
+        with self.assertRaises(ValueError):
+            FeatureStore(name="invalid-fs", offline_store_path=memory_path, offline_backend="sqlite")
+
+    def test_offline_schema_cached(self):
+        """Testa que o schema Arrow do grupo é reutilizado entre flushes sem truncar floats"""
+        # Sem compras, a média é o inteiro 0: a coluna numérica ainda assim vira float64
+        self.fs.ingest_data("customer_features", "CUST036", {"total_spent": 0, "total_purchases": 0}, datetime.now())
+        self.fs.flush()
+        schema = self.fs._arrow_schemas["customer_features"][1]
+        self.assertEqual(schema.field("avg_purchase_value").type, pa.float64())
+
+        self.fs.ingest_data("customer_features", "CUST037", {"total_spent": 5.0, "total_purchases": 2}, datetime.now())
+        self.fs.flush()
+        self.assertIs(self.fs._arrow_schemas["customer_features"][1], schema)
+
+        # Uma feature sem valores no primeiro lote recebe o tipo do FeatureType
+        fg = FeatureGroup(name="flags", entity="customer", description="Flags opcionais")
+        fg.add_feature(Feature(
+            metadata=FeatureMetadata(name="is_vip", description="Cliente VIP", feature_type=FeatureType.BOOLEAN, entity="customer", owner="test-team"),
+            validation=FeatureValidation(not_null=False)
+        ))
+        self.fs.register_feature_group(fg)
+        self.fs.ingest_data("flags", "CUST036", {"is_vip": None}, datetime.now())
+        self.fs.flush()
+        self.assertEqual(self.fs._arrow_schemas["flags"][1].field("is_vip").type, pa.bool_())
+
+        historical_features_df = self.fs.get_offline_features("customer_features")
+        values = historical_features_df.set_index("entity_id")["avg_purchase_value"]
+        self.assertEqual(values["CUST036"], 0.0)
+        self.assertEqual(values["CUST037"], 2.5)
+
+    def test_offline_categorical_dictionary_zstd(self):
+        """Testa que categóricas são gravadas como dicionário em arquivos zstd"""
+        fg = FeatureGroup(name="segments", entity="customer", description="Segmentos de clientes")
+        fg.add_feature(Feature(
+            metadata=FeatureMetadata(name="segment", description="Segmento do cliente", feature_type=FeatureType.CATEGORICAL, entity="customer", owner="test-team")
+        ))
+        self.fs.register_feature_group(fg)
+        timestamp = datetime(2025, 7, 1, 10)
+        self.fs.ingest_batch("segments", [
+            ("CUST052", {"segment": "gold"}, timestamp),
+            ("CUST053", {"segment": "silver"}, timestamp),
+            ("CUST054", {"segment": "gold"}, timestamp)
+        ])
+        self.fs.flush(close=True)
+        self.assertEqual(self.fs._arrow_schemas["segments"][1].field("segment").type, pa.dictionary(pa.int32(), pa.string()))
+
+        partition_path = os.path.join(self.offline_store_test_path, "segments", "date=2025-07-01")
+        metadata = pq.ParquetFile(os.path.join(partition_path, os.listdir(partition_path)[0])).metadata
+        self.assertEqual(metadata.row_group(0).column(0).compression, "ZSTD")
+
+        historical_features_df = self.fs.get_historical_features("segments", timestamp, timestamp)
+        self.assertEqual(str(historical_features_df["segment"].dtype), "category")
+        self.assertEqual(list(historical_features_df["segment"]), ["gold", "silver", "gold"])
+
+    def test_ingest_features_batch(self):
+        """Testa a ingestão em lote (pipeline Redis + escrita offline única)"""
+        records = [
+            {"entity_id": "CUST010", "data": {"total_spent": 200.00, "total_purchases": 2}},
+            {"entity_id": "CUST011", "data": {"total_spent": 900.00, "total_purchases": 3}}
+        ]
+        self.fs.ingest_features_batch("customer_features", records)
+
+        online_features = self.fs.get_online_features("customer_features", "CUST011")
+        self.assertEqual(online_features["total_purchases"], "3")
+        self.assertAlmostEqual(float(online_features["avg_purchase_value"]), 300.00)
+
+        historical_features_df = self.fs.get_offline_features("customer_features")
+        self.assertEqual(len(historical_features_df), 2)
+        self.assertEqual(set(historical_features_df["entity_id"]), {"CUST010", "CUST011"})
+
+    def test_ingest_features_batch_mixed_keys(self):
+        """Testa que registros com campos diferentes não recebem None nos campos ausentes"""
+        fg = FeatureGroup(name="bonus", entity="customer", description="Bônus opcional", features=[
+            Feature(
+                metadata=FeatureMetadata(name="total", description="Soma com bônus", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"),
+                transformation=FeatureTransformation(
+                    name="total", description="a + bônus (default 7)", source_features=["a"],
+                    transformation_fn=lambda d: d.get("bonus", 7) + d["a"]
+                )
+            )
+        ])
+        self.fs.register_feature_group(fg)
+        self.fs.ingest_features_batch("bonus", [
+            {"entity_id": "CUST025", "data": {"a": 1, "bonus": 2}},
+            {"entity_id": "CUST026", "data": {"a": 1}}
+        ])
+        self.assertEqual(self.fs.get_online_features("bonus", "CUST025")["total"], "3")
+        self.assertEqual(self.fs.get_online_features("bonus", "CUST026")["total"], "8")
+
+    def test_ingest_features_batch_invalid_record(self):
+        """Testa que um registro inválido aborta o lote inteiro"""
+        records = [
+            {"entity_id": "CUST012", "data": {"total_spent": 200.00, "total_purchases": 2}},
+            {"entity_id": "CUST013", "data": {"total_spent": 100.00, "total_purchases": -1}}
+        ]
+        with self.assertRaises(ValueError):
+            self.fs.ingest_features_batch("customer_features", records)
+        self.assertEqual(self.fs.get_online_features("customer_features", "CUST012"), {})
+
+    def test_ingest_features_batch_columnar(self):
+        """Testa a ingestão em lote no formato colunar (SoA)"""
+        columns = {"total_spent": [200.00, 900.00], "total_purchases": [2, 3]}
+        self.fs.ingest_features_batch("customer_features", columns, entity_ids=["CUST014", "CUST015"])
+
+        online_features = self.fs.get_online_features("customer_features", "CUST015")
+        self.assertEqual(online_features["total_purchases"], "3")
+        self.assertAlmostEqual(float(online_features["avg_purchase_value"]), 300.00)
+
+    def test_ingest_columns_numpy_timestamps(self):
+        """Testa timestamps colunares em array NumPy/Series (NaT usa o horário atual)"""
+        timestamps = np.array(["2025-05-01T10:00", "NaT"], dtype="datetime64[ns]")
+        columns = {"total_spent": np.array([20.0, 30.0]), "total_purchases": np.array([2, 3]), "timestamp": timestamps}
+        self.fs.ingest_features_batch("customer_features", columns, entity_ids=["CUST018", "CUST019"])
+        self.fs.ingest_columns("customer_features", ["CUST024"], {
+            "total_spent": [10.0], "total_purchases": [1], "timestamp": pd.Series(pd.to_datetime(["2025-05-02"]))
+        })
+
+        historical_features_df = self.fs.get_offline_features("customer_features").set_index("entity_id")
+        self.assertEqual(historical_features_df.loc["CUST018", "timestamp"], "2025-05-01T10:00:00")
+        self.assertEqual(historical_features_df.loc["CUST024", "timestamp"], "2025-05-02T00:00:00")
+        self.assertGreater(historical_features_df.loc["CUST019", "timestamp"], "2025-05-02")
+
+    def test_ingest_columns_length_mismatch(self):
+        """Testa que colunas com tamanhos diferentes de entity_ids são rejeitadas"""
+        columns = {"total_spent": [200.00], "total_purchases": [2, 3]}
+        with self.assertRaises(ValueError):
+            self.fs.ingest_columns("customer_features", ["CUST016", "CUST017"], columns)
+
+    def test_ingest_stream(self):
+        """Testa a ingestão de vários lotes colunares via thread escritora"""
+        batches = [
+            (["CUST020", "CUST021"], {"total_spent": [10.0, 20.0], "total_purchases": [1, 2]}),
+            (["CUST022"], {"total_spent": [90.0], "total_purchases": [3]})
+        ]
+        self.assertEqual(self.fs.ingest_stream("customer_features", iter(batches)), 3)
+        self.assertAlmostEqual(float(self.fs.get_online_features("customer_features", "CUST022")["avg_purchase_value"]), 30.0)
+        self.assertEqual(len(self.fs.get_offline_features("customer_features")), 3)
+
+        with self.assertRaises(ValueError):
+            self.fs.ingest_stream("customer_features", [(["CUST023"], {"total_spent": [1.0], "total_purchases": [-1]})])
+
+    def test_ingest_float32_storage(self):
+        """Testa que features com storage_dtype float32 são reduzidas só no armazenamento online"""
+        self.avg_purchase_value_feature.metadata.storage_dtype = "float32"
+        self.fs.ingest_data("customer_features", "CUST018", {"total_spent": 100.0, "total_purchases": 3}, datetime.now())
+
+        online_features = self.fs.get_online_features("customer_features", "CUST018")
+        self.assertEqual(online_features["avg_purchase_value"], "33.333332")
+        self.assertEqual(online_features["total_purchases"], "3")
+
+        historical_features_df = self.fs.get_offline_features("customer_features")
+        self.assertEqual(historical_features_df["avg_purchase_value"].iloc[0], 100.0 / 3)
+
+    def test_online_int8_embedding_storage(self):
+        """Testa que embeddings com storage_dtype="int8" são gravados quantizados só online"""
+        codes, scale = quantize_int8([0.5, -1.27, 0.0])
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(list(codes), [50, -127, 0])
+        np.testing.assert_allclose(dequantize_int8(codes, scale), [0.5, -1.27, 0.0], atol=scale / 2)
+
+        embedding = [0.12, -0.5, 0.33, 0.9]
+        embedding_feature = Feature(
+            metadata=FeatureMetadata(
+                name="profile_embedding", description="Embedding do perfil", feature_type=FeatureType.EMBEDDING,
+                entity="customer", owner="test-team", storage_dtype="int8"
+            ),
+            validation=FeatureValidation.make(not_null=False)
+        )
+        fg = FeatureGroup(name="customer_embeddings", entity="customer", description="Embeddings", features=[embedding_feature])
+        self.fs.register_feature_group(fg)
+        self.fs.online_json_payload = True
+        self.fs.ingest_data("customer_embeddings", "CUST064", {"profile_embedding": embedding}, datetime.now())
+
+        online_features = self.fs.get_online_features("customer_embeddings", "CUST064")
+        decoded = decode_int8_embedding(online_features["profile_embedding"])
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_allclose(decoded, embedding, atol=0.9 / 127)
+        typed = self.fs.get_online_features_typed("customer_embeddings", "CUST064")
+        self.assertEqual(typed["profile_embedding"], online_features["profile_embedding"])
+
+        historical_features_df = self.fs.get_offline_features("customer_embeddings")
+        self.assertEqual(list(historical_features_df["profile_embedding"].iloc[0]), embedding)
+
+    def test_get_online_features_projection(self):
+        """Testa a leitura de apenas algumas features (HMGET)"""
+        self.fs.ingest_data("customer_features", "CUST019", {"total_spent": 100.0, "total_purchases": 4}, datetime.now())
+        features = self.fs.get_online_features("customer_features", "CUST019", ["avg_purchase_value", "missing"])
+        self.assertEqual(features, {"avg_purchase_value": "25.0"})
+
+    def test_shared_instance(self):
+        """Testa que FeatureStore.shared reutiliza instâncias com a mesma configuração"""
+        shared = FeatureStore.shared("shared-fs", offline_store_path=self.offline_store_test_path)
+        self.assertIs(shared, FeatureStore.shared("shared-fs", offline_store_path=self.offline_store_test_path))
+        self.assertIsNot(shared, FeatureStore.shared("other-fs", offline_store_path=self.offline_store_test_path))
+        self.assertIsNot(shared, FeatureStore("shared-fs", offline_store_path=self.offline_store_test_path))
+
     def test_get_online_features_non_existent(self):
         """Testa a busca de features online para entidade inexistente"""
         features = self.fs.get_online_features("customer_features", "NONEXISTENT")
@@ -164,6 +698,51 @@ class TestFeatureStore(unittest.TestCase):
         """Testa a falha na validação de uma feature"""
         self.assertFalse(self.total_purchases_feature._validate_value(-5))
 
+    def test_feature_validation_shared(self):
+        """Testa que regras de validação idênticas compartilham a mesma instância"""
+        validation = FeatureValidation.make(min_value=0, allowed_values=["a", "b"])
+        self.assertIs(validation, FeatureValidation.make(min_value=0, allowed_values=("a", "b")))
+        self.assertIsNot(validation, FeatureValidation.make(min_value=1, allowed_values=["a", "b"]))
+        with self.assertRaises(AttributeError):
+            validation.min_value = 5
+
+    def test_feature_validation_allowed_set(self):
+        """Testa a pertinência em allowed_values via frozenset, com fallback para não-hasheáveis"""
+        feature = Feature(
+            metadata=FeatureMetadata(name="tier", description="Nível", feature_type=FeatureType.CATEGORICAL, entity="customer", owner="test-team"),
+            validation=FeatureValidation.make(allowed_values=["gold", "silver"])
+        )
+        self.assertEqual(feature.validation.allowed_set, frozenset({"gold", "silver"}))
+        self.assertTrue(feature._validate_value("gold"))
+        self.assertFalse(feature._validate_value("bronze"))
+        self.assertFalse(feature._validate_value(["gold"]))
+
+        # O compute_all gerado rejeita o valor não hasheável do mesmo jeito (ValueError)
+        fg = FeatureGroup(name="tiers", entity="customer", description="Níveis", features=[feature])
+        self.assertEqual(fg.compute_all({"tier": "gold"}), {"tier": "gold"})
+        with self.assertRaises(ValueError):
+            fg.compute_all({"tier": ["gold"]})
+
+        feature.validation = FeatureValidation(allowed_values=[[1, 2], [3]])
+        self.assertIsNone(feature.validation.allowed_set)
+        self.assertTrue(feature._validate_value([3]))
+        self.assertFalse(feature._validate_value([4]))
+
+    def test_feature_validation_compiled(self):
+        """Testa o validador vetorizado contra a validação valor a valor"""
+        validation = FeatureValidation.make(min_value=0, max_value=10, allowed_values=[0, 2, 5, 11])
+        self.assertIs(validation.compile(), FeatureValidation(0, 10, (0, 2, 5, 11)).compile())
+        values = np.array([0.0, 2.0, 3.0, -1.0, 11.0, 5.0])
+        np.testing.assert_array_equal(validation.compile()(values), [True, True, False, False, False, True])
+
+        # Mesma semântica de _validate_value: NaN não viola min/max
+        feature = Feature(
+            metadata=FeatureMetadata(name="score", description="Score", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"),
+            validation=FeatureValidation.make(min_value=0)
+        )
+        for value in (np.nan, -1.0, 1.0):
+            self.assertEqual(bool(feature.validation.compile()(np.array([value]))[0]), feature._validate_value(value))
+
     def test_feature_transformation(self):
         """Testa a transformação de uma feature"""
         data = {"total_spent": 100.0, "total_purchases": 10}
@@ -174,6 +753,553 @@ class TestFeatureStore(unittest.TestCase):
         transformed_value_zero = self.avg_purchase_value_feature.compute(data_zero_purchases)
         self.assertAlmostEqual(transformed_value_zero, 0.0)
 
+    def test_online_null_feature_removed_from_hash(self):
+        """Testa que features nulas não vão no HSET e removem o valor anterior do hash"""
+        fg = FeatureGroup(name="optional_flags", entity="customer", description="Flags opcionais")
+        fg.add_feature(Feature(
+            metadata=FeatureMetadata(name="is_vip", description="Cliente VIP", feature_type=FeatureType.BOOLEAN, entity="customer", owner="test-team"),
+            validation=FeatureValidation(not_null=False)
+        ))
+        self.fs.register_feature_group(fg)
+        self.fs.ingest_data("optional_flags", "CUST058", {"is_vip": True}, datetime.now())
+        self.assertEqual(self.fs.get_online_features("optional_flags", "CUST058")["is_vip"], "True")
+
+        commands = []
+        pipeline = self.fs.online_store.pipeline
+        def recording_pipeline(transaction=True):
+            pipe = pipeline(transaction)
+            execute = pipe.execute
+            pipe.execute = lambda: commands.extend(pipe.commands) or execute()
+            return pipe
+        self.fs.online_store.pipeline = recording_pipeline
+        self.fs.ingest_data("optional_flags", "CUST058", {"is_vip": None}, datetime.now())
+        hset_mapping = next(kwargs["mapping"] for name, args, kwargs in commands if name == "hset")
+        self.assertNotIn(None, hset_mapping.values())
+        self.assertNotIn("is_vip", self.fs.get_online_features("optional_flags", "CUST058"))
+
+    def test_online_features_columnar(self):
+        """Testa a leitura online colunar: uma coluna tipada por feature, NaN para ausentes"""
+        fg = FeatureGroup(name="scoring", entity="customer", description="Entrada do modelo")
+        for name, feature_type in [("score", FeatureType.NUMERICAL), ("is_vip", FeatureType.BOOLEAN), ("segment", FeatureType.CATEGORICAL)]:
+            fg.add_feature(Feature(
+                metadata=FeatureMetadata(name=name, description=name, feature_type=feature_type, entity="customer", owner="test-team"),
+                validation=FeatureValidation(not_null=False)
+            ))
+        self.fs.register_feature_group(fg)
+        timestamp = datetime.now()
+        self.fs.ingest_batch("scoring", [
+            ("CUST061", {"score": 0.5, "is_vip": True, "segment": "gold"}, timestamp),
+            ("CUST062", {"score": np.float64(2.0), "is_vip": np.bool_(False), "segment": None}, timestamp)
+        ])
+        # Como no cliente real, booleanos e escalares NumPy não chegam crus ao HSET
+        self.assertEqual(self.fs.get_online_features("scoring", "CUST062")["is_vip"], "False")
+
+        self.fs.online_pipeline_chunk = 2
+        columns = self.fs.get_online_features_columnar("scoring", ["CUST061", "CUST999", "CUST062"])
+        np.testing.assert_array_equal(columns["score"], [0.5, np.nan, 2.0])
+        np.testing.assert_array_equal(columns["is_vip"], [1.0, np.nan, 0.0])
+        self.assertEqual(list(columns["segment"]), ["gold", None, None])
+
+        columns = self.fs.get_online_features_columnar("scoring", [], features=["score"])
+        self.assertEqual(list(columns), ["score"])
+        self.assertEqual(len(columns["score"]), 0)
+        with self.assertRaises(ValueError):
+            self.fs.get_online_features_columnar("nonexistent_group", ["CUST061"])
+
+    def test_online_ttl_and_typed_payload(self):
+        """Testa a expiração das chaves online e a leitura tipada do payload JSON"""
+        self.fs.online_ttl = 3600
+        self.fs.online_json_payload = True
+        self.fs.ingest_data("customer_features", "CUST045", {"total_spent": 30.0, "total_purchases": 3}, datetime.now())
+
+        ttls = self.fs.online_store.ttls
+        self.assertEqual(ttls["customer_features:CUST045"], 3600)
+        self.assertEqual(ttls["customer_features:CUST045:json"], 3600)
+
+        typed = self.fs.get_online_features_typed("customer_features", "CUST045")
+        self.assertEqual(typed["total_purchases"], 3)
+        self.assertEqual(typed["avg_purchase_value"], 10.0)
+        self.assertIsNone(self.fs.get_online_features_typed("customer_features", "MISSING"))
+
+    def test_ingest_async(self):
+        """Testa a ingestão assíncrona: lotes no worker, flush como barreira e fallback após close"""
+        with self.assertRaises(ValueError):
+            self.fs.ingest_async("nonexistent_group", "CUST090", {"total_spent": 1.0})
+
+        timestamp = datetime(2025, 8, 1, 10)
+        self.fs.ingest_async("customer_features", "CUST090", {"total_spent": 30.0, "total_purchases": 3}, timestamp)
+        # Item inválido é descartado sem derrubar o worker
+        self.fs.ingest_async("customer_features", "CUST091", {"total_spent": 30.0, "total_purchases": -1}, timestamp)
+        self.fs.ingest_async("customer_features", "CUST092", {"total_spent": 50.0, "total_purchases": 5, "timestamp": timestamp.isoformat()})
+        self.fs.flush()
+
+        self.assertAlmostEqual(float(self.fs.get_online_features("customer_features", "CUST090")["avg_purchase_value"]), 10.0)
+        self.assertFalse(self.fs.get_online_features("customer_features", "CUST091"))
+        historical_features_df = self.fs.get_historical_features("customer_features", timestamp, timestamp)
+        self.assertEqual(sorted(historical_features_df["entity_id"]), ["CUST090", "CUST092"])
+
+        self.fs.close()
+        self.assertFalse(self.fs._ingest_thread.is_alive())
+        self.fs.ingest_async("customer_features", "CUST093", {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+        self.assertIsNotNone(self.fs.get_online_features("customer_features", "CUST093"))
+
+    def test_ingest_async_concurrent_close(self):
+        """Testa que ingest_async concorrente com close() não deixa itens presos na fila"""
+        import threading
+        timestamp = datetime(2025, 8, 2, 10)
+        stop = threading.Event()
+
+        def producer(prefix):
+            i = 0
+            while not stop.is_set():
+                self.fs.ingest_async("customer_features", f"{prefix}{i}", {"total_spent": 10.0, "total_purchases": 1}, timestamp)
+                i += 1
+
+        producers = [threading.Thread(target=producer, args=(f"CUSTC{n}_",)) for n in range(4)]
+        for thread in producers:
+            thread.start()
+        time.sleep(0.05)
+        self.fs.close()
+        stop.set()
+        for thread in producers:
+            thread.join()
+
+        # Com a fila drenada, flush (e um segundo close) retornam
+        closer = threading.Thread(target=lambda: (self.fs.flush(), self.fs.close()))
+        closer.start()
+        closer.join(timeout=10)
+        self.assertFalse(closer.is_alive())
+        self.assertEqual(self.fs._ingest_queue.unfinished_tasks, 0)
+
+    def test_ingest_batch_pipeline_chunks(self):
+        """Testa que lotes grandes são enviados ao Redis em vários pipelines"""
+        executed = []
+        pipeline = self.fs.online_store.pipeline
+        def counting_pipeline(transaction=True):
+            pipe = pipeline(transaction)
+            execute = pipe.execute
+            pipe.execute = lambda: executed.append(len(pipe.commands)) or execute()
+            return pipe
+        self.fs.online_store.pipeline = counting_pipeline
+        self.fs.online_pipeline_chunk = 2
+
+        timestamp = datetime.now()
+        self.fs.ingest_batch("customer_features", [
+            (f"CUST{i:03d}", {"total_spent": 10.0, "total_purchases": 1}, timestamp) for i in range(80, 85)
+        ])
+        self.assertEqual(executed, [2, 2, 1])
+        self.assertEqual(self.fs.get_online_features("customer_features", "CUST084")["total_purchases"], "1")
+
+    def test_online_read_batcher(self):
+        """Testa que leituras concorrentes agrupadas em pipeline retornam o mesmo que as diretas"""
+        from concurrent.futures import ThreadPoolExecutor
+        entity_ids = [f"CUST{i:03d}" for i in range(50, 70)]
+        self.fs.ingest_features_batch(
+            "customer_features",
+            {"total_spent": [10.0 * i for i in range(20)], "total_purchases": [i + 1 for i in range(20)]},
+            entity_ids=entity_ids
+        )
+        expected = {entity_id: self.fs.get_online_features("customer_features", entity_id) for entity_id in entity_ids}
+
+        batcher = OnlineReadBatcher(self.fs.online_store, self.fs.feature_groups, max_batch=8, max_wait_ms=5)
+        self.fs._read_batcher = batcher
+        try:
+            with ThreadPoolExecutor(max_workers=10) as pool:
+                results = dict(zip(entity_ids, pool.map(
+                    lambda entity_id: self.fs.get_online_features("customer_features", entity_id), entity_ids
+                )))
+            filtered = self.fs.get_online_features("customer_features", entity_ids[0], ["total_purchases", "missing"])
+        finally:
+            self.fs._read_batcher = None
+            batcher.close()
+        self.assertEqual(results, expected)
+        self.assertEqual(filtered, {"total_purchases": "1"})
+
+    def test_feature_transformation_memoized(self):
+        """Testa que entradas repetidas reutilizam o resultado da transformação"""
+        calls = []
+        transformation = FeatureTransformation(
+            name="double",
+            description="Dobra o valor",
+            source_features=["value"],
+            transformation_fn=lambda data: calls.append(1) or data["value"] * 2,
+            cache_size=2,
+            pure=True
+        )
+        self.assertEqual(transformation({"value": 3}), 6)
+        self.assertEqual(transformation({"value": 3, "ignored": 1}), 6)
+        self.assertEqual(len(calls), 1)
+
+        # Valores iguais de tipos diferentes não compartilham a entrada do cache
+        type_name = FeatureTransformation(
+            name="type_name", description="Tipo da fonte", source_features=["x"],
+            transformation_fn=lambda data: type(data["x"]).__name__, pure=True
+        )
+        self.assertEqual([type_name({"x": x}) for x in (True, 1, 1.0)], ["bool", "int", "float"])
+
+        # Fonte ausente não é memoizada: não se confunde com um None explícito
+        has_x = FeatureTransformation(
+            name="has_x", description="Presença da fonte", source_features=["x"],
+            transformation_fn=lambda data: "x" in data, pure=True
+        )
+        self.assertEqual([has_x({}), has_x({"x": None}), has_x({})], [False, True, False])
+
+        # O cache é limitado: a entrada mais antiga é descartada
+        transformation({"value": 4})
+        transformation({"value": 5})
+        transformation({"value": 3})
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(transformation.cache_info(), (1, 4, 2, 2))
+
+    def test_feature_transformation_impure_not_memoized(self):
+        """Testa que transformações impuras (o padrão) são sempre re-executadas"""
+        calls = []
+        transformation = FeatureTransformation(
+            name="stamp",
+            description="Depende de estado externo",
+            source_features=["value"],
+            transformation_fn=lambda data: calls.append(1) or len(calls)
+        )
+        self.assertEqual(transformation({"value": 3}), 1)
+        self.assertEqual(transformation({"value": 3}), 2)
+        self.assertEqual(transformation.cache_info().currsize, 0)
+
+    def test_feature_transformation_unpack_args(self):
+        """Testa transformações que recebem as fontes como argumentos posicionais"""
+        transformation = FeatureTransformation(
+            name="ratio",
+            description="Razão entre duas fontes",
+            source_features=["total_spent", "total_purchases"],
+            transformation_fn=lambda spent, purchases: spent / purchases,
+            unpack_args=True
+        )
+        self.assertAlmostEqual(transformation({"total_spent": 100.0, "total_purchases": 4}), 25.0)
+        with self.assertRaises(KeyError):
+            transformation({"total_spent": 100.0})
+
+    def test_compute_all_batch_dataframe(self):
+        """Testa o cálculo em lote a partir de um DataFrame"""
+        source_df = pd.DataFrame(
+            {"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]},
+            index=["CUST040", "CUST041", "CUST042"]
+        )
+        computed_df = self.customer_fg.compute_all_batch(source_df)
+        self.assertEqual(list(computed_df.columns), ["total_purchases", "avg_purchase_value"])
+        self.assertEqual(list(computed_df.index), ["CUST040", "CUST041", "CUST042"])
+        np.testing.assert_allclose(computed_df["avg_purchase_value"], [10.0, 0.0, 10.0])
+
+        # Também pode ser ingerido diretamente, com a coluna entity_id
+        self.fs.ingest_features_batch("customer_features", source_df.rename_axis("entity_id").reset_index())
+        online_features = self.fs.get_online_features("customer_features", "CUST042")
+        self.assertEqual(online_features["total_purchases"], "3")
+
+    def test_compute_all_batch_pandas_vectorized_fn(self):
+        """Testa que vectorized_fn recebe Series em compute_all_batch e pode usar a API do pandas"""
+        self.avg_purchase_value_feature.transformation.vectorized_fn = (
+            lambda df: df["total_spent"] / df["total_purchases"].clip(lower=1)
+        )
+        self.avg_purchase_value_feature.transformation.transformation_fn = None
+        source_df = pd.DataFrame(
+            {"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]},
+            index=["CUST040", "CUST041", "CUST042"]
+        )
+        computed_df = self.customer_fg.compute_all_batch(source_df)
+        np.testing.assert_allclose(computed_df["avg_purchase_value"], [10.0, 50.0, 10.0])
+
+        with self.assertRaises(ValueError):
+            self.customer_fg.compute_all_batch(pd.DataFrame({"total_spent": [-10.0], "total_purchases": [1]}))
+
+    def test_compute_batch_jit(self):
+        """Testa o kernel numba gerado com jit=True (ou o caminho escalar, sem numba)"""
+        transformation = FeatureTransformation(
+            name="calculate_avg_purchase",
+            description="Calcula a média de valor das compras",
+            source_features=["total_spent", "total_purchases"],
+            transformation_fn=lambda spent, purchases: spent / purchases if purchases > 0 else 0.0,
+            unpack_args=True,
+            jit=True
+        )
+        self.avg_purchase_value_feature.transformation = transformation
+        computed = self.customer_fg.compute_batch({"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]})
+        np.testing.assert_allclose(computed["avg_purchase_value"], [10.0, 0.0, 10.0])
+        if numba is not None:
+            self.assertIsNotNone(transformation.batch_fn())
+
+        with self.assertRaises(ValueError):
+            FeatureTransformation(name="x", description="x", source_features=["a"], transformation_fn=lambda d: d, jit=True)
+
+    def test_compute_all_batch_tiled(self):
+        """Testa que compute_all_batch em blocos produz o mesmo resultado do lote inteiro"""
+        calls = []
+        self.avg_purchase_value_feature.transformation.vectorized_fn = lambda df: calls.append(len(df["total_spent"])) or (
+            df["total_spent"] / df["total_purchases"].clip(lower=1)
+        )
+        source_df = pd.DataFrame(
+            {"total_spent": [100.0, 50.0, 30.0, 8.0, 0.0], "total_purchases": [10, 0, 3, 4, 1]},
+            index=["CUST043", "CUST044", "CUST045", "CUST046", "CUST047"]
+        )
+        expected = self.customer_fg.compute_all_batch(source_df)
+        self.customer_fg.batch_tile_rows = 2
+        tiled = self.customer_fg.compute_all_batch(source_df)
+        pd.testing.assert_frame_equal(tiled, expected)
+        self.assertEqual(calls, [5, 2, 2, 1])
+
+    def test_compute_batch_numba_fn(self):
+        """Testa o kernel numba_fn escrevendo em um array de saída pré-alocado"""
+        def kernel(spent, purchases, out):
+            self.assertTrue(spent.flags.c_contiguous and spent.dtype == np.float64)
+            np.divide(spent, purchases, out=out, where=purchases > 0)
+            out[purchases <= 0] = 0.0
+
+        transformation = self.avg_purchase_value_feature.transformation
+        transformation.numba_fn = kernel
+        computed = self.customer_fg.compute_batch({"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]})
+        np.testing.assert_allclose(computed["avg_purchase_value"], [10.0, 0.0, 10.0])
+
+        njit_kernel = make_njit_transform(lambda spent, purchases: spent / purchases if purchases > 0 else 0.0)
+        if numba is None:
+            self.assertIsNone(njit_kernel)
+        else:
+            transformation.numba_fn = njit_kernel
+            computed = self.customer_fg.compute_all_batch(
+                pd.DataFrame({"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]})
+            )
+            np.testing.assert_allclose(computed["avg_purchase_value"], [10.0, 0.0, 10.0])
+
+    def test_compute_batch_vectorized(self):
+        """Testa que o caminho vetorizado produz o mesmo resultado do escalar"""
+        self.avg_purchase_value_feature.transformation.vectorized_fn = lambda cols: np.divide(
+            cols["total_spent"], cols["total_purchases"],
+            out=np.zeros(len(cols["total_spent"])), where=cols["total_purchases"] > 0
+        )
+        columns = {"total_spent": [100.0, 50.0, 30.0], "total_purchases": [10, 0, 3]}
+        computed = self.customer_fg.compute_batch(columns)
+        self.assertEqual(computed["total_purchases"], [10, 0, 3])
+        np.testing.assert_allclose(computed["avg_purchase_value"], [10.0, 0.0, 10.0])
+
+        with self.assertRaises(ValueError):
+            self.customer_fg.compute_batch({"total_spent": [10.0], "total_purchases": [-1]})
+
+    def test_compute_batch_vectorized_failure(self):
+        """Testa que falhas do vectorized_fn são registradas e propagadas sem caminho escalar"""
+        transformation = self.avg_purchase_value_feature.transformation
+        transformation.vectorized_fn = lambda cols: 1 / 0
+        columns = {"total_spent": [100.0], "total_purchases": [10]}
+        with self.assertLogs("feature_store", level="ERROR") as logs:
+            computed = self.customer_fg.compute_batch(columns)
+        self.assertEqual(computed["avg_purchase_value"], [10.0])
+        self.assertIn("ZeroDivisionError", logs.output[0])
+
+        self.customer_fg.strict = True
+        with self.assertRaises(ZeroDivisionError):
+            self.customer_fg.compute_batch(columns)
+        self.customer_fg.strict = False
+
+        # Shape errado sem transformation_fn: o erro aparece em vez da coluna bruta
+        transformation.vectorized_fn = lambda cols: np.zeros(2)
+        transformation.transformation_fn = None
+        with self.assertRaisesRegex(ValueError, "shape"):
+            self.customer_fg.compute_batch(columns)
+
+    def test_compute_batch_column_validation(self):
+        """Testa que a validação colunar rejeita o lote indicando o primeiro valor inválido"""
+        self.avg_purchase_value_feature.validation = FeatureValidation.make(min_value=0, max_value=50)
+        self.avg_purchase_value_feature.transformation.vectorized_fn = lambda cols: cols["total_spent"] / cols["total_purchases"]
+        computed = self.customer_fg.compute_batch({"total_spent": [100.0, 30.0], "total_purchases": [10, 3]})
+        self.assertEqual(computed["avg_purchase_value"], [10.0, 10.0])
+
+        with self.assertRaisesRegex(ValueError, "avg_purchase_value': 60.0"):
+            self.customer_fg.compute_batch({"total_spent": [100.0, 600.0, 900.0], "total_purchases": [10, 10, 10]})
+
+    def test_compute_batch_categorical_validation(self):
+        """Testa a validação colunar de allowed_values contra a validação valor a valor"""
+        tier_feature = Feature(
+            metadata=FeatureMetadata(name="tier", description="Nível", feature_type=FeatureType.CATEGORICAL, entity="customer", owner="test-team"),
+            validation=FeatureValidation.make(allowed_values=["gold", "silver"], not_null=False)
+        )
+        fg = FeatureGroup(name="tiers", entity="customer", description="Níveis", features=[tier_feature])
+        computed = fg.compute_batch({"tier": ["gold", None, "silver"]})
+        self.assertEqual(computed["tier"], ["gold", None, "silver"])
+        for values in (["gold", "bronze"], [None, 1.5], [float("nan")], [["gold"]], [["gold"], ["gold", "silver"]], ["gold", ["silver"]]):
+            expected = all(tier_feature._validate_value(value) for value in values)
+            if expected:
+                fg.compute_batch({"tier": values})
+            else:
+                with self.assertRaisesRegex(ValueError, "tier"):
+                    fg.compute_batch({"tier": values})
+
+        tier_feature.validation = FeatureValidation.make(allowed_values=["gold", "silver", None])
+        with self.assertRaisesRegex(ValueError, "tier': None"):
+            fg.compute_batch({"tier": ["gold", None]})
+
+    def test_execution_plan_orders_dependencies(self):
+        """Testa que features derivadas de outras features são computadas após suas fontes"""
+        double_avg_feature = Feature(
+            metadata=FeatureMetadata(
+                name="double_avg",
+                description="Dobro do valor médio",
+                feature_type=FeatureType.NUMERICAL,
+                entity="customer",
+                owner="test-team"
+            ),
+            transformation=FeatureTransformation(
+                name="double_avg",
+                description="Dobra o valor médio de compra",
+                source_features=["avg_purchase_value"],
+                transformation_fn=lambda data: data["avg_purchase_value"] * 2
+            )
+        )
+        fg = FeatureGroup(name="derived", entity="customer", description="Features derivadas")
+        fg.add_feature(double_avg_feature)
+        fg.add_feature(self.avg_purchase_value_feature)
+
+        plan = [feature.metadata.name for feature in fg.execution_plan()]
+        self.assertEqual(plan, ["avg_purchase_value", "double_avg"])
+
+        computed = fg.compute_all({"total_spent": 100.0, "total_purchases": 10})
+        self.assertEqual(list(computed), ["double_avg", "avg_purchase_value"])
+        self.assertAlmostEqual(computed["double_avg"], 20.0)
+
+        computed = fg.compute_batch({"total_spent": [100.0, 30.0], "total_purchases": [10, 3]})
+        np.testing.assert_allclose(computed["double_avg"], [20.0, 20.0])
+
+    def test_compute_all_recompiled_on_add_feature(self):
+        """Testa que o compute_all gerado é refeito quando o grupo muda"""
+        data = {"total_spent": 100.0, "total_purchases": 4}
+        fg = FeatureGroup(name="compiled", entity="customer", description="Codegen",
+                          features=[self.total_purchases_feature])
+        self.assertEqual(fg.compute_all(data), {"total_purchases": 4})
+
+        fg.add_feature(self.avg_purchase_value_feature)
+        self.assertEqual(fg.compute_all(data), {"total_purchases": 4, "avg_purchase_value": 25.0})
+        with self.assertRaises(ValueError):
+            fg.compute_all({"total_spent": 100.0, "total_purchases": -4})
+
+    def test_compute_all_inlines_simple_lambdas(self):
+        """Testa que lambdas simples são embutidas no compute_all e as demais continuam chamadas"""
+        factor = 3
+        scaled = FeatureTransformation(
+            name="scaled", description="Depende de uma closure", source_features=["total_spent"],
+            transformation_fn=lambda data: data["total_spent"] * factor, pure=True
+        )
+        clipped = FeatureTransformation(
+            name="clipped", description="Usa builtins e argumentos posicionais",
+            source_features=["avg_purchase_value", "total_purchases"], unpack_args=True,
+            transformation_fn=lambda avg, n: min(avg, 20.0) * n
+        )
+        fg = FeatureGroup(name="inlined", entity="customer", description="Codegen", features=[
+            self.total_purchases_feature,
+            self.avg_purchase_value_feature,
+            Feature(metadata=FeatureMetadata(name="scaled", description="x3", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"), transformation=scaled),
+            Feature(metadata=FeatureMetadata(name="clipped", description="Limitada", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"), transformation=clipped)
+        ])
+        computed = fg.compute_all({"total_spent": 100.0, "total_purchases": 4})
+        self.assertEqual(computed, {"total_purchases": 4, "avg_purchase_value": 25.0, "scaled": 300.0, "clipped": 80.0})
+        self.assertEqual(fg.compute_all({"total_spent": 0.0, "total_purchases": 0})["avg_purchase_value"], 0)
+
+        # As lambdas embutidas não passam pela transformação; a closure sim
+        self.assertEqual(self.avg_purchase_value_feature.transformation.cache_info().misses, 0)
+        self.assertEqual(clipped.cache_info().misses, 0)
+        self.assertEqual(scaled.cache_info().misses, 2)
+
+    def test_feature_index(self):
+        """Testa a busca de features pelo índice (entity, nome) e sua atualização"""
+        metadata = self.fs.get_feature_metadata("total_purchases", "customer")
+        self.assertIs(metadata, self.total_purchases_feature.metadata)
+        self.assertIsNone(self.fs.get_feature_metadata("total_purchases", "product"))
+
+        # Features adicionadas a um grupo já registrado entram no índice
+        self.customer_fg.add_feature(Feature(
+            metadata=FeatureMetadata(name="loyalty_tier", description="Nível de fidelidade", feature_type=FeatureType.CATEGORICAL, entity="customer", owner="test-team")
+        ))
+        self.assertEqual(self.fs.get_feature_metadata("loyalty_tier", "customer").name, "loyalty_tier")
+        self.assertEqual([m.name for m in self.fs.list_features(entity="customer")], ["total_purchases", "avg_purchase_value", "loyalty_tier"])
+        self.assertEqual(self.fs.list_features(entity="product"), [])
+
+        self.fs.deprecate_feature("loyalty_tier", "customer")
+        self.assertEqual(self.fs.get_feature_metadata("loyalty_tier", "customer").status, FeatureStatus.DEPRECATED)
+        with self.assertLogs("feature_store", level="WARNING"):
+            self.fs.deprecate_feature("missing_feature", "customer")
+
+    def test_logging_throttled(self):
+        """Testa que avisos vão para o logger e erros repetidos por linha são limitados"""
+        with self.assertLogs("feature_store", level="WARNING") as logs:
+            self.assertFalse(self.fs.register_feature_group(self.customer_fg))
+        self.assertIn("customer_features", logs.output[0])
+
+        fg = FeatureGroup(name="log_throttle", entity="customer", description="Erros repetidos", features=[
+            Feature(
+                metadata=FeatureMetadata(name="throttled_ratio", description="Divide pela fonte", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"),
+                transformation=FeatureTransformation(
+                    name="throttled_ratio", description="1/x", source_features=["x"], pure=False,
+                    transformation_fn=lambda data, one=1: one / data["x"]
+                ),
+                validation=FeatureValidation(not_null=False)
+            )
+        ])
+        # Sem o limite (padrão), todas as mensagens saem
+        with self.assertLogs("feature_store", level="ERROR") as logs:
+            for _ in range(3):
+                self.assertIsNone(fg.compute_all({"x": 0})["throttled_ratio"])
+        self.assertEqual(len(logs.records), 3)
+
+        self.assertIsNotNone(throttle_repeated_logs(60))
+        self.addCleanup(throttle_repeated_logs, 0)
+        with self.assertLogs("feature_store", level="ERROR") as logs:
+            for _ in range(5):
+                self.assertIsNone(fg.compute_all({"x": 0})["throttled_ratio"])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("throttled_ratio", logs.output[0])
+
+        # Só repetições exatas são suprimidas: outra entidade do mesmo grupo ainda sai
+        logger = logging.getLogger("feature_store")
+        with self.assertLogs("feature_store", level="WARNING") as logs:
+            for entity_id in ["CUST095", "CUST096", "CUST096"]:
+                logger.warning("Ingestão descartada (%s/%s): %s", "customer_features", entity_id, "erro")
+        self.assertEqual([r.args[1] for r in logs.records], ["CUST095", "CUST096"])
+        self.assertIsNone(throttle_repeated_logs(0))
+
+    def test_feature_group_strict(self):
+        """Testa que, com strict=True, erros das transformações são propagados"""
+        fg = FeatureGroup(name="strict_ratio", entity="customer", description="Erros propagados", strict=True, features=[
+            Feature(
+                metadata=FeatureMetadata(name="strict_ratio", description="Divide pela fonte", feature_type=FeatureType.NUMERICAL, entity="customer", owner="test-team"),
+                transformation=FeatureTransformation(
+                    name="strict_ratio", description="1/x", source_features=["x"],
+                    transformation_fn=lambda data, one=1: one / data["x"]
+                ),
+                validation=FeatureValidation(not_null=False)
+            )
+        ])
+        self.assertEqual(fg.compute_all({"x": 4})["strict_ratio"], 0.25)
+        with self.assertRaises(ZeroDivisionError):
+            fg.compute_all({"x": 0})
+        with self.assertRaises(ZeroDivisionError):
+            fg.compute_batch({"x": [1, 0]})
+
+        fg.strict = False
+        with self.assertLogs("feature_store", level="ERROR"):
+            self.assertIsNone(fg.compute_all({"x": 0})["strict_ratio"])
+
+    def test_execution_plan_cycle(self):
+        """Testa que dependências cíclicas são rejeitadas no registro do grupo"""
+        def derived(name, source):
+            return Feature(
+                metadata=FeatureMetadata(
+                    name=name, description=name, feature_type=FeatureType.NUMERICAL,
+                    entity="customer", owner="test-team"
+                ),
+                transformation=FeatureTransformation(
+                    name=name, description=name, source_features=[source],
+                    transformation_fn=lambda data: data[source]
+                )
+            )
+        fg = FeatureGroup(name="cyclic", entity="customer", description="Ciclo",
+                          features=[derived("a", "b"), derived("b", "a")])
+        with self.assertRaises(ValueError):
+            self.fs.register_feature_group(fg)
+        self.assertNotIn("cyclic", self.fs.feature_groups)
+
     def test_flask_api_get_features(self):
         """Testa o endpoint GET /features/<group_name>/<entity_id> da API Flask"""
         try:
@@ -193,7 +1319,7 @@ class TestFeatureStore(unittest.TestCase):
 
         response = client.get(f'/features/customer_features/{entity_id}')
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertEqual(data["total_purchases"], "3")
         self.assertAlmostEqual(float(data["avg_purchase_value"]), 100.00)
 
@@ -214,8 +1340,10 @@ class TestFeatureStore(unittest.TestCase):
 
         response = client.post(f'/ingest/customer_features/{entity_id}', json=source_data)
         self.assertEqual(response.status_code, 201)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertEqual(data["status"], "success")
+        if orjson is not None:
+            self.assertIsInstance(app.json, OrjsonProvider)
 
         # Verificar se os dados foram realmente ingeridos no online store
         online_features = self.fs.get_online_features("customer_features", entity_id)
@@ -1,9 +1,11 @@
 import unittest
 import sys
 import os
+import shutil
+import tempfile
+from unittest import mock
 from datetime import datetime, timedelta
-import json
-import redis
+import pyarrow.parquet as pq
 
 # Adicionar o diretório src ao path para importar os módulos
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -19,41 +21,105 @@ from feature_store import (
     FeatureGroup
 )
 
+# Diretórios temporários dos testes: /dev/shm (tmpfs) no Linux, senão o padrão do sistema
+TEST_TMP_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+
 # Mock Redis para testes
 class MockRedis:
     def __init__(self, host='localhost', port=6379, db=0, decode_responses=True, **kwargs):
         self.data = {}
+        self.ttls = {}
         self.host = host
         self.port = port
         self.db = db
         self.decode_responses = decode_responses
 
     def hmset(self, key, mapping):
-        self.data[key] = {k: str(v) for k, v in mapping.items()} # Redis stores strings
+        # HMSET (obsoleto) é o HSET com mapping
+        return self.hset(key, mapping=mapping)
+
+    def hset(self, key, field=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if field is not None:
+            fields[field] = value
+        self.data.setdefault(key, {}).update({self._decode(k): str(v) for k, v in fields.items()})
+        return len(fields)
+
+    def hdel(self, key, *fields):
+        names = {self._decode(f) for f in fields}
+        hash_ = self.data.get(key, {})
+        removed = [name for name in names if name in hash_]
+        for name in removed:
+            del hash_[name]
+        return len(removed)
 
     def hgetall(self, key):
         return self.data.get(key, {})
 
+    def hmget(self, key, keys):
+        fields = self.data.get(key, {})
+        return [fields.get(self._decode(k)) for k in keys]
+
+    @staticmethod
+    def _decode(name):
+        # Como no cliente real com decode_responses=True, nomes em bytes voltam como str
+        return name.decode("utf-8") if isinstance(name, bytes) else name
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.decode("utf-8") if isinstance(value, bytes) else str(value)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return key in self.data
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def execute_command(self, name, *args, **options):
+        result = getattr(self, name.lower())(*args)
+        # NEVER_DECODE: resposta em bytes, mesmo com decode_responses=True
+        if "NEVER_DECODE" in options and isinstance(result, str):
+            result = result.encode("utf-8")
+        return result
+
+    def pipeline(self, transaction=True):
+        return MockPipeline(self)
+
     def flushdb(self):
         self.data = {}
+        self.ttls = {}
+
+
+class MockPipeline:
+    """Enfileira comandos e os aplica no MockRedis em execute()"""
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        results = [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+        self.commands = []
+        return results
 
 
 class TestFeatureStoreIntegration(unittest.TestCase):
     """Testes de integração para a FeatureStore, incluindo a API Flask e persistência"""
 
     def setUp(self):
-        # Mock Redis
-        self.original_redis = redis.Redis
-        redis.Redis = MockRedis
-
-        self.offline_store_test_path = './test_offline_store_integration'
-        if os.path.exists(self.offline_store_test_path):
-            import shutil
-            shutil.rmtree(self.offline_store_test_path)
-        os.makedirs(self.offline_store_test_path, exist_ok=True)
+        # Diretório offline novo por teste, fora da árvore do repositório (em tmpfs quando houver)
+        self.offline_store_test_path = tempfile.mkdtemp(prefix="fs_offline_integration_", dir=TEST_TMP_DIR)
 
-        self.fs = FeatureStore(name="test-fs-integration", offline_store_path=self.offline_store_test_path)
-        self.fs.online_store.flushdb() # Limpar mock Redis
+        self.fs = FeatureStore(name="test-fs-integration", offline_store_path=self.offline_store_test_path, online_store_client=MockRedis())
 
         # Definir features
         self.total_purchases_feature = Feature(
@@ -103,12 +169,8 @@ class TestFeatureStoreIntegration(unittest.TestCase):
         self.client = self.app.test_client()
 
     def tearDown(self):
-        # Restaurar Redis original
-        redis.Redis = self.original_redis
         # Limpar diretório de armazenamento offline
-        import shutil
-        if os.path.exists(self.offline_store_test_path):
-            shutil.rmtree(self.offline_store_test_path)
+        shutil.rmtree(self.offline_store_test_path, ignore_errors=True)
 
     def test_ingest_and_retrieve_via_api(self):
         """Testa a ingestão de dados via API e a recuperação via API e diretamente da FeatureStore"""
@@ -118,13 +180,13 @@ class TestFeatureStoreIntegration(unittest.TestCase):
         # 1. Ingestão via API
         ingest_response = self.client.post(f'/ingest/customer_features/{entity_id}', json=source_data)
         self.assertEqual(ingest_response.status_code, 201)
-        ingest_data = json.loads(ingest_response.data)
+        ingest_data = ingest_response.get_json()
         self.assertEqual(ingest_data["status"], "success")
 
         # 2. Recuperação online via API
         get_response = self.client.get(f'/features/customer_features/{entity_id}')
         self.assertEqual(get_response.status_code, 200)
-        retrieved_api_data = json.loads(get_response.data)
+        retrieved_api_data = get_response.get_json()
         self.assertEqual(retrieved_api_data["total_purchases"], "5")
         self.assertAlmostEqual(float(retrieved_api_data["avg_purchase_value"]), 100.00)
 
@@ -149,6 +211,35 @@ class TestFeatureStoreIntegration(unittest.TestCase):
         self.assertEqual(historical_features_df["total_purchases"].iloc[0], 5)
         self.assertAlmostEqual(historical_features_df["avg_purchase_value"].iloc[0], 100.00)
 
+    def test_ingest_records_batch_via_api(self):
+        """Testa a ingestão de um lote de registros em uma única requisição"""
+        records = [
+            {"entity_id": f"CUST_BATCH_{i:04d}", "data": {"total_spent": 10.0 * (i + 1), "total_purchases": 10}}
+            for i in range(1000)
+        ]
+        # As 1000 escritas online vão em um único pipeline (um round trip)
+        with mock.patch.object(MockPipeline, "execute", autospec=True, side_effect=MockPipeline.execute) as execute:
+            ingest_response = self.client.post('/ingest/customer_features', json={"records": records})
+        self.assertEqual(ingest_response.status_code, 201)
+        self.assertEqual(execute.call_count, 1)
+        self.assertEqual(ingest_response.get_json(), {"status": "success", "num_records": 1000})
+
+        online_features = self.fs.get_online_features("customer_features", "CUST_BATCH_0999")
+        self.assertAlmostEqual(float(online_features["avg_purchase_value"]), 1000.00)
+
+        # O lote todo vira um único row group no Parquet da partição
+        self.fs.flush(close=True)
+        group_path = os.path.join(self.offline_store_test_path, "customer_features")
+        files = [os.path.join(root, name) for root, _, names in os.walk(group_path) for name in names]
+        self.assertEqual(len(files), 1)
+        metadata = pq.ParquetFile(files[0]).metadata
+        self.assertEqual((metadata.num_row_groups, metadata.num_rows), (1, 1000))
+
+        # Um registro inválido rejeita o lote inteiro
+        invalid = [{"entity_id": "CUST_BATCH_X", "data": {"total_spent": 1.0, "total_purchases": -1}}]
+        self.assertEqual(self.client.post('/ingest/customer_features', json={"records": invalid}).status_code, 400)
+        self.assertEqual(self.client.post('/ingest/customer_features', json=records).status_code, 400)
+
     def test_ingest_invalid_data_via_api(self):
         """Testa a ingestão de dados inválidos via API"""
         entity_id = "CUST_API_002"
@@ -156,7 +247,7 @@ class TestFeatureStoreIntegration(unittest.TestCase):
 
         ingest_response = self.client.post(f'/ingest/customer_features/{entity_id}', json=invalid_source_data)
         self.assertEqual(ingest_response.status_code, 400) # Espera-se um erro de validação
-        ingest_data = json.loads(ingest_response.data)
+        ingest_data = ingest_response.get_json()
         self.assertIn("error", ingest_data)
 
         # Verificar que os dados não foram armazenados
@@ -167,7 +258,7 @@ class TestFeatureStoreIntegration(unittest.TestCase):
         """Testa a busca de features para um grupo inexistente via API"""
         response = self.client.get('/features/non_existent_group/some_id')
         self.assertEqual(response.status_code, 404)
-        data = json.loads(response.data)
+        data = response.get_json()
         self.assertIn("error", data)
 
 if __name__ == '__main__':
@@ -7,6 +7,9 @@ Year: 2025
 import unittest
 import sys
 import os
+import tempfile
+from unittest import mock
+import numpy as np
 import pandas as pd
 
 # Adicionar o diretório src ao path
@@ -18,6 +21,12 @@ from real_world_examples import EcommerceFeatureGenerator, FinancialFeatureGener
 class TestEcommerceFeatureGenerator(unittest.TestCase):
     """Testes para o gerador de features de e-commerce"""
 
+    @classmethod
+    def setUpClass(cls):
+        """Gera uma vez os DataFrames só lidos pelos testes (os geradores têm seed fixo)"""
+        cls.customers_df = EcommerceFeatureGenerator.generate_customer_features(100)
+        cls.products_df = EcommerceFeatureGenerator.generate_product_features(50)
+
     def setUp(self):
         """Configuração antes de cada teste"""
         self.generator = EcommerceFeatureGenerator()
@@ -25,7 +34,7 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
     def test_generate_customer_features(self):
         """Testa geração de features de clientes"""
         num_customers = 100
-        df = self.generator.generate_customer_features(num_customers)
+        df = self.customers_df
         
         # Verificar shape
         self.assertEqual(len(df), num_customers)
@@ -37,11 +46,12 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
             'email_open_rate', 'app_sessions_per_week', 'favorite_category',
             'churn_probability', 'customer_tenure_days', 'timestamp'
         ]
-        for col in expected_columns:
-            self.assertIn(col, df.columns)
+        self.assertLessEqual(set(expected_columns), set(df.columns))
         
         # Verificar tipos de dados
         self.assertTrue(pd.api.types.is_integer_dtype(df['age']))
+        # Largo o bastante para contas derivadas (int8 estouraria em age * 2)
+        self.assertEqual((df['age'] * 2).max(), 2 * int(df['age'].max()))
         self.assertTrue(pd.api.types.is_integer_dtype(df['total_purchases']))
         self.assertTrue(pd.api.types.is_float_dtype(df['total_spent']))
         
@@ -62,10 +72,21 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
         valid_categories = ['Electronics', 'Fashion', 'Home', 'Sports', 'Books']
         self.assertTrue(df['favorite_category'].isin(valid_categories).all())
 
+    def test_customer_derived_features(self):
+        """Testa as features derivadas calculadas in-place contra as fórmulas originais"""
+        df = self.generator.generate_customer_features(500)
+        days = df['days_since_last_purchase'].to_numpy()
+        np.testing.assert_array_equal(
+            df['churn_probability'].to_numpy(),
+            (1 / (1 + np.exp(-(days - 60) / 20))).round(3)
+        )
+        expected_aov = (df['total_spent'] / np.maximum(df['total_purchases'], 1)).round(2)
+        np.testing.assert_allclose(df['avg_order_value'], expected_aov, atol=0.01)
+
     def test_generate_product_features(self):
         """Testa geração de features de produtos"""
         num_products = 50
-        df = self.generator.generate_product_features(num_products)
+        df = self.products_df
         
         # Verificar shape
         self.assertEqual(len(df), num_products)
@@ -77,8 +98,7 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
             'num_reviews', 'stock_quantity', 'days_in_stock',
             'discount_percentage', 'timestamp'
         ]
-        for col in expected_columns:
-            self.assertIn(col, df.columns)
+        self.assertLessEqual(set(expected_columns), set(df.columns))
         
         # Verificar ranges válidos
         self.assertTrue((df['price'] >= 10).all())
@@ -92,8 +112,8 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
 
     def test_generate_interaction_features(self):
         """Testa geração de features de interação"""
-        customers_df = self.generator.generate_customer_features(10)
-        products_df = self.generator.generate_product_features(5)
+        customers_df = self.customers_df.head(10)
+        products_df = self.products_df.head(5)
         num_interactions = 50
         
         df = self.generator.generate_interaction_features(
@@ -109,12 +129,15 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
             'interaction_type', 'device', 'session_duration_seconds',
             'timestamp'
         ]
-        for col in expected_columns:
-            self.assertIn(col, df.columns)
+        self.assertLessEqual(set(expected_columns), set(df.columns))
         
-        # Verificar que customer_ids e product_ids são válidos
-        self.assertTrue(df['customer_id'].isin(customers_df['customer_id']).all())
-        self.assertTrue(df['product_id'].isin(products_df['product_id']).all())
+        # Verificar que customer_ids e product_ids são válidos (IDs distintos ⊆ IDs de origem)
+        self.assertLessEqual(set(df['customer_id'].unique()), set(customers_df['customer_id'].to_numpy()))
+        self.assertLessEqual(set(df['product_id'].unique()), set(products_df['product_id'].to_numpy()))
+        # Só IDs com interações entram nas contagens (sem categorias vazias)
+        self.assertTrue((df['customer_id'].value_counts() > 0).all())
+        self.assertEqual(df.groupby('customer_id', observed=False).size().sum(), num_interactions)
+        self.assertEqual(len(df.groupby('customer_id', observed=False)), df['customer_id'].nunique())
         
         # Verificar valores categóricos
         valid_interactions = ['view', 'add_to_cart', 'purchase', 'wishlist']
@@ -125,8 +148,8 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
 
     def test_reproducibility(self):
         """Testa que os dados são reprodutíveis (seed fixo)"""
-        df1 = self.generator.generate_customer_features(10)
-        df2 = self.generator.generate_customer_features(10)
+        df1 = self.customers_df
+        df2 = self.generator.generate_customer_features(100)
         
         # Com mesmo seed (42 no código), deve gerar mesmos dados
         pd.testing.assert_frame_equal(
@@ -134,6 +157,17 @@ class TestEcommerceFeatureGenerator(unittest.TestCase):
             df2.drop('timestamp', axis=1)
         )
 
+    def test_disk_cache(self):
+        """Testa que, com EXAMPLES_CACHE_DIR, a segunda geração é lida do Parquet em cache"""
+        with tempfile.TemporaryDirectory() as cache_dir, mock.patch.dict(os.environ, {"EXAMPLES_CACHE_DIR": cache_dir}):
+            df1 = self.generator.generate_customer_features(20)
+            self.assertEqual(os.listdir(cache_dir), ["generate_customer_features_20_42.parquet"])
+
+            with mock.patch.object(np.random, "poisson", side_effect=AssertionError("regenerado")):
+                df2 = self.generator.generate_customer_features(num_customers=20)
+            pd.testing.assert_frame_equal(df1.drop('timestamp', axis=1), df2.drop('timestamp', axis=1))
+            self.assertGreaterEqual(df2['timestamp'].min(), df1['timestamp'].min())
+
 
 class TestFinancialFeatureGenerator(unittest.TestCase):
     """Testes para o gerador de features financeiras"""
@@ -157,8 +191,7 @@ class TestFinancialFeatureGenerator(unittest.TestCase):
             'is_international', 'is_high_amount', 'is_unusual_hour',
             'fraud_score', 'timestamp'
         ]
-        for col in expected_columns:
-            self.assertIn(col, df.columns)
+        self.assertLessEqual(set(expected_columns), set(df.columns))
         
         # Verificar tipos de dados
         self.assertTrue(pd.api.types.is_float_dtype(df['amount']))
@@ -187,22 +220,20 @@ class TestFinancialFeatureGenerator(unittest.TestCase):
 
     def test_fraud_score_logic(self):
         """Testa que o fraud score tem lógica coerente"""
-        df = self.generator.generate_transaction_features(1000)
+        # 200 transações bastam: com o seed fixo (45) a diferença das médias é ~0.30
+        df = self.generator.generate_transaction_features(200)
         
         # Transações internacionais devem ter score maior em média
-        international = df[df['is_international'] == 1]['fraud_score'].mean()
-        domestic = df[df['is_international'] == 0]['fraud_score'].mean()
-        self.assertGreater(international, domestic)
+        # (um groupby por flag: as médias de 0 e 1 saem da mesma passada)
+        by_international = df.groupby('is_international')['fraud_score'].mean()
+        self.assertGreater(by_international[1], by_international[0])
         
         # Transações de alto valor devem ter score maior em média (se houver ambos os tipos)
-        high_amount_df = df[df['is_high_amount'] == 1]
-        normal_amount_df = df[df['is_high_amount'] == 0]
+        by_high_amount = df.groupby('is_high_amount')['fraud_score'].mean()
         
         # Só comparar se houver dados em ambos os grupos
-        if len(high_amount_df) > 0 and len(normal_amount_df) > 0:
-            high_amount = high_amount_df['fraud_score'].mean()
-            normal_amount = normal_amount_df['fraud_score'].mean()
-            self.assertGreater(high_amount, normal_amount)
+        if len(by_high_amount) == 2:
+            self.assertGreater(by_high_amount[1], by_high_amount[0])
         else:
             # Se não houver dados suficientes, apenas verificar que scores existem
             self.assertTrue((df['fraud_score'] >= 0).all())
@@ -211,9 +242,9 @@ class TestFinancialFeatureGenerator(unittest.TestCase):
         """Testa que timestamps estão ordenados"""
         df = self.generator.generate_transaction_features(50)
         
-        # DataFrame deve estar ordenado por timestamp
-        timestamps = pd.to_datetime(df['timestamp'])
-        self.assertTrue(timestamps.is_monotonic_increasing)
+        # A coluna já sai do gerador como datetime64 e ordenada: nada a converter
+        self.assertTrue(pd.api.types.is_datetime64_dtype(df['timestamp']))
+        self.assertTrue(df['timestamp'].is_monotonic_increasing)
 
 
 if __name__ == '__main__':